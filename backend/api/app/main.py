@@ -1,14 +1,38 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers.images import router as images_router
-from app.routers.robot import router as robot_router
+from bizbot_shared.core import metrics
+from bizbot_shared.core.config import settings
+
+from app.metrics import RequestMetricsMiddleware
+from app.routers.images import (
+    gemini_scorer,
+    photo_pipeline,
+    router as images_router,
+)
+from app.routers.robot import robot_worker, router as robot_router
 
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI(title="BizBot API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await photo_pipeline.start()
+    if settings.robot_prewarm:
+        robot_worker.start()
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(robot_worker.close)
+        await photo_pipeline.stop()
+        await gemini_scorer.aclose()
+
+
+app = FastAPI(title="BizBot API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,5 +41,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware, timing_header=settings.timing_header_enabled)
+
 app.include_router(images_router)
 app.include_router(robot_router)
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics() -> Response:
+        queue = photo_pipeline.stats().get("scoring_queue")
+        if queue is not None:
+            metrics.SCORING_QUEUE_DEPTH.set(queue["depth"])
+            metrics.SCORING_IN_FLIGHT.set(queue["in_flight"])
+        return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,49 @@
+import time
+
+from bizbot_shared.core import metrics
+
+
+def _server_timing(scope: dict, started: float) -> bytes:
+    # Upload handlers leave their stage timings in request.state.
+    timings = (scope.get("state") or {}).get("timings_ms") or {}
+    parts = [f"{stage};dur={ms}" for stage, ms in timings.items() if stage != "total"]
+    parts.append(f"app;dur={(time.perf_counter() - started) * 1000:.1f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+# Plain ASGI middleware (no per-request task or body buffering) recording
+# latency per route template and the number of requests in flight, and
+# optionally a Server-Timing header with the upload stage breakdown.
+class RequestMetricsMiddleware:
+    def __init__(self, app, timing_header: bool = False) -> None:
+        self.app = app
+        self.timing_header = timing_header
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_metrics(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.timing_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(scope, started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            # The route template keeps ids out of the label values.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, scope["method"], route, str(status)
+            )
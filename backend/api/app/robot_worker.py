@@ -0,0 +1,233 @@
+import json
+import logging
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger("bizbot_api")
+
+# A worker that stays up this long is considered healthy again and the
+# restart backoff starts over.
+HEALTHY_SECONDS = 60.0
+
+
+# Supervises one long-lived `comp_vision.py --standby` process. The worker
+# loads the model and opens the camera once and then idles paused; start
+# and stop become resume/pause commands on its stdin, and the status lines
+# it writes to stdout are kept for /robot/status. If the worker exits it is
+# relaunched with exponential backoff and put back into the state start/stop
+# last asked for, until close().
+class RobotWorker:
+    def __init__(
+        self,
+        command: list[str],
+        cwd: str,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 30.0,
+    ) -> None:
+        self._command = command
+        self._cwd = cwd
+        self._min_backoff = restart_backoff
+        self._max_backoff = max_restart_backoff
+        self._backoff = restart_backoff
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen | None = None
+        self._supervising = False
+        self._wanted = "paused"
+        self._restart_timer: threading.Timer | None = None
+        self._spawned_at = 0.0
+        self._ready: dict | None = None
+        self._status: dict = {}
+        self._status_at = 0.0
+        self.restarts = 0
+        self.last_exit_code: int | None = None
+
+    def start(self) -> None:
+        # Launches the worker (paused) if it isn't already up.
+        with self._lock:
+            self._supervising = True
+            self._ensure_process()
+
+    def resume(self) -> bool:
+        # Returns False if the robot was already running.
+        with self._lock:
+            self._supervising = True
+            if self._wanted == "running" and self._alive():
+                return False
+            self._wanted = "running"
+            # A new (or pending) worker gets the resume when it launches.
+            if not self._ensure_process() and self._alive():
+                self._send("resume")
+        return True
+
+    def pause(self) -> None:
+        with self._lock:
+            self._wanted = "paused"
+            if self._alive():
+                self._send("pause")
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._supervising = False
+            self._wanted = "paused"
+            if self._restart_timer is not None:
+                self._restart_timer.cancel()
+                self._restart_timer = None
+            proc = self._process
+            if proc is None or proc.poll() is not None:
+                return
+            self._send("shutdown")
+        # Closing stdin is a shutdown too, for a worker still loading.
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait(timeout=timeout)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            alive = self._alive()
+            reported = dict(self._status)
+            age = now - self._status_at
+            ready = self._ready
+            wanted = self._wanted
+            pid = self._process.pid if alive else None
+            spawned_at = self._spawned_at
+
+        if not alive:
+            worker_state = "down"
+        elif ready is None:
+            worker_state = "loading"
+        else:
+            worker_state = reported.get("state", "paused")
+        running = worker_state == "running"
+        if wanted == "running":
+            status = "running" if running else "starting"
+        else:
+            status = "stopped"
+
+        # Status lines arrive every second while running and on every
+        # command, so extrapolate the clocks by the age of the last one.
+        uptime = reported["uptime_seconds"] + age if reported else now - spawned_at
+        return {
+            "status": status,
+            "fps": reported.get("fps", 0.0) if running else 0.0,
+            "action": reported.get("action") if running else None,
+            "running_seconds": round(reported["running_seconds"] + age, 1) if running else 0.0,
+            "decisions": reported.get("decisions", 0),
+            "photos": reported.get("photos", 0),
+            "worker": {
+                "state": worker_state,
+                "pid": pid,
+                "uptime_seconds": round(uptime, 1) if alive else 0.0,
+                "load_seconds": ready.get("load_seconds") if ready else None,
+                "status_age_seconds": round(age, 1) if reported else None,
+                "restarts": self.restarts,
+                "last_exit_code": self.last_exit_code,
+            },
+        }
+
+    # The helpers below expect self._lock to be held.
+    def _alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _ensure_process(self) -> bool:
+        # Returns True if a new worker was launched (it picks up _wanted).
+        if self._alive() or self._restart_timer is not None:
+            return False
+        try:
+            proc = subprocess.Popen(
+                self._command,
+                cwd=self._cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as exc:
+            raise RuntimeError(f"Could not start robot worker: {exc}") from exc
+        self._process = proc
+        self._spawned_at = time.monotonic()
+        self._ready = None
+        self._status = {}
+        threading.Thread(
+            target=self._read_loop, args=(proc,), name="robot-worker-reader", daemon=True
+        ).start()
+        logger.info("Robot worker started (pid %s)", proc.pid)
+        if self._wanted == "running":
+            self._send("resume")
+        return True
+
+    def _send(self, command: str) -> None:
+        try:
+            self._process.stdin.write(json.dumps({"cmd": command}) + "\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError):
+            # The worker is exiting; the reader thread handles the restart.
+            logger.warning("Robot worker did not take %r", command)
+
+    def _read_loop(self, proc: subprocess.Popen) -> None:
+        for line in proc.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.info("robot worker: %s", line.rstrip())
+                continue
+            kind = message.get("type") if isinstance(message, dict) else None
+            with self._lock:
+                if proc is not self._process:
+                    continue
+                if kind == "ready":
+                    self._ready = message
+                    logger.info("Robot worker ready in %ss", message.get("load_seconds"))
+                elif kind == "status":
+                    self._status = message
+                    self._status_at = time.monotonic()
+            if kind == "error":
+                logger.warning("Robot worker error: %s", message.get("error"))
+            elif kind == "summary":
+                logger.info("Robot worker summary: %s", line.rstrip())
+        self._exited(proc, proc.wait())
+
+    def _exited(self, proc: subprocess.Popen, code: int) -> None:
+        with self._lock:
+            if proc is not self._process:
+                return
+            self._process = None
+            self._ready = None
+            self._status = {}
+            self.last_exit_code = code
+            if not self._supervising:
+                logger.info("Robot worker exited (%s)", code)
+                return
+            if time.monotonic() - self._spawned_at >= HEALTHY_SECONDS:
+                self._backoff = self._min_backoff
+            logger.warning("Robot worker exited (%s); restarting in %.0fs", code, self._backoff)
+            self._schedule_restart()
+
+    def _schedule_restart(self) -> None:
+        self._restart_timer = threading.Timer(self._backoff, self._restart)
+        self._restart_timer.daemon = True
+        self._restart_timer.start()
+        self._backoff = min(self._backoff * 2, self._max_backoff)
+
+    def _restart(self) -> None:
+        with self._lock:
+            self._restart_timer = None
+            if not self._supervising:
+                return
+            self.restarts += 1
+            try:
+                self._ensure_process()
+            except RuntimeError:
+                logger.exception("Robot worker restart failed")
+                self._schedule_restart()
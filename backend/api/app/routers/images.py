@@ -1,82 +1,194 @@
 import logging
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, HTTPException, Request
 
 from bizbot_shared.core.config import settings
 from bizbot_shared.schemas.photos import (
     PhotoItem,
     PhotoListResponse,
+    PhotoStatusResponse,
     ScoreUpdateRequest,
     ThresholdResponse,
     ThresholdUpdateRequest,
     UploadResponse,
 )
-from bizbot_shared.services.gemini_scorer import GeminiScorer
+from bizbot_shared.services.derivatives import (
+    DERIVATIVE_KINDS,
+    DerivativeGenerator,
+    derivative_path,
+)
+from bizbot_shared.services.gemini_scorer import BatchingGeminiScorer, GeminiScorer
+from bizbot_shared.services.image_ops import ScoringImagePreprocessor
+from bizbot_shared.services.photo_dedup import PhotoDedupIndex
 from bizbot_shared.services.photo_pipeline import PhotoPipeline
-from bizbot_shared.services.photo_repo import PhotoRepo
+from bizbot_shared.services.photo_repo import PhotoRepo, decode_cursor, encode_cursor
+from bizbot_shared.services.prescorer import LocalPreScorer
+from bizbot_shared.services.scoring_queue import ScoringQueue
 from bizbot_shared.services.supabase_storage import StorageService
 
+from app.uploads import UPLOAD_OPENAPI, read_image_upload
+
 router = APIRouter()
 logger = logging.getLogger("bizbot_api")
 
 MAX_BYTES = 10 * 1024 * 1024
 storage_service = StorageService(settings)
 photo_repo = PhotoRepo(settings)
-gemini_scorer = GeminiScorer(settings)
+gemini_scorer: GeminiScorer | BatchingGeminiScorer = GeminiScorer(settings)
+if settings.gemini_batch_enabled:
+    gemini_scorer = BatchingGeminiScorer(
+        gemini_scorer,
+        max_batch=settings.gemini_batch_size,
+        window_seconds=settings.gemini_batch_window_ms / 1000,
+    )
+scoring_queue = (
+    ScoringQueue(
+        workers=settings.scoring_workers,
+        maxsize=settings.scoring_queue_size,
+    )
+    if settings.scoring_mode == "background"
+    else None
+)
 photo_pipeline = PhotoPipeline(
     storage_service=storage_service,
     photo_repo=photo_repo,
     gemini_scorer=gemini_scorer,
+    scoring_queue=scoring_queue,
+    recover_pending=settings.scoring_recover_pending,
+    scoring_lease_seconds=settings.scoring_lease_seconds,
+    dedup_index=(
+        PhotoDedupIndex(
+            max_distance=settings.dedup_max_distance,
+            window_seconds=settings.dedup_window_seconds,
+            max_entries=settings.dedup_max_entries,
+        )
+        if settings.dedup_enabled
+        else None
+    ),
+    prescorer=(
+        LocalPreScorer(
+            reject_below=settings.prescore_reject_below,
+            accept_above=settings.prescore_accept_above,
+            min_edge=settings.prescore_min_edge,
+            sharpness_floor=settings.prescore_sharpness_floor,
+            sharpness_target=settings.prescore_sharpness_target,
+            clip_tolerance=settings.prescore_clip_tolerance,
+            clip_limit=settings.prescore_clip_limit,
+        )
+        if settings.prescore_enabled
+        else None
+    ),
+    scoring_preprocessor=(
+        ScoringImagePreprocessor(
+            max_edge=settings.gemini_image_max_edge,
+            image_format=settings.gemini_image_format,
+            quality=settings.gemini_image_quality,
+        )
+        if settings.gemini_image_max_edge > 0
+        else None
+    ),
+    derivative_generator=(
+        DerivativeGenerator(
+            storage_service,
+            max_workers=settings.derivative_workers,
+            thumb_edge=settings.thumb_max_edge,
+            display_edge=settings.display_max_edge,
+            quality=settings.derivative_quality,
+        )
+        if settings.derivatives_enabled
+        else None
+    ),
 )
 
 
-@router.post("/upload", response_model=UploadResponse)
-async def upload_image(file: UploadFile = File(None)) -> UploadResponse:
-    if file is None:
-        raise HTTPException(status_code=400, detail="Missing file")
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+def _validate_cursor(cursor: str | None) -> None:
+    if cursor is None:
+        return
+    try:
+        decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
 
-    content = await file.read()
-    if len(content) > MAX_BYTES:
-        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
 
-    try:
-        result = photo_pipeline.submit_photo(
-            content=content,
-            content_type=file.content_type,
-            original_name=file.filename,
+def _split_page(rows: list[dict], limit: int) -> tuple[list[dict], str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def _photo_items(rows: list[dict]) -> list[PhotoItem]:
+    # Rows uploaded before derivatives existed fall back to the original URL.
+    paths = [row["storage_path"] for row in rows]
+    for row in rows:
+        if row.get("has_derivatives"):
+            paths.extend(
+                derivative_path(row["storage_path"], kind) for kind in DERIVATIVE_KINDS
+            )
+    urls = storage_service.get_urls(paths)
+    items = []
+    for row in rows:
+        url = urls.get(row["storage_path"])
+        thumb_url = display_url = url
+        if row.get("has_derivatives"):
+            thumb_url = urls.get(derivative_path(row["storage_path"], "thumb"), url)
+            display_url = urls.get(derivative_path(row["storage_path"], "display"), url)
+        items.append(
+            PhotoItem(
+                id=row["id"],
+                storage_path=row["storage_path"],
+                score=row.get("score"),
+                url=url,
+                thumb_url=thumb_url,
+                display_url=display_url,
+                status=row.get("status", "scored"),
+            )
         )
+    return items
+
+
+@router.post("/upload", response_model=UploadResponse, openapi_extra=UPLOAD_OPENAPI)
+async def upload_image(request: Request) -> UploadResponse:
+    photo = await read_image_upload(
+        request,
+        field_name="file",
+        max_bytes=MAX_BYTES,
+        memory_bytes=settings.upload_spool_memory_bytes,
+        spool_dir=settings.upload_spool_dir,
+        too_large_detail="File too large (max 10MB)",
+    )
+
+    try:
+        result = await photo_pipeline.submit_upload(photo)
     except RuntimeError as exc:
         logger.exception("Upload failed")
         raise HTTPException(status_code=502, detail=str(exc)) from exc
+    finally:
+        photo.close()
 
+    request.state.timings_ms = result.get("timings_ms")
     return UploadResponse(**result)
 
 
 @router.get("/images", response_model=PhotoListResponse)
-async def list_public_images(limit: int = 100, offset: int = 0) -> PhotoListResponse:
+async def list_public_images(
+    limit: int = 100, offset: int = 0, cursor: str | None = None
+) -> PhotoListResponse:
     if limit < 1:
         raise HTTPException(status_code=400, detail="Limit must be at least 1")
     if limit > 500:
         raise HTTPException(status_code=400, detail="Limit must be <= 500")
     if offset < 0:
         raise HTTPException(status_code=400, detail="Offset must be >= 0")
+    _validate_cursor(cursor)
 
     try:
         threshold = photo_repo.get_threshold()
         rows = photo_repo.list_public_photos(
-            threshold=threshold, limit=limit, offset=offset
+            threshold=threshold, limit=limit + 1, offset=offset, cursor=cursor
         )
-        items = [
-            PhotoItem(
-                id=row["id"],
-                storage_path=row["storage_path"],
-                score=row.get("score"),
-                url=storage_service.get_url(row["storage_path"]),
-            )
-            for row in rows
-        ]
+        rows, next_cursor = _split_page(rows, limit)
+        items = _photo_items(rows)
     except RuntimeError as exc:
         logger.exception("Public list failed")
         raise HTTPException(status_code=502, detail=str(exc)) from exc
@@ -86,30 +198,27 @@ async def list_public_images(limit: int = 100, offset: int = 0) -> PhotoListResp
         limit=limit,
         offset=offset,
         threshold=threshold,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/admin/photos", response_model=PhotoListResponse)
-async def list_admin_photos(limit: int = 100, offset: int = 0) -> PhotoListResponse:
+async def list_admin_photos(
+    limit: int = 100, offset: int = 0, cursor: str | None = None
+) -> PhotoListResponse:
     if limit < 1:
         raise HTTPException(status_code=400, detail="Limit must be at least 1")
     if limit > 500:
         raise HTTPException(status_code=400, detail="Limit must be <= 500")
     if offset < 0:
         raise HTTPException(status_code=400, detail="Offset must be >= 0")
+    _validate_cursor(cursor)
 
     try:
         threshold = photo_repo.get_threshold()
-        rows = photo_repo.list_photos(limit=limit, offset=offset)
-        items = [
-            PhotoItem(
-                id=row["id"],
-                storage_path=row["storage_path"],
-                score=row.get("score"),
-                url=storage_service.get_url(row["storage_path"]),
-            )
-            for row in rows
-        ]
+        rows = photo_repo.list_photos(limit=limit + 1, offset=offset, cursor=cursor)
+        rows, next_cursor = _split_page(rows, limit)
+        items = _photo_items(rows)
     except RuntimeError as exc:
         logger.exception("Admin list failed")
         raise HTTPException(status_code=502, detail=str(exc)) from exc
@@ -119,6 +228,7 @@ async def list_admin_photos(limit: int = 100, offset: int = 0) -> PhotoListRespo
         limit=limit,
         offset=offset,
         threshold=threshold,
+        next_cursor=next_cursor,
     )
 
 
@@ -130,18 +240,31 @@ async def update_photo_score(
         row = photo_repo.update_score(photo_id=photo_id, score=payload.score)
         if row is None:
             raise HTTPException(status_code=404, detail="Photo not found")
-        url = storage_service.get_url(row["storage_path"])
+        photo_pipeline.record_score(photo_id, row.get("score"), "scored")
+        item = _photo_items([row])[0]
     except HTTPException:
         raise
     except RuntimeError as exc:
         logger.exception("Score update failed")
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
-    return PhotoItem(
+    return item
+
+
+@router.get("/photos/{photo_id}/status", response_model=PhotoStatusResponse)
+async def get_photo_status(photo_id: str) -> PhotoStatusResponse:
+    try:
+        row = photo_repo.get_photo(photo_id=photo_id)
+    except RuntimeError as exc:
+        logger.exception("Status lookup failed")
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    if row is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    return PhotoStatusResponse(
         id=row["id"],
-        storage_path=row["storage_path"],
+        status=row.get("status", "scored"),
         score=row.get("score"),
-        url=url,
     )
 
 
@@ -152,8 +275,12 @@ async def delete_photo(photo_id: str) -> dict:
         if row is None:
             raise HTTPException(status_code=404, detail="Photo not found")
         photo_repo.delete_photo(photo_id=photo_id)
+        photo_pipeline.forget_photo(photo_id)
         try:
-            storage_service.delete_object(row["storage_path"])
+            storage_service.delete_objects(
+                [row["storage_path"]]
+                + [derivative_path(row["storage_path"], kind) for kind in DERIVATIVE_KINDS]
+            )
         except RuntimeError:
             logger.exception("Storage delete failed")
     except HTTPException:
@@ -165,6 +292,11 @@ async def delete_photo(photo_id: str) -> dict:
     return {"ok": True}
 
 
+@router.get("/admin/pipeline/stats")
+async def get_pipeline_stats() -> dict:
+    return photo_pipeline.stats()
+
+
 @router.get("/admin/settings", response_model=ThresholdResponse)
 async def get_settings() -> ThresholdResponse:
     try:
@@ -1,14 +1,15 @@
-import subprocess
+import logging
 import sys
-import threading
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException
 
-router = APIRouter()
+from bizbot_shared.core.config import settings
+
+from app.robot_worker import RobotWorker
 
-_process_lock = threading.Lock()
-_process: subprocess.Popen | None = None
+router = APIRouter()
+logger = logging.getLogger("bizbot_api")
 
 
 def _get_repo_root() -> Path:
@@ -19,51 +20,40 @@ def _get_script_path() -> Path:
     return _get_repo_root() / "computer_vision" / "comp_vision.py"
 
 
+# One comp_vision.py --standby process, launched on the first /robot/start
+# (or with the API when ROBOT_PREWARM is set) and kept warm between runs.
+robot_worker = RobotWorker(
+    [sys.executable, "-u", str(_get_script_path()), "--standby"],
+    cwd=str(_get_repo_root()),
+    max_restart_backoff=settings.robot_restart_backoff_max_seconds,
+)
+
+
 @router.post("/robot/start")
 def start_robot() -> dict:
-    global _process
-    with _process_lock:
-        if _process is not None and _process.poll() is None:
-            return {"status": "running"}
+    if not _get_script_path().exists():
+        raise HTTPException(status_code=500, detail="comp_vision.py not found")
 
-        script_path = _get_script_path()
-        if not script_path.exists():
-            raise HTTPException(status_code=500, detail="comp_vision.py not found")
-
-        repo_root = _get_repo_root()
-        _process = subprocess.Popen(
-            [sys.executable, "-u", str(script_path)],
-            cwd=str(repo_root),
-        )
+    try:
+        started = robot_worker.resume()
+    except RuntimeError as exc:
+        logger.exception("Robot start failed")
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
 
-    return {"status": "started"}
+    return {"status": "started" if started else "running"}
 
 
 @router.post("/robot/stop")
 def stop_robot() -> dict:
-    global _process
-    with _process_lock:
-        proc = _process
-        if proc is None or proc.poll() is not None:
-            _process = None
-            return {"status": "stopped"}
-
-    proc.terminate()
-    try:
-        proc.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        proc.kill()
-        proc.wait(timeout=5)
-
-    with _process_lock:
-        if _process is proc:
-            _process = None
-
+    # Pausing keeps the model loaded and the camera open for the next start;
+    # with ROBOT_KEEP_WARM=false the worker exits instead.
+    if settings.robot_keep_warm:
+        robot_worker.pause()
+    else:
+        robot_worker.close()
     return {"status": "stopped"}
 
 
 @router.get("/robot/status")
 def robot_status() -> dict:
-    with _process_lock:
-        running = _process is not None and _process.poll() is None
-    return {"status": "running" if running else "stopped"}
+    return robot_worker.status()
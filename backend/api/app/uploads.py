@@ -0,0 +1,141 @@
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from bizbot_shared.services.ingest import IncomingPhoto, PhotoSpooler, UploadTooLarge
+
+# Multipart framing (boundaries, part headers, other small fields) allowed on
+# top of the file itself before Content-Length alone is enough to reject.
+_FRAMING_SLACK = 64 * 1024
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+class _UploadRejected(Exception):
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
+
+
+async def read_image_upload(
+    request: Request,
+    field_name: str,
+    max_bytes: int,
+    memory_bytes: int,
+    spool_dir: str | None = None,
+    too_large_detail: str = "File too large",
+) -> IncomingPhoto:
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Missing file")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_bytes + _FRAMING_SLACK:
+            raise HTTPException(status_code=400, detail=too_large_detail)
+
+    state: dict = {
+        "headers": {},
+        "field": b"",
+        "value": b"",
+        "spooler": None,
+        "active": False,
+        "photo": None,
+    }
+
+    def on_part_begin() -> None:
+        state["headers"] = {}
+        state["active"] = False
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = b""
+        state["value"] = b""
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(
+            state["headers"].get(b"content-disposition", b"")
+        )
+        if disposition.get(b"name", b"").decode("utf-8", "replace") != field_name:
+            return
+        if b"filename" not in disposition or state["photo"] is not None:
+            return
+        part_type = state["headers"].get(b"content-type", b"").decode("latin-1")
+        if not part_type.startswith("image/"):
+            raise _UploadRejected("File must be an image")
+        filename = disposition[b"filename"].decode("utf-8", "replace") or None
+        state["spooler"] = PhotoSpooler(
+            content_type=part_type,
+            original_name=filename,
+            max_bytes=max_bytes,
+            memory_bytes=memory_bytes,
+            spool_dir=spool_dir,
+        )
+        state["active"] = True
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["active"]:
+            state["spooler"].write(data[start:end])
+
+    def on_part_end() -> None:
+        if state["active"]:
+            state["photo"] = state["spooler"].finish()
+            state["spooler"] = None
+            state["active"] = False
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        if state["spooler"] is not None:
+            # The body stopped before the file part's closing boundary.
+            raise MultipartParseError("Upload ended inside the file part")
+    except BaseException as exc:
+        if state["spooler"] is not None:
+            state["spooler"].abort()
+        if state["photo"] is not None:
+            state["photo"].close()
+        if isinstance(exc, UploadTooLarge):
+            raise HTTPException(status_code=400, detail=too_large_detail) from exc
+        if isinstance(exc, _UploadRejected):
+            raise HTTPException(status_code=400, detail=exc.detail) from exc
+        if isinstance(exc, MultipartParseError):
+            raise HTTPException(status_code=400, detail="Malformed upload") from exc
+        raise
+
+    if state["photo"] is None:
+        raise HTTPException(status_code=400, detail="Missing file")
+    return state["photo"]
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# bizbot_shared.core.config builds its Settings at import time. The tests
+# never reach Supabase or Gemini, so any values will do.
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-key")
+
+# The API is run from backend/api, where `app` is importable.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
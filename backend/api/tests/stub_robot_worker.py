@@ -0,0 +1,47 @@
+# Stand-in for `comp_vision.py --standby`: speaks the same JSON-lines control
+# protocol (computer_vision/control.py) with no camera or model behind it.
+import json
+import sys
+import time
+
+started = time.monotonic()
+state = "paused"
+resumed_at = None
+decisions = 0
+
+
+def send(message: dict) -> None:
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def status() -> dict:
+    now = time.monotonic()
+    return {
+        "type": "status",
+        "state": state,
+        "fps": 12.5 if state == "running" else 0.0,
+        "action": "FORWARD" if state == "running" else None,
+        "uptime_seconds": round(now - started, 1),
+        "running_seconds": round(now - resumed_at, 1) if resumed_at is not None else 0.0,
+        "decisions": decisions,
+        "photos": 0,
+    }
+
+
+print("stub worker loading", flush=True)
+send({"type": "ready", "load_seconds": 0.1})
+for line in sys.stdin:
+    command = json.loads(line).get("cmd")
+    if command == "resume":
+        state, resumed_at = "running", time.monotonic()
+        decisions += 10
+    elif command == "pause":
+        state, resumed_at = "paused", None
+    elif command == "shutdown":
+        send({"type": "summary", "decisions": decisions})
+        sys.exit(0)
+    elif command != "status":
+        send({"type": "error", "error": f"unknown command: {command}"})
+        continue
+    send(status())
@@ -0,0 +1,111 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.robot_worker import RobotWorker
+
+STUB = Path(__file__).with_name("stub_robot_worker.py")
+
+
+def wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def worker():
+    robot = RobotWorker(
+        [sys.executable, "-u", str(STUB)],
+        cwd=str(STUB.parent),
+        restart_backoff=0.05,
+        max_restart_backoff=0.08,
+    )
+    yield robot
+    robot.close(timeout=5.0)
+
+
+def worker_state(robot: RobotWorker) -> str:
+    return robot.status()["worker"]["state"]
+
+
+def test_start_launches_a_paused_worker(worker):
+    worker.start()
+
+    assert wait_for(lambda: worker_state(worker) == "paused")
+    status = worker.status()
+    assert status["status"] == "stopped"
+    assert status["fps"] == 0.0
+    assert status["worker"]["pid"] is not None
+    assert status["worker"]["load_seconds"] == 0.1
+
+
+def test_resume_and_pause(worker):
+    worker.start()
+    assert wait_for(lambda: worker_state(worker) == "paused")
+
+    assert worker.resume() is True
+    assert wait_for(lambda: worker.status()["status"] == "running")
+    status = worker.status()
+    assert status["fps"] == 12.5
+    assert status["action"] == "FORWARD"
+    assert status["decisions"] == 10
+    assert worker.resume() is False
+
+    worker.pause()
+    assert wait_for(lambda: worker_state(worker) == "paused")
+    status = worker.status()
+    assert status["status"] == "stopped"
+    assert status["action"] is None
+    assert status["running_seconds"] == 0.0
+
+
+def test_resume_on_a_cold_worker_starts_it_running(worker):
+    assert worker.resume() is True
+    assert worker.status()["status"] == "starting"
+
+    assert wait_for(lambda: worker.status()["status"] == "running")
+    assert worker.restarts == 0
+
+
+def test_crashed_worker_is_restarted_in_the_wanted_state(worker):
+    worker.resume()
+    assert wait_for(lambda: worker.status()["status"] == "running")
+    first_pid = worker.status()["worker"]["pid"]
+
+    worker._process.kill()
+
+    assert wait_for(lambda: worker.restarts == 1)
+    assert wait_for(lambda: worker.status()["status"] == "running")
+    status = worker.status()
+    assert status["worker"]["pid"] != first_pid
+    assert status["worker"]["last_exit_code"] != 0
+    # Backoff doubles after each quick crash, up to the cap.
+    assert worker._backoff == 0.08
+
+
+def test_close_shuts_the_worker_down_for_good(worker):
+    worker.resume()
+    assert wait_for(lambda: worker.status()["status"] == "running")
+    process = worker._process
+
+    worker.close()
+
+    assert process.poll() == 0
+    assert wait_for(lambda: worker.status()["worker"]["last_exit_code"] == 0)
+    time.sleep(0.2)
+    status = worker.status()
+    assert status["status"] == "stopped"
+    assert status["worker"]["state"] == "down"
+    assert worker.restarts == 0
+
+
+def test_missing_worker_binary_is_a_runtime_error(tmp_path):
+    robot = RobotWorker([str(tmp_path / "no-such-binary")], cwd=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        robot.start()
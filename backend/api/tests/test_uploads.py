@@ -0,0 +1,146 @@
+import hashlib
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import images
+
+
+def png_bytes(size: int = 64) -> bytes:
+    pixels = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    ok, buffer = cv2.imencode(".png", pixels)
+    assert ok
+    return buffer.tobytes()
+
+
+# Stands in for PhotoPipeline: keeps what the route handed it (read while
+# the request is still open, before the route closes the photo).
+class FakePipeline:
+    def __init__(self) -> None:
+        self.photos = []
+
+    async def submit_upload(self, photo) -> dict:
+        spooled = photo.spool_path()
+        self.photos.append(
+            {
+                "content_type": photo.content_type,
+                "original_name": photo.original_name,
+                "size": photo.size,
+                "sha256": photo.sha256,
+                "content": photo.read_bytes(),
+                "spool_path": spooled,
+                "spooled_exists": spooled is not None and spooled.exists(),
+            }
+        )
+        return {"id": "photo-1", "storage_path": "photo-1.png", "score": 0.8}
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    fake = FakePipeline()
+    monkeypatch.setattr(images, "photo_pipeline", fake)
+    monkeypatch.setattr(images.settings, "upload_spool_dir", str(tmp_path))
+    return fake
+
+
+@pytest.fixture
+def client(pipeline):
+    app = FastAPI()
+    app.include_router(images.router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_upload_streams_the_file_to_the_pipeline(client, pipeline):
+    content = png_bytes()
+    response = client.post(
+        "/upload",
+        files={"file": ("robot.png", content, "image/png")},
+        data={"note": "ignored"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["id"] == "photo-1"
+    (photo,) = pipeline.photos
+    assert photo["content"] == content
+    assert photo["size"] == len(content)
+    assert photo["sha256"] == hashlib.sha256(content).hexdigest()
+    assert photo["content_type"] == "image/png"
+    assert photo["original_name"] == "robot.png"
+    assert photo["spool_path"] is None
+
+
+def test_large_upload_is_spooled_and_cleaned_up(client, pipeline, monkeypatch, tmp_path):
+    monkeypatch.setattr(images.settings, "upload_spool_memory_bytes", 1024)
+    content = png_bytes(128)
+    assert len(content) > 1024
+
+    response = client.post("/upload", files={"file": ("big.png", content, "image/png")})
+
+    assert response.status_code == 200
+    (photo,) = pipeline.photos
+    assert photo["spooled_exists"]
+    assert photo["spool_path"].parent == tmp_path
+    assert photo["content"] == content
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("size", [8_000, 200_000])
+def test_oversized_upload_is_rejected(client, pipeline, monkeypatch, tmp_path, size):
+    # 8 KB gets past the Content-Length check and is stopped while
+    # streaming; 200 KB is refused from the header alone.
+    monkeypatch.setattr(images, "MAX_BYTES", 4096)
+    monkeypatch.setattr(images.settings, "upload_spool_memory_bytes", 1024)
+
+    response = client.post(
+        "/upload", files={"file": ("big.png", b"\x89PNG" + b"\0" * size, "image/png")}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large (max 10MB)"
+    assert pipeline.photos == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_file_part_is_rejected(client, pipeline):
+    response = client.post(
+        "/upload", data={"photo": "nope"}, files={"other": ("a.png", b"x", "image/png")}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing file"
+    assert pipeline.photos == []
+
+
+def test_non_multipart_body_is_rejected(client, pipeline):
+    response = client.post("/upload", content=png_bytes(), headers={"content-type": "image/png"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing file"
+
+
+def test_non_image_upload_is_rejected(client, pipeline):
+    response = client.post("/upload", files={"file": ("notes.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File must be an image"
+    assert pipeline.photos == []
+
+
+def test_truncated_upload_is_rejected_and_cleaned_up(client, pipeline, monkeypatch, tmp_path):
+    monkeypatch.setattr(images.settings, "upload_spool_memory_bytes", 16)
+    body = b"--b0undary\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n"
+    body += b"Content-Type: image/png\r\n\r\n\x89PNG" + b"\0" * 100
+    response = client.post(
+        "/upload",
+        content=body,
+        headers={"content-type": "multipart/form-data; boundary=b0undary"},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Malformed upload"
+    assert pipeline.photos == []
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+from bench.fake_gemini import create_app as create_gemini_app
+from bench.fake_supabase import create_app as create_supabase_app
+from bench.server import BackgroundServer
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+HISTOGRAM_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# supabase-py only accepts keys shaped like a JWT.
+FAKE_KEY = "bench.bench.bench"
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _photos(count: int, width: int, height: int, seed: int) -> list[bytes]:
+    # Distinct, reasonably sharp frames so dedup and the local pre-scorer
+    # treat them like real event photos.
+    rng = np.random.default_rng(seed)
+    photos = []
+    for _ in range(count):
+        coarse = rng.integers(0, 255, (height // 40, width // 40, 3), dtype=np.uint8)
+        image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+        grain = rng.integers(-20, 20, image.shape, dtype=np.int16)
+        image = np.clip(image.astype(np.int16) + grain, 0, 255).astype(np.uint8)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        photos.append(encoded.tobytes())
+    return photos
+
+
+class _Results:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, Counter] = {}
+        self.stages: dict[str, list[float]] = {}
+
+    def add(self, endpoint: str, seconds: float, status: int | str) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds * 1000)
+        self.statuses.setdefault(endpoint, Counter())[str(status)] += 1
+
+    def add_timings(self, timings: dict[str, float]) -> None:
+        for stage, ms in timings.items():
+            self.stages.setdefault(stage, []).append(ms)
+
+
+async def _drive(args, api_url: str, photos: list[bytes]) -> tuple[_Results, float]:
+    rng = random.Random(args.seed)
+    results = _Results()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    state = {"sent": 0, "photo": 0, "cursor": None}
+
+    async def one(client: httpx.AsyncClient, record: bool) -> None:
+        if rng.random() < args.upload_ratio:
+            endpoint = "POST /upload"
+            content = photos[state["photo"] % len(photos)]
+            state["photo"] += 1
+            request = client.post(
+                "/upload",
+                files={"file": (f"bench_{state['photo']}.jpg", content, "image/jpeg")},
+            )
+        else:
+            endpoint = "GET /images"
+            params = {"limit": args.page_size}
+            # Some gallery requests page further down, like a scrolling client.
+            if state["cursor"] and rng.random() < args.next_page_ratio:
+                params["cursor"] = state["cursor"]
+            request = client.get("/images", params=params)
+
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError as exc:
+            if record:
+                results.add(endpoint, time.perf_counter() - started, type(exc).__name__)
+            return
+        elapsed = time.perf_counter() - started
+        if not record:
+            return
+        results.add(endpoint, elapsed, response.status_code)
+        if response.status_code != 200:
+            return
+        body = response.json()
+        if endpoint == "POST /upload" and body.get("timings_ms"):
+            results.add_timings(body["timings_ms"])
+        elif endpoint == "GET /images":
+            state["cursor"] = body.get("next_cursor")
+
+    async def worker(client: httpx.AsyncClient, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            if args.requests and state["sent"] >= args.requests:
+                return
+            state["sent"] += 1
+            await one(client, record=True)
+
+    async with httpx.AsyncClient(
+        base_url=api_url, limits=limits, timeout=args.timeout
+    ) as client:
+        for _ in range(args.warmup):
+            await one(client, record=False)
+        started = time.perf_counter()
+        deadline = started + (args.seconds if args.seconds else float("inf"))
+        await asyncio.gather(*(worker(client, deadline) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def _summary(results: _Results, elapsed: float, args, extra: dict) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(results.latencies.items()):
+        statuses = results.statuses[endpoint]
+        histogram = {}
+        lower = 0
+        for upper in HISTOGRAM_MS:
+            histogram[f"<={upper}"] = sum(1 for v in latencies if lower < v <= upper)
+            lower = upper
+        histogram[f">{HISTOGRAM_MS[-1]}"] = sum(1 for v in latencies if v > HISTOGRAM_MS[-1])
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 1),
+            "errors": sum(count for status, count in statuses.items() if status != "200"),
+            "statuses": dict(statuses),
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p90_ms": round(_percentile(latencies, 90), 1),
+            "p95_ms": round(_percentile(latencies, 95), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1),
+            "histogram_ms": histogram,
+        }
+    stages = {
+        stage: {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 1),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1),
+            "p99_ms": round(_percentile(values, 99), 1),
+        }
+        for stage, values in sorted(results.stages.items())
+    }
+    total = sum(len(v) for v in results.latencies.values())
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "concurrency",
+                "upload_ratio",
+                "page_size",
+                "seconds",
+                "requests",
+                "scoring_mode",
+                "rest_latency_ms",
+                "storage_latency_ms",
+                "gemini_latency_ms",
+                "rest_error_rate",
+                "storage_error_rate",
+                "gemini_error_rate",
+            )
+        },
+        "seconds": round(elapsed, 2),
+        "rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+        "upload_stages": stages,
+        **extra,
+    }
+
+
+def _report(summary: dict, baseline: dict | None) -> None:
+    def delta(value: float, before: float | None) -> str:
+        if not before:
+            return ""
+        return f" ({(value - before) / before:+.0%})"
+
+    base_endpoints = (baseline or {}).get("endpoints", {})
+    print(f"{summary['rps']} req/s over {summary['seconds']}s{delta(summary['rps'], (baseline or {}).get('rps'))}")
+    print(
+        f"{'endpoint':<14} {'requests':>8} {'req/s':>7} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for endpoint, stats in summary["endpoints"].items():
+        before = base_endpoints.get(endpoint, {})
+        print(
+            f"{endpoint:<14} {stats['requests']:>8} {stats['rps']:>7.1f} {stats['errors']:>7} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+            f"{stats['max_ms']:>8.1f}{delta(stats['p95_ms'], before.get('p95_ms'))}"
+        )
+        if stats["errors"]:
+            print(f"{'':<14} statuses {stats['statuses']}")
+
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"\n{endpoint} latency")
+        peak = max(stats["histogram_ms"].values()) or 1
+        for bucket, count in stats["histogram_ms"].items():
+            if count:
+                print(f"  {bucket:>7} ms {count:>6} {'#' * max(1, round(40 * count / peak))}")
+
+    if summary["upload_stages"]:
+        base_stages = (baseline or {}).get("upload_stages", {})
+        print(f"\n{'upload stage':<14} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for stage, stats in summary["upload_stages"].items():
+            before = base_stages.get(stage, {})
+            print(
+                f"{stage:<14} {stats['count']:>6} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}{delta(stats['p50_ms'], before.get('p50_ms'))}"
+            )
+
+    print(f"\n{'upstream route':<24} {'requests':>8} {'errors':>7}")
+    for route, counts in summary["supabase"]["routes"].items():
+        print(f"{route:<24} {counts['requests']:>8} {counts['errors']:>7}")
+    gemini = summary["gemini"]
+    print(f"{'gemini generateContent':<24} {gemini['requests']:>8} {gemini['errors']:>7}")
+
+
+def _configure_api(args, supabase_url: str, gemini_url: str) -> None:
+    # Settings are read once, when the API modules are imported.
+    os.environ.update(
+        {
+            "SUPABASE_URL": supabase_url,
+            "SUPABASE_SERVICE_ROLE_KEY": FAKE_KEY,
+            "SUPABASE_PUBLIC_BUCKET": "false" if args.private_bucket else "true",
+            "GEMINI_API_KEY": "bench",
+            "GEMINI_BASE_URL": gemini_url,
+            "SCORING_MODE": args.scoring_mode,
+            "SCORING_RECOVER_PENDING": "false",
+        }
+    )
+    for override in args.set or []:
+        key, _, value = override.partition("=")
+        os.environ[key.upper()] = value
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load-test /upload and /images against local Supabase and Gemini stand-ins."
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20, help="run length (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--upload-ratio", type=float, default=0.3, help="share of requests that are uploads")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--next-page-ratio", type=float, default=0.3)
+    parser.add_argument("--photos", type=int, default=64, help="distinct photos to cycle through")
+    parser.add_argument("--photo-size", default="1280x960")
+    parser.add_argument("--seed-photos", type=int, default=2000, help="rows already in the gallery")
+    parser.add_argument("--scoring-mode", choices=("inline", "background"), default="inline")
+    parser.add_argument("--private-bucket", action="store_true", help="sign URLs instead of public links")
+    parser.add_argument("--rest-latency-ms", type=float, default=15)
+    parser.add_argument("--storage-latency-ms", type=float, default=40)
+    parser.add_argument("--storage-per-mb-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--gemini-latency-ms", type=float, default=400)
+    parser.add_argument("--rest-error-rate", type=float, default=0.0)
+    parser.add_argument("--storage-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="extra Settings override, e.g. --set DEDUP_ENABLED=false")
+    parser.add_argument("--save", help="write the summary JSON here to use as a baseline")
+    parser.add_argument("--baseline", help="summary from an earlier --save to compare against")
+    args = parser.parse_args()
+    if not args.seconds and not args.requests:
+        parser.error("set --seconds or --requests")
+
+    width, height = (int(v) for v in args.photo_size.lower().split("x"))
+    photos = _photos(args.photos, width, height, args.seed)
+    supabase_app = create_supabase_app(
+        rest_latency_ms=args.rest_latency_ms,
+        storage_latency_ms=args.storage_latency_ms,
+        per_mb_ms=args.storage_per_mb_ms,
+        jitter_ms=args.jitter_ms,
+        rest_error_rate=args.rest_error_rate,
+        storage_error_rate=args.storage_error_rate,
+        seed_photos=args.seed_photos,
+        seed=args.seed,
+    )
+    gemini_app = create_gemini_app(
+        latency_ms=args.gemini_latency_ms, error_rate=args.gemini_error_rate, seed=args.seed
+    )
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    with BackgroundServer(supabase_app) as supabase, BackgroundServer(gemini_app) as gemini:
+        _configure_api(args, supabase.url, gemini.url)
+        from app.main import app as api_app
+
+        # The API configures INFO logging on import; per-request logs would
+        # drown the report.
+        logging.getLogger().setLevel(args.log_level)
+
+        with BackgroundServer(api_app, lifespan="on") as api:
+            results, elapsed = asyncio.run(_drive(args, api.url, photos))
+            pipeline_stats = httpx.get(f"{api.url}/admin/pipeline/stats").json()
+        extra = {
+            "pipeline": pipeline_stats,
+            "supabase": httpx.get(f"{supabase.url}/_stats").json(),
+            "gemini": httpx.get(f"{gemini.url}/_stats").json(),
+        }
+
+    summary = _summary(results, elapsed, args, extra)
+    _report(summary, baseline)
+    if args.save:
+        Path(args.save).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+
+from bizbot_shared.core.config import Settings  # noqa: E402
+from bizbot_shared.services.gemini_scorer import (  # noqa: E402
+    BatchingGeminiScorer,
+    GeminiScorer,
+)
+
+from bench.fake_gemini import create_app  # noqa: E402
+from bench.server import BackgroundServer  # noqa: E402
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def _run(scorer, photos: list[bytes], concurrency: int) -> tuple[float, list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one(content: bytes) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await scorer.score_image(content, "image/jpeg")
+            except RuntimeError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(content) for content in photos))
+    return time.perf_counter() - start, latencies, failures
+
+
+async def _bench(args, base_url: str) -> None:
+    settings = Settings(
+        gemini_api_key="bench",
+        gemini_base_url=base_url,
+        gemini_max_connections=args.concurrency,
+        gemini_max_keepalive_connections=args.concurrency,
+    )
+    photos = [os.urandom(args.photo_kb * 1024) for _ in range(args.photos)]
+    modes = {
+        "single": lambda: GeminiScorer(settings),
+        "batched": lambda: BatchingGeminiScorer(
+            GeminiScorer(settings),
+            max_batch=args.batch_size,
+            window_seconds=args.window_ms / 1000,
+        ),
+    }
+
+    print(
+        f"{'mode':<8} {'photos/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'requests':>9} {'tokens/photo':>13} {'failed':>7}"
+    )
+    async with httpx.AsyncClient(base_url=base_url) as control:
+        for name, factory in modes.items():
+            await control.post("/_reset")
+            scorer = factory()
+            elapsed, latencies, failures = await _run(scorer, photos, args.concurrency)
+            await scorer.aclose()
+            stats = (await control.get("/_stats")).json()
+            print(
+                f"{name:<8} {len(photos) / elapsed:>9.1f} "
+                f"{statistics.median(latencies) * 1000:>8.0f} "
+                f"{_percentile(latencies, 95) * 1000:>8.0f} "
+                f"{stats['requests']:>9} "
+                f"{stats['prompt_tokens'] / len(photos):>13.0f} "
+                f"{failures:>7}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare single-image and micro-batched Gemini scoring against a local stand-in."
+    )
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--photo-kb", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=50)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--per-image-ms", type=float, default=30)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_app(
+        latency_ms=args.latency_ms,
+        per_image_ms=args.per_image_ms,
+        malformed_rate=args.malformed_rate,
+    )
+    with BackgroundServer(app) as server:
+        asyncio.run(_bench(args, server.url))
+
+
+if __name__ == "__main__":
+    main()
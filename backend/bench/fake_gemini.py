@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import json
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Gemini bills each inline image at a flat token count regardless of size.
+IMAGE_TOKENS = 258
+
+
+def _score_for(data: str) -> float:
+    digest = hashlib.sha256(data[:4096].encode("ascii")).digest()
+    return round(0.55 + (digest[0] / 255) * 0.4, 3)
+
+
+def create_app(
+    latency_ms: float = 400.0,
+    per_image_ms: float = 30.0,
+    error_rate: float = 0.0,
+    malformed_rate: float = 0.0,
+    seed: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "images": 0, "prompt_tokens": 0, "errors": 0}
+
+    @app.post("/v1beta/models/{model_action}")
+    async def generate_content(model_action: str, request: Request):
+        payload = await request.json()
+        parts = payload["contents"][0]["parts"]
+        images = [part["inline_data"]["data"] for part in parts if "inline_data" in part]
+        text_chars = sum(len(part.get("text", "")) for part in parts)
+        prompt_tokens = text_chars // 4 + IMAGE_TOKENS * len(images)
+
+        stats["requests"] += 1
+        stats["images"] += len(images)
+        stats["prompt_tokens"] += prompt_tokens
+        await asyncio.sleep((latency_ms + per_image_ms * len(images)) / 1000)
+
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"code": 503, "message": "injected failure"}},
+            )
+
+        config = payload.get("generationConfig", {})
+        batched = config.get("responseSchema", {}).get("type") == "array"
+        if batched:
+            text = json.dumps(
+                [{"index": i, "score": _score_for(data)} for i, data in enumerate(images)]
+            )
+        else:
+            text = json.dumps({"score": _score_for(images[0]) if images else 0.7})
+        if rng.random() < malformed_rate:
+            text = "I think these photos look great!"
+
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}]}}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens},
+        }
+
+    @app.get("/_stats")
+    async def get_stats() -> dict:
+        return dict(stats)
+
+    @app.post("/_reset")
+    async def reset_stats() -> dict:
+        for key in stats:
+            stats[key] = 0
+        return dict(stats)
+
+    return app
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# Query parameters PostgREST treats as modifiers rather than column filters.
+_MODIFIERS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_PHOTO_DEFAULTS = {
+    "score": None,
+    "status": "scored",
+    "content_sha256": None,
+    "phash": None,
+    "score_source": None,
+    "quality": None,
+    "has_derivatives": False,
+    "scoring_owner": None,
+    "scoring_claimed_at": None,
+}
+
+
+def _split_top(text: str) -> list[str]:
+    # Splits on commas outside parentheses and double quotes.
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _literal(raw: str):
+    if raw.startswith('"') and raw.endswith('"'):
+        return json.loads(raw)
+    if raw == "null":
+        return None
+    if raw in ("true", "false"):
+        return raw == "true"
+    return raw
+
+
+def _compare(value, op: str, raw: str) -> bool:
+    if op == "is":
+        return value is _literal(raw) if raw in ("null", "true", "false") else False
+    target = _literal(raw)
+    if value is None or target is None:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        target = float(target)
+    elif isinstance(value, bool):
+        target = target in (True, "true")
+    else:
+        value, target = str(value), str(target)
+    return {
+        "eq": value == target,
+        "neq": value != target,
+        "gt": value > target,
+        "gte": value >= target,
+        "lt": value < target,
+        "lte": value <= target,
+    }[op]
+
+
+def _condition(expr: str):
+    # "col.op.value", "col.not.op.value", "and(...)" or "or(...)"
+    for group in ("and", "or"):
+        if expr.startswith(f"{group}(") and expr.endswith(")"):
+            inner = [_condition(part) for part in _split_top(expr[len(group) + 1 : -1])]
+            combine = all if group == "and" else any
+            return lambda row: combine(check(row) for check in inner)
+    column, rest = expr.split(".", 1)
+    return _filter(column, rest)
+
+
+def _filter(column: str, spec: str):
+    negate = spec.startswith("not.")
+    if negate:
+        spec = spec[4:]
+    if spec.startswith("(") and spec.endswith(")"):
+        raise ValueError(f"Unsupported filter {column}={spec}")
+    op, raw = spec.split(".", 1)
+    if op in ("and", "or"):
+        raise ValueError(f"Unsupported filter {column}={spec}")
+    return lambda row: _compare(row.get(column), op, raw) != negate
+
+
+def _row_filters(params) -> list:
+    checks = []
+    for key, value in params.multi_items():
+        if key in _MODIFIERS:
+            continue
+        if key in ("or", "and"):
+            checks.append(_condition(f"{key}{value}"))
+        else:
+            checks.append(_filter(key, value))
+    return checks
+
+
+def _project(row: dict, select: str | None) -> dict:
+    if not select or select.strip() == "*":
+        return dict(row)
+    columns = [column.strip() for column in select.split(",") if column.strip()]
+    return {column: row.get(column) for column in columns}
+
+
+def _sorted(rows: list[dict], order: str | None) -> list[dict]:
+    if not order:
+        return rows
+    # Stable sorts applied from the last key to the first.
+    for term in reversed(order.split(",")):
+        column, *flags = term.split(".")
+        rows = sorted(
+            rows,
+            key=lambda row: (row.get(column) is None, row.get(column) or 0),
+            reverse="desc" in flags,
+        )
+    return rows
+
+
+# Stand-in for the parts of Supabase the API talks to: PostgREST on the
+# photos and settings tables, and Storage upload/download/remove/sign for
+# one bucket. Every request waits latency_ms (+ jitter, + per_mb_ms for
+# object bodies) and fails with a 503 at the configured rate.
+def create_app(
+    rest_latency_ms: float = 15.0,
+    storage_latency_ms: float = 40.0,
+    per_mb_ms: float = 20.0,
+    jitter_ms: float = 5.0,
+    rest_error_rate: float = 0.0,
+    storage_error_rate: float = 0.0,
+    seed_photos: int = 0,
+    seed: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="Fake Supabase")
+    rng = random.Random(seed)
+    tables: dict[str, list[dict]] = {"photos": [], "settings": []}
+    objects: dict[str, bytes] = {}
+    stats: dict[str, dict[str, int]] = {}
+    clock = {"now": datetime.now(timezone.utc) - timedelta(days=1)}
+
+    def created_at() -> str:
+        # Strictly increasing, so keyset pages are well defined.
+        clock["now"] += timedelta(microseconds=rng.randint(1, 1000))
+        return clock["now"].isoformat()
+
+    def new_photo(payload: dict) -> dict:
+        return {
+            **_PHOTO_DEFAULTS,
+            **payload,
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "created_at": created_at(),
+        }
+
+    for i in range(seed_photos):
+        path = f"seed/{i:06d}.jpg"
+        tables["photos"].append(
+            new_photo(
+                {
+                    "storage_path": path,
+                    "score": round(rng.uniform(0.4, 1.0), 3),
+                    "score_source": "gemini",
+                    "has_derivatives": True,
+                }
+            )
+        )
+
+    async def delay(route: str, base_ms: float, body_bytes: int = 0) -> bool:
+        counts = stats.setdefault(route, {"requests": 0, "errors": 0})
+        counts["requests"] += 1
+        wait = base_ms + rng.uniform(0, jitter_ms) + per_mb_ms * body_bytes / (1024 * 1024)
+        await asyncio.sleep(wait / 1000)
+        error_rate = storage_error_rate if route.startswith("storage") else rest_error_rate
+        if rng.random() < error_rate:
+            counts["errors"] += 1
+            return False
+        return True
+
+    def rest_error(status: int, message: str) -> JSONResponse:
+        return JSONResponse(
+            status_code=status,
+            content={"code": str(status), "message": message, "details": None, "hint": None},
+        )
+
+    def storage_error(status: int, error: str, message: str) -> JSONResponse:
+        return JSONResponse(
+            status_code=status,
+            content={"statusCode": str(status), "error": error, "message": message},
+        )
+
+    def matching(table: str, request: Request) -> list[dict]:
+        checks = _row_filters(request.query_params)
+        return [row for row in tables[table] if all(check(row) for check in checks)]
+
+    def represent(rows: list[dict], request: Request) -> list[dict]:
+        return [_project(row, request.query_params.get("select")) for row in rows]
+
+    # --------------------
+    # PostgREST
+    # --------------------
+    @app.get("/rest/v1/{table}")
+    async def select_rows(table: str, request: Request):
+        if not await delay(f"rest GET {table}", rest_latency_ms):
+            return rest_error(503, "injected failure")
+        if table not in tables:
+            return rest_error(404, f"relation {table} does not exist")
+        try:
+            rows = _sorted(matching(table, request), request.query_params.get("order"))
+        except ValueError as exc:
+            return rest_error(400, str(exc))
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        rows = rows[offset : offset + int(limit) if limit is not None else None]
+        return represent(rows, request)
+
+    @app.post("/rest/v1/{table}")
+    async def insert_rows(table: str, request: Request):
+        payload = await request.json()
+        if not await delay(f"rest POST {table}", rest_latency_ms):
+            return rest_error(503, "injected failure")
+        if table not in tables:
+            return rest_error(404, f"relation {table} does not exist")
+        payloads = payload if isinstance(payload, list) else [payload]
+        conflict = request.query_params.get("on_conflict")
+        merge = "resolution=merge-duplicates" in request.headers.get("prefer", "")
+        written = []
+        for item in payloads:
+            existing = None
+            if conflict:
+                existing = next(
+                    (row for row in tables[table] if row.get(conflict) == item.get(conflict)),
+                    None,
+                )
+            if existing is not None:
+                if not merge:
+                    return rest_error(409, "duplicate key value violates unique constraint")
+                existing.update(item)
+                written.append(existing)
+            elif table == "photos":
+                row = new_photo(item)
+                tables[table].append(row)
+                written.append(row)
+            else:
+                row = dict(item)
+                tables[table].append(row)
+                written.append(row)
+        return JSONResponse(status_code=201, content=represent(written, request))
+
+    @app.patch("/rest/v1/{table}")
+    async def update_rows(table: str, request: Request):
+        payload = await request.json()
+        if not await delay(f"rest PATCH {table}", rest_latency_ms):
+            return rest_error(503, "injected failure")
+        rows = matching(table, request)
+        for row in rows:
+            row.update(payload)
+        return represent(rows, request)
+
+    @app.delete("/rest/v1/{table}")
+    async def delete_rows(table: str, request: Request):
+        if not await delay(f"rest DELETE {table}", rest_latency_ms):
+            return rest_error(503, "injected failure")
+        rows = matching(table, request)
+        tables[table] = [row for row in tables[table] if row not in rows]
+        return represent(rows, request)
+
+    # --------------------
+    # Storage
+    # --------------------
+    @app.post("/storage/v1/object/sign/{bucket}")
+    async def sign_objects(bucket: str, request: Request):
+        payload = await request.json()
+        if not await delay("storage sign", storage_latency_ms):
+            return storage_error(503, "ServiceUnavailable", "injected failure")
+        return [
+            {
+                "path": path,
+                "signedURL": f"/object/sign/{bucket}/{path}?token={uuid.uuid4().hex}",
+                "error": None,
+            }
+            for path in payload.get("paths", [])
+        ]
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    async def upload_object(bucket: str, path: str, request: Request):
+        form = await request.form()
+        upload = form.get("file")
+        content = await upload.read() if upload is not None else b""
+        if not await delay("storage upload", storage_latency_ms, len(content)):
+            return storage_error(503, "ServiceUnavailable", "injected failure")
+        upsert = request.headers.get("x-upsert", "false") == "true"
+        if path in objects and not upsert:
+            return storage_error(409, "Duplicate", "The resource already exists")
+        objects[path] = content
+        return {"Key": f"{bucket}/{path}"}
+
+    @app.get("/storage/v1/object/{bucket}/{path:path}")
+    async def download_object(bucket: str, path: str):
+        content = objects.get(path)
+        if not await delay("storage download", storage_latency_ms, len(content or b"")):
+            return storage_error(503, "ServiceUnavailable", "injected failure")
+        if content is None:
+            return storage_error(404, "not_found", "Object not found")
+        return Response(content=content, media_type="application/octet-stream")
+
+    @app.delete("/storage/v1/object/{bucket}")
+    async def remove_objects(bucket: str, request: Request):
+        payload = await request.json()
+        if not await delay("storage remove", storage_latency_ms):
+            return storage_error(503, "ServiceUnavailable", "injected failure")
+        removed = [path for path in payload.get("prefixes", []) if objects.pop(path, None) is not None]
+        return [{"name": path, "bucket_id": bucket} for path in removed]
+
+    # --------------------
+    # Bench control
+    # --------------------
+    @app.get("/_stats")
+    async def get_stats() -> dict:
+        return {
+            "routes": {route: dict(counts) for route, counts in sorted(stats.items())},
+            "rows": {table: len(rows) for table, rows in tables.items()},
+            "objects": len(objects),
+            "object_bytes": sum(len(content) for content in objects.values()),
+        }
+
+    @app.post("/_reset")
+    async def reset_stats() -> dict:
+        stats.clear()
+        return {}
+
+    return app
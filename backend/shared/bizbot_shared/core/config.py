@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,11 +10,63 @@ class Settings(BaseSettings):
     supabase_bucket: str = "images"
     supabase_public_bucket: bool = True
     supabase_signed_url_seconds: int = 600
+    signed_url_refresh_margin_seconds: int = 60
+    signed_url_cache_size: int = 10000
     gemini_api_key: str = ""
     gemini_model: str = "gemini-2.0-flash"  # Changed from gemini-1.5-flash
+    gemini_base_url: str = "https://generativelanguage.googleapis.com"
+    gemini_timeout_seconds: float = 30.0
+    gemini_max_connections: int = 32
+    gemini_max_keepalive_connections: int = 16
+    gemini_keepalive_expiry_seconds: float = 30.0
+    gemini_image_max_edge: int = 1024
+    gemini_image_format: Literal["jpeg", "webp"] = "jpeg"
+    gemini_image_quality: int = 85
+    gemini_batch_enabled: bool = False
+    gemini_batch_size: int = 8
+    gemini_batch_window_ms: int = 50
     default_threshold: float = 0.75
+    upload_spool_memory_bytes: int = 1024 * 1024
+    upload_spool_dir: str = ""
+    threshold_cache_seconds: float = 15.0
+    threshold_invalidation_file: str = ""
+    scoring_mode: Literal["inline", "background"] = "inline"
+    scoring_workers: int = 4
+    scoring_queue_size: int = 256
+    scoring_recover_pending: bool = True
+    scoring_lease_seconds: float = 600.0
+    dedup_enabled: bool = True
+    dedup_max_distance: int = 6
+    dedup_window_seconds: float = 900.0
+    dedup_max_entries: int = 2000
+    prescore_enabled: bool = True
+    prescore_reject_below: float = 0.05
+    prescore_accept_above: float | None = None
+    prescore_min_edge: int = 480
+    prescore_sharpness_floor: float = 10.0
+    prescore_sharpness_target: float = 120.0
+    prescore_clip_tolerance: float = 0.05
+    prescore_clip_limit: float = 0.6
+    derivatives_enabled: bool = True
+    derivative_workers: int = 2
+    thumb_max_edge: int = 320
+    display_max_edge: int = 1280
+    derivative_quality: int = 80
+    metrics_enabled: bool = True
+    timing_header_enabled: bool = False
+    robot_prewarm: bool = False
+    robot_keep_warm: bool = True
+    robot_restart_backoff_max_seconds: float = 30.0
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
+    # `PRESCORE_ACCEPT_ABOVE=` in .env means unset, not a parse error.
+    @field_validator("prescore_accept_above", mode="before")
+    @classmethod
+    def _blank_is_none(cls, value):
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
 
 settings = Settings()
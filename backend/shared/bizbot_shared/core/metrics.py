@@ -0,0 +1,252 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds; covers cache hits (~1ms) up to slow Gemini calls.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Minimal Prometheus client: metrics are plain dicts keyed by label values
+# behind one lock each, cheap enough to update on every request.
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+        if not labelnames:
+            self._values[()] = 0.0
+
+    def _key(self, labels: tuple) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def gauge(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames))
+
+
+def histogram(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames))
+
+
+@contextmanager
+def timed(
+    seconds: Histogram,
+    label: str,
+    in_flight: Gauge | None = None,
+    errors: Counter | None = None,
+) -> Iterator[None]:
+    if in_flight is not None:
+        in_flight.inc(label)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            errors.inc(label)
+        raise
+    finally:
+        seconds.observe(time.perf_counter() - start, label)
+        if in_flight is not None:
+            in_flight.dec(label)
+
+
+def instrument(
+    seconds: Histogram,
+    in_flight: Gauge | None = None,
+    errors: Counter | None = None,
+) -> Callable:
+    # Decorator: times each call under the function's name (leading
+    # underscores dropped), for sync and async functions alike.
+    def decorate(fn: Callable) -> Callable:
+        label = fn.__name__.lstrip("_")
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(seconds, label, in_flight, errors):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(seconds, label, in_flight, errors):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# --------------------
+# BizBot metrics
+# --------------------
+HTTP_REQUEST_SECONDS = histogram(
+    "bizbot_http_request_seconds",
+    "API request latency by route",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = gauge("bizbot_http_requests_in_flight", "API requests being handled")
+
+UPLOAD_STAGE_SECONDS = histogram(
+    "bizbot_upload_stage_seconds", "Time spent in each photo upload stage", ("stage",)
+)
+UPLOADS = counter("bizbot_uploads_total", "Photo uploads by outcome", ("outcome",))
+UPLOADS_IN_FLIGHT = gauge("bizbot_uploads_in_flight", "Photo uploads being processed")
+SCORING_QUEUE_DEPTH = gauge("bizbot_scoring_queue_depth", "Photos waiting for background scoring")
+SCORING_IN_FLIGHT = gauge("bizbot_scoring_in_flight", "Photos being scored in the background")
+
+STORAGE_SECONDS = histogram(
+    "bizbot_storage_call_seconds", "Supabase Storage call latency", ("op",)
+)
+STORAGE_IN_FLIGHT = gauge("bizbot_storage_calls_in_flight", "Supabase Storage calls in progress", ("op",))
+STORAGE_ERRORS = counter("bizbot_storage_errors_total", "Failed Supabase Storage calls", ("op",))
+
+REPO_SECONDS = histogram("bizbot_repo_call_seconds", "Supabase database call latency", ("op",))
+REPO_IN_FLIGHT = gauge("bizbot_repo_calls_in_flight", "Supabase database calls in progress", ("op",))
+REPO_ERRORS = counter("bizbot_repo_errors_total", "Failed Supabase database calls", ("op",))
+THRESHOLD_LOOKUPS = counter(
+    "bizbot_threshold_lookups_total", "Threshold reads by cache result", ("result",)
+)
+
+GEMINI_SECONDS = histogram("bizbot_gemini_call_seconds", "Gemini scoring call latency", ("op",))
+GEMINI_IN_FLIGHT = gauge("bizbot_gemini_calls_in_flight", "Gemini scoring calls in progress", ("op",))
+GEMINI_REQUESTS = counter("bizbot_gemini_requests_total", "generateContent requests sent")
+GEMINI_FAILURES = counter(
+    "bizbot_gemini_failures_total", "Gemini requests that failed", ("reason",)
+)
+GEMINI_PARSE_ERRORS = counter(
+    "bizbot_gemini_parse_errors_total", "Gemini responses without a usable score"
+)
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._durations: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._durations[name] = time.perf_counter() - start
+
+    async def track(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def durations(self) -> dict[str, float]:
+        return {**self._durations, "total": self.total()}
+
+    def as_ms(self) -> dict[str, float]:
+        timings = {name: round(value * 1000, 1) for name, value in self._durations.items()}
+        timings["total"] = round(self.total() * 1000, 1)
+        return timings
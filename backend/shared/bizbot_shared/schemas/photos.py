@@ -1,11 +1,30 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+PhotoStatus = Literal["pending", "scored", "failed"]
+
+
+class QualityMetrics(BaseModel):
+    sharpness: float
+    clipped_dark: float
+    clipped_bright: float
+    mean_brightness: float
+    width: int
+    height: int
+    local_score: float
+
 
 class UploadResponse(BaseModel):
     id: str
     storage_path: str
     score: float | None = None
     url: str | None = None
+    status: PhotoStatus = "scored"
+    timings_ms: dict[str, float] | None = None
+    duplicate: bool = False
+    score_source: Literal["gemini", "local", "admin"] | None = None
+    quality: QualityMetrics | None = None
 
 
 class PhotoItem(BaseModel):
@@ -13,6 +32,15 @@ class PhotoItem(BaseModel):
     storage_path: str
     score: float | None = None
     url: str | None = None
+    thumb_url: str | None = None
+    display_url: str | None = None
+    status: PhotoStatus = "scored"
+
+
+class PhotoStatusResponse(BaseModel):
+    id: str
+    status: PhotoStatus
+    score: float | None = None
 
 
 class PhotoListResponse(BaseModel):
@@ -20,6 +48,7 @@ class PhotoListResponse(BaseModel):
     limit: int
     offset: int
     threshold: float
+    next_cursor: str | None = None
 
 
 class ThresholdResponse(BaseModel):
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import PurePosixPath
+
+import cv2
+import numpy as np
+
+from bizbot_shared.services.ingest import IncomingPhoto
+from bizbot_shared.services.supabase_storage import StorageService
+
+logger = logging.getLogger("bizbot_derivatives")
+
+DERIVATIVE_KINDS = ("thumb", "display")
+
+
+def derivative_path(storage_path: str, kind: str) -> str:
+    path = PurePosixPath(storage_path)
+    return str(path.with_name(f"{path.stem}_{kind}.webp"))
+
+
+def render_derivatives(
+    source: bytes | str, sizes: dict[str, int], quality: int
+) -> dict[str, bytes]:
+    # Runs in a worker process: decode once, then resize from the largest
+    # derivative down so each step works on the smallest possible input.
+    if isinstance(source, str):
+        image = cv2.imread(source, cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Image could not be decoded")
+
+    rendered: dict[str, bytes] = {}
+    current = image
+    for kind, max_edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        height, width = current.shape[:2]
+        longest = max(height, width)
+        if longest > max_edge:
+            scale = max_edge / longest
+            current = cv2.resize(
+                current,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+        ok, buffer = cv2.imencode(".webp", current, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        if not ok:
+            raise ValueError(f"Failed to encode {kind} derivative")
+        rendered[kind] = buffer.tobytes()
+    return rendered
+
+
+def _warm_worker() -> None:
+    return None
+
+
+def _lower_priority() -> None:
+    # Renders run after the response, so request handling comes first when
+    # they compete for CPU.
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+class DerivativeGenerator:
+    def __init__(
+        self,
+        storage_service: StorageService,
+        max_workers: int,
+        thumb_edge: int,
+        display_edge: int,
+        quality: int,
+    ) -> None:
+        self._storage_service = storage_service
+        self._max_workers = max(1, max_workers)
+        self._sizes = {"thumb": thumb_edge, "display": display_edge}
+        self._quality = quality
+        self._executor: ProcessPoolExecutor | None = None
+        self._counts = {"stored": 0, "failed": 0}
+
+    def _executor_instance(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the API process holds threads and open sockets.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        # Spawned workers import cv2 on first use; pay that at startup rather
+        # than on the first upload.
+        loop = asyncio.get_running_loop()
+        executor = self._executor_instance()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, _warm_worker) for _ in range(self._max_workers))
+        )
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, photo: IncomingPhoto) -> dict[str, bytes] | None:
+        # Spooled uploads are handed over by path so the worker reads the file
+        # itself instead of the bytes being pickled across the process boundary.
+        spool_path = photo.spool_path()
+        source = str(spool_path) if spool_path is not None else photo.read_bytes()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor_instance(),
+                render_derivatives,
+                source,
+                self._sizes,
+                self._quality,
+            )
+        except BrokenProcessPool:
+            logger.exception("Derivative worker pool died; restarting it")
+            self.shutdown()
+        except Exception as exc:
+            logger.warning("Derivative rendering failed: %s", exc)
+        self._counts["failed"] += 1
+        return None
+
+    async def store(self, storage_path: str, rendered: dict[str, bytes]) -> bool:
+        try:
+            await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        self._storage_service.upload_object,
+                        derivative_path(storage_path, kind),
+                        content,
+                        "image/webp",
+                    )
+                    for kind, content in rendered.items()
+                )
+            )
+        except Exception as exc:
+            logger.warning("Derivative upload failed for %s: %s", storage_path, exc)
+            self._counts["failed"] += 1
+            return False
+        self._counts["stored"] += 1
+        return True
+
+    def stats(self) -> dict:
+        return dict(self._counts)
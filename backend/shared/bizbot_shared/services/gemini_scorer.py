@@ -1,10 +1,12 @@
+import asyncio
 import base64
 import json
 import logging
 import re
 
-import requests
+import httpx
 
+from bizbot_shared.core import metrics
 from bizbot_shared.core.config import Settings
 
 
@@ -17,9 +19,32 @@ _SCORE_SCHEMA = {
     "additionalProperties": False,
 }
 
+_BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "index": {"type": "integer"},
+            "score": {"type": "number"},
+        },
+        "required": ["index", "score"],
+    },
+}
+
+_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
 logger = logging.getLogger("bizbot_gemini")
 
-_PROMPT = (
+_timed = metrics.instrument(metrics.GEMINI_SECONDS, metrics.GEMINI_IN_FLIGHT)
+
+# Shared by single and batch scoring so the two can't drift apart; only the
+# response format differs.
+_RUBRIC = (
     "You are a photo quality rater for an event robot camera system.\n"
     "\n"
     "You MUST evaluate only technical photo quality:\n"
@@ -31,16 +56,60 @@ _PROMPT = (
     "\n"
     "You MUST NOT evaluate: attractiveness, identity, demographics, or emotions.\n"
     "\n"
-    "Return ONLY JSON matching the schema.\n"
-    "Return: { \"score\": float 0.0 to 1.0 }\n"
+)
+
+_LENIENCY = (
     "If uncertain, return around 0.70.\n"
     "Be very generous on the judging and only mark lower than 0.70 if there are very clear technical photo issues, The photos are supposed to be candid/B-roll\n"
 )
 
+_PROMPT = (
+    _RUBRIC
+    + "Return ONLY JSON matching the schema.\n"
+    "Return: { \"score\": float 0.0 to 1.0 }\n"
+    + _LENIENCY
+)
+
+# Formatted with the image count, so literal braces are doubled.
+_BATCH_PROMPT = (
+    _RUBRIC
+    + "You will receive {count} photos, each preceded by a label \"Image N:\" "
+    "where N starts at 0.\n"
+    "Score every photo independently using the rules above.\n"
+    "Return ONLY a JSON array with one entry per photo: "
+    "[{{ \"index\": N, \"score\": float 0.0 to 1.0 }}]\n"
+    + _LENIENCY.replace("{", "{{").replace("}", "}}")
+)
+
+
+class GeminiParseError(RuntimeError):
+    pass
+
 
 class GeminiScorer:
     def __init__(self, settings: Settings) -> None:
         self._settings = settings
+        self._client: httpx.AsyncClient | None = None
+        self._requests = 0
+        self._failures = 0
+        self._parse_errors = 0
+
+    def _client_instance(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._settings.gemini_timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=self._settings.gemini_max_connections,
+                    max_keepalive_connections=self._settings.gemini_max_keepalive_connections,
+                    keepalive_expiry=self._settings.gemini_keepalive_expiry_seconds,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
 
     def _extract_json(self, text: str) -> dict:
         cleaned = text.strip()
@@ -70,69 +139,251 @@ class GeminiScorer:
 
         raise RuntimeError("Gemini response missing score")
 
-    def score_image(self, image_bytes: bytes, content_type: str) -> float:
+    @_timed
+    async def score_image(self, image_bytes: bytes, content_type: str) -> float:
+        encoded = base64.b64encode(image_bytes).decode("utf-8")
+        logger.info(
+            "Gemini request model=%s bytes=%d", self._settings.gemini_model, len(image_bytes)
+        )
+        text = await self._generate(
+            [
+                {"text": _PROMPT},
+                {"inline_data": {"mime_type": content_type, "data": encoded}},
+            ],
+            {"temperature": 0.2},
+        )
+
+        try:
+            score = self._extract_score(text)
+        except Exception as exc:
+            self._parse_errors += 1
+            metrics.GEMINI_PARSE_ERRORS.inc()
+            logger.error("Gemini score parse failed: %s", text)
+            raise GeminiParseError("Gemini response missing score") from exc
+
+        logger.info("Gemini score parsed: %s", score)
+        if score < 0.0 or score > 1.0:
+            self._parse_errors += 1
+            metrics.GEMINI_PARSE_ERRORS.inc()
+            raise GeminiParseError("Gemini score out of range")
+
+        return score
+
+    @_timed
+    async def score_images(self, images: list[tuple[bytes, str]]) -> list[float]:
+        parts: list[dict] = [{"text": _BATCH_PROMPT.format(count=len(images))}]
+        total_bytes = 0
+        for index, (image_bytes, content_type) in enumerate(images):
+            total_bytes += len(image_bytes)
+            parts.append({"text": f"Image {index}:"})
+            parts.append(
+                {
+                    "inline_data": {
+                        "mime_type": content_type,
+                        "data": base64.b64encode(image_bytes).decode("utf-8"),
+                    }
+                }
+            )
+        logger.info(
+            "Gemini batch request model=%s images=%d bytes=%d",
+            self._settings.gemini_model,
+            len(images),
+            total_bytes,
+        )
+        text = await self._generate(
+            parts,
+            {
+                "temperature": 0.2,
+                "responseMimeType": "application/json",
+                "responseSchema": _BATCH_SCHEMA,
+            },
+        )
+
+        try:
+            return self._extract_batch_scores(text, len(images))
+        except Exception as exc:
+            self._parse_errors += 1
+            metrics.GEMINI_PARSE_ERRORS.inc()
+            logger.error("Gemini batch parse failed: %s", text)
+            raise GeminiParseError("Gemini batch response could not be parsed") from exc
+
+    def _extract_batch_scores(self, text: str, count: int) -> list[float]:
+        cleaned = text.strip()
+        if cleaned.startswith("```"):
+            cleaned = re.sub(r"^```[a-zA-Z]*\s*", "", cleaned)
+            cleaned = re.sub(r"```\s*$", "", cleaned).strip()
+        try:
+            payload = json.loads(cleaned)
+        except json.JSONDecodeError:
+            match = re.search(r"\[.*\]", cleaned, re.DOTALL)
+            if not match:
+                raise
+            payload = json.loads(match.group(0))
+        if isinstance(payload, dict):
+            payload = payload.get("scores", [])
+
+        scores: dict[int, float] = {}
+        for item in payload:
+            index = int(item["index"])
+            score = float(item["score"])
+            if 0 <= index < count and 0.0 <= score <= 1.0:
+                scores[index] = score
+        if len(scores) != count:
+            raise ValueError(f"expected {count} scores, got {len(scores)}")
+        return [scores[index] for index in range(count)]
+
+    async def _generate(self, parts: list[dict], generation_config: dict) -> str:
         if not self._settings.gemini_api_key:
             logger.error("GEMINI_API_KEY is not set")
             raise RuntimeError("GEMINI_API_KEY is required")
 
-        encoded = base64.b64encode(image_bytes).decode("utf-8")
-        
-        model = "gemini-2.0-flash"
-        
         url = (
-            "https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{model}:generateContent"
+            f"{self._settings.gemini_base_url.rstrip('/')}/v1beta/models/"
+            f"{self._settings.gemini_model}:generateContent"
             f"?key={self._settings.gemini_api_key}"
         )
         payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": _PROMPT},
-                        {"inline_data": {"mime_type": content_type, "data": encoded}},
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.2,
-            },
-            "safetySettings": [
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            ],
+            "contents": [{"parts": parts}],
+            "generationConfig": generation_config,
+            "safetySettings": _SAFETY_SETTINGS,
         }
-        logger.info("Gemini request model=%s bytes=%d", model, len(image_bytes))
+        self._requests += 1
+        metrics.GEMINI_REQUESTS.inc()
         try:
-            response = requests.post(url, json=payload, timeout=30)
-        except requests.exceptions.RequestException as exc:
+            response = await self._client_instance().post(url, json=payload)
+        except httpx.HTTPError as exc:
+            self._failures += 1
+            metrics.GEMINI_FAILURES.inc("transport")
             logger.error("Gemini request failed: %s", exc)
             raise RuntimeError(f"Gemini request failed: {exc}") from exc
-        
+
         if response.status_code >= 400:
+            self._failures += 1
+            metrics.GEMINI_FAILURES.inc("http_status")
             logger.error("Gemini API error %s: %s", response.status_code, response.text)
             logger.error("Available models can be checked at: https://ai.google.dev/gemini-api/docs/models/gemini")
             raise RuntimeError(f"Gemini API error {response.status_code}: {response.text}")
 
         data = response.json()
         if "error" in data:
+            self._failures += 1
+            metrics.GEMINI_FAILURES.inc("api_error")
             raise RuntimeError(str(data["error"]))
 
         try:
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
+            return data["candidates"][0]["content"]["parts"][0]["text"]
         except (KeyError, IndexError) as exc:
+            self._parse_errors += 1
+            metrics.GEMINI_PARSE_ERRORS.inc()
             logger.error("Gemini response missing content: %s", data)
-            raise RuntimeError("Gemini response missing content") from exc
+            raise GeminiParseError("Gemini response missing content") from exc
+
+    def stats(self) -> dict:
+        return {
+            "requests": self._requests,
+            "failures": self._failures,
+            "parse_errors": self._parse_errors,
+        }
+
+
+class BatchingGeminiScorer:
+    def __init__(
+        self, scorer: GeminiScorer, max_batch: int, window_seconds: float
+    ) -> None:
+        self._scorer = scorer
+        self._max_batch = max(1, max_batch)
+        self._window_seconds = window_seconds
+        self._pending: list[tuple[bytes, str, asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+        self._batches = 0
+        self._batched_images = 0
+        self._fallbacks = 0
+
+    async def score_image(self, image_bytes: bytes, content_type: str) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((image_bytes, content_type, future))
+        if len(self._pending) >= self._max_batch:
+            self._dispatch()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def aclose(self) -> None:
+        self._dispatch()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        await self._scorer.aclose()
+
+    def stats(self) -> dict:
+        stats = self._scorer.stats()
+        stats.update(
+            {
+                "batches": self._batches,
+                "batched_images": self._batched_images,
+                "batch_fallbacks": self._fallbacks,
+            }
+        )
+        return stats
 
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self._window_seconds)
+        self._flush_task = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+        while self._pending:
+            batch = self._pending[: self._max_batch]
+            del self._pending[: self._max_batch]
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[bytes, str, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            image_bytes, content_type, future = batch[0]
+            await self._resolve_single(image_bytes, content_type, future)
+            return
+
+        self._batches += 1
+        self._batched_images += len(batch)
         try:
-            score = self._extract_score(text)
+            scores = await self._scorer.score_images(
+                [(image_bytes, content_type) for image_bytes, content_type, _ in batch]
+            )
+        except GeminiParseError:
+            # A malformed batch answer is retried one image per request rather
+            # than failing every caller in the batch.
+            self._fallbacks += 1
+            logger.warning("Gemini batch of %d fell back to single requests", len(batch))
+            await asyncio.gather(
+                *(
+                    self._resolve_single(image_bytes, content_type, future)
+                    for image_bytes, content_type, future in batch
+                )
+            )
+            return
         except Exception as exc:
-            logger.error("Gemini score parse failed: %s", text)
-            raise RuntimeError("Gemini response missing score") from exc
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
 
-        logger.info("Gemini score parsed: %s", score)
-        if score < 0.0 or score > 1.0:
-            raise RuntimeError("Gemini score out of range")
+        for (_, _, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
 
-        return score
+    async def _resolve_single(
+        self, image_bytes: bytes, content_type: str, future: asyncio.Future
+    ) -> None:
+        try:
+            score = await self._scorer.score_image(image_bytes, content_type)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(score)
@@ -0,0 +1,78 @@
+import logging
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("bizbot_image_ops")
+
+
+def decode_image(content: bytes) -> np.ndarray | None:
+    buffer = np.frombuffer(content, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def resize_max_edge(image: np.ndarray, max_edge: int) -> np.ndarray:
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if max_edge <= 0 or longest <= max_edge:
+        return image
+    scale = max_edge / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_image(image: np.ndarray, image_format: str, quality: int) -> tuple[bytes, str]:
+    if image_format == "webp":
+        ok, buffer = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        content_type = "image/webp"
+    else:
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        content_type = "image/jpeg"
+    if not ok:
+        raise RuntimeError(f"Failed to encode image as {image_format}")
+    return buffer.tobytes(), content_type
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def dhash(image: np.ndarray, hash_size: int = 8) -> int:
+    small = cv2.resize(
+        to_gray(image), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA
+    )
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class ScoringImagePreprocessor:
+    def __init__(self, max_edge: int, image_format: str, quality: int) -> None:
+        self._max_edge = max_edge
+        self._image_format = image_format
+        self._quality = quality
+
+    def prepare(self, image: np.ndarray, original_size: int) -> tuple[bytes, str]:
+        start = time.perf_counter()
+        resized = resize_max_edge(image, self._max_edge)
+        content, content_type = encode_image(resized, self._image_format, self._quality)
+        logger.info(
+            "Scoring payload %dx%d -> %dx%d, %d -> %d bytes (%d base64) in %.1f ms",
+            image.shape[1],
+            image.shape[0],
+            resized.shape[1],
+            resized.shape[0],
+            original_size,
+            len(content),
+            4 * ((len(content) + 2) // 3),
+            (time.perf_counter() - start) * 1000,
+        )
+        return content, content_type
@@ -0,0 +1,166 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from io import BufferedReader
+from pathlib import Path
+from typing import Iterator
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class IncomingPhoto:
+    def __init__(
+        self,
+        content_type: str,
+        original_name: str | None,
+        size: int,
+        sha256: str,
+        content: bytes | None = None,
+        path: Path | None = None,
+    ) -> None:
+        self.content_type = content_type
+        self.original_name = original_name
+        self.size = size
+        self.sha256 = sha256
+        self._content = content
+        self._path = path
+        self._holds = 1
+
+    @classmethod
+    def from_bytes(
+        cls, content: bytes, content_type: str, original_name: str | None
+    ) -> "IncomingPhoto":
+        return cls(
+            content_type=content_type,
+            original_name=original_name,
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+            content=content,
+        )
+
+    @contextmanager
+    def body(self) -> Iterator[bytes | BufferedReader]:
+        if self._content is not None:
+            yield self._content
+            return
+        with open(self._path, "rb") as handle:
+            yield handle
+
+    @contextmanager
+    def view(self) -> Iterator[bytes | mmap.mmap]:
+        # Spooled photos are memory-mapped so decoding reads straight from the
+        # page cache instead of copying the whole file onto the heap.
+        if self._content is not None:
+            yield self._content
+            return
+        if self.size == 0:
+            yield b""
+            return
+        with open(self._path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def spool_path(self) -> Path | None:
+        return self._path
+
+    def read_bytes(self) -> bytes:
+        if self._content is not None:
+            return self._content
+        return Path(self._path).read_bytes()
+
+    def retain(self) -> None:
+        # Keeps the content (and spool file) alive past the request for
+        # work that finishes in the background; each retain() needs its own
+        # close().
+        self._holds += 1
+
+    def close(self) -> None:
+        self._holds -= 1
+        if self._holds > 0:
+            return
+        self._content = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+
+class PhotoSpooler:
+    def __init__(
+        self,
+        content_type: str,
+        original_name: str | None,
+        max_bytes: int,
+        memory_bytes: int,
+        spool_dir: str | None = None,
+    ) -> None:
+        self._content_type = content_type
+        self._original_name = original_name
+        self._max_bytes = max_bytes
+        self._memory_bytes = memory_bytes
+        self._spool_dir = spool_dir or None
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+        self._path: Path | None = None
+        self._size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._size += len(chunk)
+        if self._size > self._max_bytes:
+            self.abort()
+            raise UploadTooLarge(f"Upload exceeds {self._max_bytes} bytes")
+        self._hash.update(chunk)
+        if self._file is None and len(self._buffer) + len(chunk) <= self._memory_bytes:
+            self._buffer.extend(chunk)
+            return
+        if self._file is None:
+            self._roll_over()
+        self._file.write(chunk)
+
+    def finish(self) -> IncomingPhoto:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            content = None
+        else:
+            content = bytes(self._buffer)
+        self._buffer = bytearray()
+        return IncomingPhoto(
+            content_type=self._content_type,
+            original_name=self._original_name,
+            size=self._size,
+            sha256=self._hash.hexdigest(),
+            content=content,
+            path=self._path,
+        )
+
+    def abort(self) -> None:
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+    def _roll_over(self) -> None:
+        handle = tempfile.NamedTemporaryFile(
+            prefix="bizbot-upload-", dir=self._spool_dir, delete=False
+        )
+        self._file = handle
+        self._path = Path(handle.name)
+        handle.write(self._buffer)
+        self._buffer = bytearray()
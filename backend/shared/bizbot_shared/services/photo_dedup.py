@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from bizbot_shared.services.image_ops import hamming_distance
+
+
+@dataclass
+class DedupEntry:
+    photo_id: str
+    storage_path: str
+    content_sha256: str
+    phash: int | None
+    score: float | None
+    status: str
+    added_at: float
+
+
+class PhotoDedupIndex:
+    def __init__(self, max_distance: int, window_seconds: float, max_entries: int) -> None:
+        self.max_distance = max_distance
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, DedupEntry] = OrderedDict()
+        self._by_sha: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, content_sha256: str, phash: int | None) -> DedupEntry | None:
+        with self._lock:
+            self._expire()
+            match = self._find(content_sha256, phash)
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return match
+
+    def _find(self, content_sha256: str, phash: int | None) -> DedupEntry | None:
+        photo_id = self._by_sha.get(content_sha256)
+        if photo_id is not None:
+            return self._entries[photo_id]
+        if phash is None:
+            return None
+
+        best: DedupEntry | None = None
+        best_distance = self.max_distance + 1
+        for entry in reversed(self._entries.values()):
+            if entry.phash is None:
+                continue
+            distance = hamming_distance(entry.phash, phash)
+            if distance < best_distance:
+                best, best_distance = entry, distance
+                if distance == 0:
+                    break
+        return best
+
+    # A photo whose scoring failed is never a dedup target: the next copy of
+    # it should be stored and scored rather than pointed at the failed row.
+    def add(self, entry: DedupEntry) -> None:
+        with self._lock:
+            previous = self._entries.pop(entry.photo_id, None)
+            if previous is not None:
+                self._by_sha.pop(previous.content_sha256, None)
+            if entry.status == "failed":
+                return
+            self._entries[entry.photo_id] = entry
+            self._by_sha[entry.content_sha256] = entry.photo_id
+            while len(self._entries) > self.max_entries:
+                _, dropped = self._entries.popitem(last=False)
+                self._by_sha.pop(dropped.content_sha256, None)
+
+    def update(self, photo_id: str, score: float | None, status: str) -> None:
+        if status == "failed":
+            self.discard(photo_id)
+            return
+        with self._lock:
+            entry = self._entries.get(photo_id)
+            if entry is not None:
+                entry.score = score
+                entry.status = status
+
+    def discard(self, photo_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(photo_id, None)
+            if entry is not None:
+                self._by_sha.pop(entry.content_sha256, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.window_seconds
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.added_at >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            self._by_sha.pop(entry.content_sha256, None)
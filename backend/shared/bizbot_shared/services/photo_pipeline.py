@@ -1,51 +1,544 @@
+import asyncio
 import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 
-from bizbot_shared.schemas.photos import UploadResponse
-from bizbot_shared.services.gemini_scorer import GeminiScorer
+from bizbot_shared.core import metrics
+from bizbot_shared.core.timing import StageTimer
+from bizbot_shared.schemas.photos import QualityMetrics, UploadResponse
+from bizbot_shared.services.derivatives import DerivativeGenerator
+from bizbot_shared.services.gemini_scorer import BatchingGeminiScorer, GeminiScorer
+from bizbot_shared.services.image_ops import (
+    ScoringImagePreprocessor,
+    decode_image,
+    dhash,
+)
+from bizbot_shared.services.ingest import IncomingPhoto
+from bizbot_shared.services.photo_dedup import DedupEntry, PhotoDedupIndex
 from bizbot_shared.services.photo_repo import PhotoRepo
+from bizbot_shared.services.prescorer import LocalPreScorer, PreScoreDecision
+from bizbot_shared.services.scoring_queue import ScoringJob, ScoringQueue
 from bizbot_shared.services.supabase_storage import StorageService
 
 logger = logging.getLogger("bizbot_photo_pipeline")
 
+_RECOVER_BATCH = 500
+# How long stop() lets background derivative renders finish.
+_DERIVE_DRAIN_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class PhotoAnalysis:
+    content_sha256: str
+    phash: int | None
+    quality: QualityMetrics | None
+    # Downscaled, re-encoded copy sent to Gemini; None means send the original.
+    scoring_content: bytes | None = None
+    scoring_content_type: str | None = None
+
 
 class PhotoPipeline:
     def __init__(
         self,
         storage_service: StorageService,
         photo_repo: PhotoRepo,
-        gemini_scorer: GeminiScorer,
+        gemini_scorer: GeminiScorer | BatchingGeminiScorer,
+        scoring_queue: ScoringQueue | None = None,
+        recover_pending: bool = True,
+        scoring_lease_seconds: float = 600.0,
+        dedup_index: PhotoDedupIndex | None = None,
+        prescorer: LocalPreScorer | None = None,
+        scoring_preprocessor: ScoringImagePreprocessor | None = None,
+        derivative_generator: DerivativeGenerator | None = None,
     ) -> None:
         self._storage_service = storage_service
         self._photo_repo = photo_repo
         self._gemini_scorer = gemini_scorer
+        self._scoring_queue = scoring_queue
+        self._recover_pending = recover_pending
+        self._lease_seconds = scoring_lease_seconds
+        # Claims on pending rows are made in this name, so several API
+        # processes can share one photos table.
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._recover_task: asyncio.Task | None = None
+        # Photos queued or being scored here; the sweep leaves them alone even
+        # once their claim has outlived the lease in a long queue.
+        self._scoring_ids: set[str] = set()
+        self._dedup_index = dedup_index
+        self._prescorer = prescorer
+        self._scoring_preprocessor = scoring_preprocessor
+        self._derivative_generator = derivative_generator
+        self._derive_tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self._derivative_generator is not None:
+            await self._derivative_generator.start()
+        if self._dedup_index is not None:
+            await self._warm_dedup_index()
+        if self._scoring_queue is None:
+            return
+        await self._scoring_queue.start(self._score_job)
+        if self._recover_pending:
+            self._recover_task = asyncio.create_task(self._requeue_pending())
+
+    def stats(self) -> dict:
+        stats: dict = {"gemini": self._gemini_scorer.stats()}
+        if self._dedup_index is not None:
+            stats["dedup"] = self._dedup_index.stats()
+        if self._prescorer is not None:
+            stats["prescore"] = self._prescorer.stats()
+        if self._derivative_generator is not None:
+            stats["derivatives"] = self._derivative_generator.stats()
+        if self._scoring_queue is not None:
+            stats["scoring_queue"] = {
+                "depth": self._scoring_queue.depth(),
+                "in_flight": self._scoring_queue.in_flight(),
+            }
+        return stats
+
+    def record_score(self, photo_id: str, score: float | None, status: str) -> None:
+        if self._dedup_index is not None:
+            self._dedup_index.update(photo_id, score, status)
 
-    def submit_photo(
+    def forget_photo(self, photo_id: str) -> None:
+        if self._dedup_index is not None:
+            self._dedup_index.discard(photo_id)
+
+    async def stop(self) -> None:
+        if self._recover_task is not None:
+            self._recover_task.cancel()
+            await asyncio.gather(self._recover_task, return_exceptions=True)
+            self._recover_task = None
+        if self._scoring_queue is not None:
+            await self._scoring_queue.stop()
+        if self._derive_tasks:
+            await asyncio.wait(self._derive_tasks, timeout=_DERIVE_DRAIN_SECONDS)
+            for task in self._derive_tasks:
+                task.cancel()
+            await asyncio.gather(*self._derive_tasks, return_exceptions=True)
+        if self._derivative_generator is not None:
+            self._derivative_generator.shutdown()
+
+    async def submit_photo(
         self, content: bytes, content_type: str, original_name: str | None
     ) -> dict:
-        storage_path = self._storage_service.upload_image_bytes(
-            content=content,
-            content_type=content_type,
-            original_name=original_name,
+        return await self.submit_upload(
+            IncomingPhoto.from_bytes(content, content_type, original_name)
         )
 
-        score: float | None = None
+    async def submit_upload(self, photo: IncomingPhoto) -> dict:
+        metrics.UPLOADS_IN_FLIGHT.inc()
         try:
-            score = self._gemini_scorer.score_image(
-                image_bytes=content,
-                content_type=content_type,
+            result = await self._submit_upload(photo)
+        except BaseException:
+            metrics.UPLOADS.inc("failed")
+            raise
+        finally:
+            metrics.UPLOADS_IN_FLIGHT.dec()
+        metrics.UPLOADS.inc("duplicate" if result.get("duplicate") else result["status"])
+        return result
+
+    async def _submit_upload(self, photo: IncomingPhoto) -> dict:
+        timer = StageTimer()
+        with timer.stage("analyze"):
+            analysis = await asyncio.to_thread(self._analyze, photo)
+
+        duplicate = None
+        if self._dedup_index is not None:
+            duplicate = self._dedup_index.find(analysis.content_sha256, analysis.phash)
+        decision: PreScoreDecision = "gemini"
+        if duplicate is None and self._prescorer is not None and analysis.quality:
+            decision = self._prescorer.decide(analysis.quality)
+
+        if duplicate is not None:
+            result = await self._duplicate_result(timer, duplicate)
+        elif self._scoring_queue is not None and decision == "gemini":
+            result = await self._submit_background(timer, photo, analysis)
+        else:
+            result = await self._submit_inline(timer, photo, analysis, decision)
+        result["timings_ms"] = timer.as_ms()
+        for stage, seconds in timer.durations().items():
+            metrics.UPLOAD_STAGE_SECONDS.observe(seconds, stage)
+        logger.info("Photo %s stages (ms): %s", result["id"], result["timings_ms"])
+        return result
+
+    async def _duplicate_result(self, timer: StageTimer, entry: DedupEntry) -> dict:
+        url = None
+        if entry.score is not None:
+            with timer.stage("threshold"):
+                threshold = await asyncio.to_thread(self._photo_repo.get_threshold)
+            if entry.score >= threshold:
+                with timer.stage("url"):
+                    url = await asyncio.to_thread(
+                        self._storage_service.get_url, entry.storage_path
+                    )
+        logger.info("Duplicate upload matched photo %s", entry.photo_id)
+        return UploadResponse(
+            id=entry.photo_id,
+            storage_path=entry.storage_path,
+            score=entry.score,
+            url=url,
+            status=entry.status,
+            duplicate=True,
+        ).model_dump()
+
+    def _analyze(self, photo: IncomingPhoto) -> PhotoAnalysis:
+        with photo.view() as buffer:
+            image = decode_image(buffer)
+        if image is None:
+            return PhotoAnalysis(content_sha256=photo.sha256, phash=None, quality=None)
+        quality = self._prescorer.measure(image) if self._prescorer else None
+        scoring_content, scoring_content_type = self._prepare_scoring_image(
+            image, photo.size
+        )
+        return PhotoAnalysis(
+            content_sha256=photo.sha256,
+            phash=dhash(image),
+            quality=quality,
+            scoring_content=scoring_content,
+            scoring_content_type=scoring_content_type,
+        )
+
+    def _prepare_scoring_image(
+        self, image, original_size: int
+    ) -> tuple[bytes | None, str | None]:
+        if self._scoring_preprocessor is None:
+            return None, None
+        try:
+            return self._scoring_preprocessor.prepare(image, original_size)
+        except RuntimeError as exc:
+            logger.warning("Scoring preprocessing failed, sending original: %s", exc)
+            return None, None
+
+    def _load_for_scoring(self, content: bytes, content_type: str) -> tuple[bytes, str]:
+        image = decode_image(content) if self._scoring_preprocessor else None
+        if image is None:
+            return content, content_type
+        scoring_content, scoring_content_type = self._prepare_scoring_image(
+            image, len(content)
+        )
+        if scoring_content is None:
+            return content, content_type
+        return scoring_content, scoring_content_type
+
+    def _remember(self, row: dict, analysis: PhotoAnalysis) -> None:
+        if self._dedup_index is None:
+            return
+        self._dedup_index.add(
+            DedupEntry(
+                photo_id=row["id"],
+                storage_path=row["storage_path"],
+                content_sha256=analysis.content_sha256,
+                phash=analysis.phash,
+                score=row.get("score"),
+                status=row.get("status", "scored"),
+                added_at=time.monotonic(),
             )
-        except Exception as exc:
-            logger.warning("Gemini scoring failed: %s", exc)
+        )
+
+    async def _upload(self, photo: IncomingPhoto) -> str:
+        return await asyncio.to_thread(self._storage_service.upload_photo, photo)
+
+    def _spawn_derivatives(self, photo: IncomingPhoto, row: dict) -> None:
+        if self._derivative_generator is None:
+            return
+        photo.retain()
+        task = asyncio.create_task(self._derive(photo, row["id"], row["storage_path"]))
+        self._derive_tasks.add(task)
+        task.add_done_callback(self._derive_tasks.discard)
+
+    async def _derive(self, photo: IncomingPhoto, photo_id: str, storage_path: str) -> None:
+        # Runs after the response: the row is inserted with
+        # has_derivatives=false (the gallery serves the original until then)
+        # and flagged once both WebP copies are stored.
+        started = time.perf_counter()
+        try:
+            rendered = await self._derivative_generator.render(photo)
+            if rendered is None:
+                return
+            if not await self._derivative_generator.store(storage_path, rendered):
+                return
+            await asyncio.to_thread(self._photo_repo.mark_derivatives, photo_id)
+        except RuntimeError:
+            logger.exception("Derivative update failed for %s", photo_id)
+        finally:
+            photo.close()
+            metrics.UPLOAD_STAGE_SECONDS.observe(time.perf_counter() - started, "derivatives")
+
+    async def _scoring_payload(
+        self, photo: IncomingPhoto, analysis: PhotoAnalysis
+    ) -> tuple[bytes, str]:
+        if analysis.scoring_content is not None:
+            return analysis.scoring_content, analysis.scoring_content_type
+        return await asyncio.to_thread(photo.read_bytes), photo.content_type
+
+    async def _submit_background(
+        self, timer: StageTimer, photo: IncomingPhoto, analysis: PhotoAnalysis
+    ) -> dict:
+        storage_path = await timer.track("upload", self._upload(photo))
+        with timer.stage("insert"):
+            row = await asyncio.to_thread(
+                self._photo_repo.insert_photo,
+                storage_path=storage_path,
+                score=None,
+                status="pending",
+                content_sha256=analysis.content_sha256,
+                phash=analysis.phash,
+                quality=_quality_payload(analysis),
+                scoring_owner=self._owner,
+            )
+        self._remember(row, analysis)
+        self._spawn_derivatives(photo, row)
+        with timer.stage("enqueue"):
+            content, content_type = await self._scoring_payload(photo, analysis)
+            await self._enqueue(
+                ScoringJob(
+                    photo_id=row["id"],
+                    storage_path=storage_path,
+                    content=content,
+                    content_type=content_type,
+                )
+            )
+        return UploadResponse(
+            id=row["id"],
+            storage_path=row["storage_path"],
+            status="pending",
+            quality=analysis.quality,
+        ).model_dump()
+
+    async def _submit_inline(
+        self,
+        timer: StageTimer,
+        photo: IncomingPhoto,
+        analysis: PhotoAnalysis,
+        decision: PreScoreDecision = "gemini",
+    ) -> dict:
+        # Upload, scoring and the threshold lookup only need the raw bytes, so
+        # they run side by side and the insert waits for the first two.
+        # Derivatives are rendered after the response.
+        upload_task = asyncio.create_task(timer.track("upload", self._upload(photo)))
+        if decision == "gemini":
+            score_task = asyncio.create_task(
+                timer.track("score", self._score_photo(photo, analysis))
+            )
+            score_source = "gemini"
+        else:
+            # Clear rejects and clear accepts keep their local score and never
+            # reach Gemini.
+            score_task = asyncio.create_task(_resolved(analysis.quality.local_score))
+            score_source = "local"
+        threshold_task = asyncio.create_task(
+            timer.track("threshold", asyncio.to_thread(self._photo_repo.get_threshold))
+        )
+        try:
+            storage_path = await upload_task
+        except BaseException:
+            for task in (score_task, threshold_task):
+                task.cancel()
+            await asyncio.gather(score_task, threshold_task, return_exceptions=True)
+            raise
+
+        try:
+            score = await score_task
+            with timer.stage("insert"):
+                row = await asyncio.to_thread(
+                    self._photo_repo.insert_photo,
+                    storage_path=storage_path,
+                    score=score,
+                    status="scored" if score is not None else "failed",
+                    content_sha256=analysis.content_sha256,
+                    phash=analysis.phash,
+                    score_source=score_source if score is not None else None,
+                    quality=_quality_payload(analysis),
+                )
+            self._remember(row, analysis)
+            self._spawn_derivatives(photo, row)
+            threshold = await threshold_task
+        except BaseException:
+            threshold_task.cancel()
+            await asyncio.gather(threshold_task, return_exceptions=True)
+            raise
 
-        row = self._photo_repo.insert_photo(storage_path=storage_path, score=score)
-        threshold = self._photo_repo.get_threshold()
         url = None
         if score is not None and score >= threshold:
-            url = self._storage_service.get_url(storage_path)
+            with timer.stage("url"):
+                url = await asyncio.to_thread(
+                    self._storage_service.get_url, storage_path
+                )
 
         return UploadResponse(
             id=row["id"],
             storage_path=row["storage_path"],
             score=row.get("score"),
             url=url,
+            status=row.get("status", "scored"),
+            score_source=score_source if score is not None else None,
+            quality=analysis.quality,
         ).model_dump()
+
+    async def _score_photo(
+        self, photo: IncomingPhoto, analysis: PhotoAnalysis
+    ) -> float | None:
+        content, content_type = await self._scoring_payload(photo, analysis)
+        return await self._score(content, content_type)
+
+    async def _score(self, content: bytes, content_type: str) -> float | None:
+        try:
+            return await self._gemini_scorer.score_image(
+                image_bytes=content,
+                content_type=content_type,
+            )
+        except Exception as exc:
+            logger.warning("Gemini scoring failed: %s", exc)
+            return None
+
+    async def _enqueue(self, job: ScoringJob) -> None:
+        self._scoring_ids.add(job.photo_id)
+        try:
+            await self._scoring_queue.enqueue(job)
+        except BaseException:
+            self._scoring_ids.discard(job.photo_id)
+            raise
+
+    async def _score_job(self, job: ScoringJob) -> None:
+        try:
+            await self._score_claimed(job)
+        finally:
+            self._scoring_ids.discard(job.photo_id)
+
+    async def _score_claimed(self, job: ScoringJob) -> None:
+        # Renews the claim right before the Gemini call; a job that sat in
+        # the queue past its lease may have been taken over by another process.
+        claimed = await asyncio.to_thread(
+            self._photo_repo.claim_scoring, job.photo_id, self._owner, self._lease_seconds
+        )
+        if not claimed:
+            logger.info("Photo %s is scored or claimed elsewhere; skipping", job.photo_id)
+            return
+        score = await self._score(job.content, job.content_type)
+        status = "scored" if score is not None else "failed"
+        row = await asyncio.to_thread(
+            self._photo_repo.record_score,
+            photo_id=job.photo_id,
+            score=score,
+            status=status,
+            score_source="gemini" if score is not None else None,
+            claimed_by=self._owner,
+        )
+        if row is None:
+            logger.warning("Lost the scoring claim on photo %s; result dropped", job.photo_id)
+            return
+        self.record_score(job.photo_id, score, status)
+
+    async def _warm_dedup_index(self) -> None:
+        window = self._dedup_index.window_seconds
+        since = datetime.now(timezone.utc) - timedelta(seconds=window)
+        try:
+            rows = await asyncio.to_thread(
+                self._photo_repo.list_recent_hashes,
+                since.isoformat(),
+                self._dedup_index.max_entries,
+            )
+        except RuntimeError:
+            logger.exception("Dedup index warm-up failed")
+            return
+
+        now_wall = datetime.now(timezone.utc)
+        now_mono = time.monotonic()
+        for row in reversed(rows):
+            created = datetime.fromisoformat(row["created_at"])
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+            self._dedup_index.add(
+                DedupEntry(
+                    photo_id=row["id"],
+                    storage_path=row["storage_path"],
+                    content_sha256=row["content_sha256"],
+                    phash=row.get("phash"),
+                    score=row.get("score"),
+                    status=row.get("status", "scored"),
+                    added_at=now_mono - (now_wall - created).total_seconds(),
+                )
+            )
+        logger.info("Dedup index warmed with %d recent photos", len(rows))
+
+    async def _requeue_pending(self) -> None:
+        # Jobs live in memory only, so rows left pending by a restart (ours or
+        # another process's) are claimed, re-downloaded and scored again.
+        # Claims from a crashed process only expire after the lease, so the
+        # sweep repeats once per lease.
+        while True:
+            await self._requeue_unclaimed()
+            await asyncio.sleep(self._lease_seconds)
+
+    async def _requeue_unclaimed(self) -> None:
+        try:
+            rows = await asyncio.to_thread(
+                self._photo_repo.list_unclaimed_pending, self._lease_seconds, _RECOVER_BATCH
+            )
+        except RuntimeError:
+            logger.exception("Pending photo lookup failed")
+            return
+
+        requeued = 0
+        for row in rows:
+            if row["id"] in self._scoring_ids:
+                continue
+            try:
+                claimed = await asyncio.to_thread(
+                    self._photo_repo.claim_scoring,
+                    row["id"],
+                    self._owner,
+                    self._lease_seconds,
+                )
+            except RuntimeError:
+                logger.exception("Pending photo claim failed: %s", row["id"])
+                continue
+            if not claimed:
+                continue
+            try:
+                content = await asyncio.to_thread(
+                    self._storage_service.download_bytes, row["storage_path"]
+                )
+            except RuntimeError:
+                logger.exception("Pending photo download failed: %s", row["id"])
+                continue
+            content, content_type = await asyncio.to_thread(
+                self._load_for_scoring,
+                content,
+                _guess_content_type(row["storage_path"]),
+            )
+            await self._enqueue(
+                ScoringJob(
+                    photo_id=row["id"],
+                    storage_path=row["storage_path"],
+                    content=content,
+                    content_type=content_type,
+                )
+            )
+            requeued += 1
+        if requeued:
+            logger.info("Requeued %d pending photos for scoring", requeued)
+
+
+async def _resolved(value: float) -> float:
+    return value
+
+
+def _quality_payload(analysis: PhotoAnalysis) -> dict | None:
+    if analysis.quality is None:
+        return None
+    return analysis.quality.model_dump()
+
+
+def _guess_content_type(storage_path: str) -> str:
+    ext = storage_path.rsplit(".", 1)[-1].lower() if "." in storage_path else ""
+    if ext in ("jpg", "jpeg"):
+        return "image/jpeg"
+    if ext:
+        return f"image/{ext}"
+    return "image/jpeg"
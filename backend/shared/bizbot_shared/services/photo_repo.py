@@ -1,12 +1,69 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import httpx
+from postgrest.exceptions import APIError
 from supabase import Client, create_client
 
+from bizbot_shared.core import metrics
 from bizbot_shared.core.config import Settings
 
+_PHOTO_COLUMNS = "id, storage_path, score, status, has_derivatives, created_at"
+
+logger = logging.getLogger("bizbot_photo_repo")
+
+_timed = metrics.instrument(metrics.REPO_SECONDS, metrics.REPO_IN_FLIGHT, metrics.REPO_ERRORS)
+
+
+# Perceptual hashes are unsigned 64-bit values; Postgres bigint is signed.
+def _to_bigint(value: int | None) -> int | None:
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_bigint(value: int | None) -> int | None:
+    if value is None:
+        return None
+    return int(value) + (1 << 64) if int(value) < 0 else int(value)
+
+
+def _utc_iso(offset_seconds: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).isoformat()
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps({"c": row["created_at"], "i": row["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at, photo_id = payload["c"], payload["i"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(photo_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, photo_id
+
 
 class PhotoRepo:
     def __init__(self, settings: Settings) -> None:
         self._settings = settings
         self._client: Client | None = None
+        self._threshold_lock = threading.Lock()
+        # (value, monotonic expiry, invalidation stamp seen at fetch time)
+        self._threshold_cache: tuple[float, float, int] | None = None
+        self._threshold_listeners: list[Callable[[float], None]] = []
 
     def _client_instance(self) -> Client:
         if self._client is None:
@@ -19,6 +76,17 @@ class PhotoRepo:
                 raise RuntimeError(str(exc)) from exc
         return self._client
 
+    @staticmethod
+    def _execute(query):
+        # postgrest raises its own errors for non-2xx responses; callers
+        # expect RuntimeError, which the routers turn into a 502.
+        try:
+            return query.execute()
+        except APIError as exc:
+            raise RuntimeError(exc.message or str(exc)) from exc
+        except httpx.HTTPError as exc:
+            raise RuntimeError(str(exc)) from exc
+
     @staticmethod
     def _ensure_ok(response) -> list[dict]:
         error = getattr(response, "error", None)
@@ -28,95 +96,270 @@ class PhotoRepo:
         data = getattr(response, "data", None)
         return data or []
 
-    def insert_photo(self, storage_path: str, score: float | None) -> dict:
-        payload = {"storage_path": storage_path, "score": score}
-        res = self._client_instance().table("photos").insert(payload).execute()
+    @_timed
+    def insert_photo(
+        self,
+        storage_path: str,
+        score: float | None,
+        status: str = "scored",
+        content_sha256: str | None = None,
+        phash: int | None = None,
+        score_source: str | None = None,
+        quality: dict | None = None,
+        scoring_owner: str | None = None,
+    ) -> dict:
+        payload = {
+            "storage_path": storage_path,
+            "score": score,
+            "status": status,
+            "content_sha256": content_sha256,
+            "phash": _to_bigint(phash),
+            "score_source": score_source,
+            "quality": quality,
+        }
+        if scoring_owner is not None:
+            # Inserted already claimed, so another process's recovery pass
+            # doesn't pick up a row this one is about to score.
+            payload["scoring_owner"] = scoring_owner
+            payload["scoring_claimed_at"] = _utc_iso()
+        res = self._execute(self._client_instance().table("photos").insert(payload))
         data = self._ensure_ok(res)
         if not data:
             raise RuntimeError("Failed to insert photo")
         return data[0]
 
+    @_timed
     def get_photo(self, photo_id: str) -> dict | None:
-        res = (
+        res = self._execute(
             self._client_instance()
             .table("photos")
-            .select("id, storage_path, score")
+            .select(_PHOTO_COLUMNS)
             .eq("id", photo_id)
             .limit(1)
-            .execute()
         )
         data = self._ensure_ok(res)
         return data[0] if data else None
 
-    def list_photos(self, limit: int, offset: int) -> list[dict]:
-        end = offset + limit - 1
-        res = (
+    @staticmethod
+    def _paginate(query, limit: int, offset: int, cursor: str | None):
+        # Keyset pages follow (created_at, id) descending so new uploads never
+        # shift rows between pages; offset paging is kept for old clients.
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if cursor is None:
+            return query.range(offset, offset + limit - 1)
+        created_at, photo_id = decode_cursor(cursor)
+        created = json.dumps(created_at)
+        return query.or_(
+            f"created_at.lt.{created},"
+            f"and(created_at.eq.{created},id.lt.{json.dumps(photo_id)})"
+        ).limit(limit)
+
+    @_timed
+    def list_photos(
+        self, limit: int, offset: int = 0, cursor: str | None = None
+    ) -> list[dict]:
+        query = self._client_instance().table("photos").select(_PHOTO_COLUMNS)
+        res = self._execute(self._paginate(query, limit, offset, cursor))
+        return self._ensure_ok(res)
+
+    @_timed
+    def list_public_photos(
+        self,
+        threshold: float,
+        limit: int,
+        offset: int = 0,
+        cursor: str | None = None,
+    ) -> list[dict]:
+        query = (
             self._client_instance()
             .table("photos")
-            .select("id, storage_path, score")
-            .order("id", desc=True)
-            .range(offset, end)
-            .execute()
+            .select(_PHOTO_COLUMNS)
+            .gte("score", threshold)
         )
+        res = self._execute(self._paginate(query, limit, offset, cursor))
         return self._ensure_ok(res)
 
-    def list_public_photos(self, threshold: float, limit: int, offset: int) -> list[dict]:
-        end = offset + limit - 1
-        res = (
+    @_timed
+    def list_recent_hashes(self, since: str, limit: int) -> list[dict]:
+        res = self._execute(
             self._client_instance()
             .table("photos")
-            .select("id, storage_path, score")
-            .gte("score", threshold)
-            .order("id", desc=True)
-            .range(offset, end)
-            .execute()
+            .select(f"{_PHOTO_COLUMNS}, content_sha256, phash")
+            .gte("created_at", since)
+            .not_.is_("content_sha256", "null")
+            .order("created_at", desc=True)
+            .limit(limit)
+        )
+        rows = self._ensure_ok(res)
+        for row in rows:
+            row["phash"] = _from_bigint(row.get("phash"))
+        return rows
+
+    @_timed
+    def list_unclaimed_pending(self, lease_seconds: float, limit: int) -> list[dict]:
+        # Pending rows nobody holds a live claim on: never claimed, or the
+        # claimant stopped renewing (crashed or was restarted).
+        expired = json.dumps(_utc_iso(-lease_seconds))
+        res = self._execute(
+            self._client_instance()
+            .table("photos")
+            .select(_PHOTO_COLUMNS)
+            .eq("status", "pending")
+            .or_(f"scoring_claimed_at.is.null,scoring_claimed_at.lt.{expired}")
+            .order("created_at")
+            .limit(limit)
         )
         return self._ensure_ok(res)
 
-    def update_score(self, photo_id: str, score: float) -> dict | None:
-        res = (
+    @_timed
+    def claim_scoring(self, photo_id: str, owner: str, lease_seconds: float) -> bool:
+        # Conditional update, so only one process wins a row: it must still be
+        # pending and either be ours already (renewing) or have no live claim.
+        expired = json.dumps(_utc_iso(-lease_seconds))
+        res = self._execute(
+            self._client_instance()
+            .table("photos")
+            .update({"scoring_owner": owner, "scoring_claimed_at": _utc_iso()})
+            .eq("id", photo_id)
+            .eq("status", "pending")
+            .or_(
+                f"scoring_owner.eq.{json.dumps(owner)},"
+                f"scoring_claimed_at.is.null,"
+                f"scoring_claimed_at.lt.{expired}"
+            )
+        )
+        return bool(self._ensure_ok(res))
+
+    @_timed
+    def mark_derivatives(self, photo_id: str) -> None:
+        res = self._execute(
             self._client_instance()
             .table("photos")
-            .update({"score": score})
+            .update({"has_derivatives": True})
             .eq("id", photo_id)
-            .execute()
         )
+        self._ensure_ok(res)
+
+    def update_score(self, photo_id: str, score: float) -> dict | None:
+        return self.record_score(
+            photo_id=photo_id, score=score, status="scored", score_source="admin"
+        )
+
+    @_timed
+    def record_score(
+        self,
+        photo_id: str,
+        score: float | None,
+        status: str,
+        score_source: str | None = None,
+        claimed_by: str | None = None,
+    ) -> dict | None:
+        payload = {"score": score, "status": status, "score_source": score_source}
+        query = self._client_instance().table("photos").update(payload).eq("id", photo_id)
+        if claimed_by is not None:
+            # Background results only land while the claim is still ours.
+            query = query.eq("status", "pending").eq("scoring_owner", claimed_by)
+        res = self._execute(query)
         data = self._ensure_ok(res)
         return data[0] if data else None
 
+    @_timed
     def delete_photo(self, photo_id: str) -> None:
-        res = (
+        res = self._execute(
             self._client_instance()
             .table("photos")
             .delete()
             .eq("id", photo_id)
-            .execute()
         )
         self._ensure_ok(res)
 
     def get_threshold(self) -> float:
-        res = (
+        stamp = self._threshold_stamp()
+        cached = self._threshold_cache
+        if cached is not None:
+            value, expires_at, cached_stamp = cached
+            if time.monotonic() < expires_at and stamp == cached_stamp:
+                metrics.THRESHOLD_LOOKUPS.inc("hit")
+                return value
+
+        with self._threshold_lock:
+            cached = self._threshold_cache
+            if cached is not None:
+                value, expires_at, cached_stamp = cached
+                if time.monotonic() < expires_at and stamp == cached_stamp:
+                    metrics.THRESHOLD_LOOKUPS.inc("hit")
+                    return value
+            metrics.THRESHOLD_LOOKUPS.inc("miss")
+            value = self._fetch_threshold()
+            self._cache_threshold(value, stamp)
+            return value
+
+    @_timed
+    def _fetch_threshold(self) -> float:
+        res = self._execute(
             self._client_instance()
             .table("settings")
             .select("threshold")
             .eq("key", "photo_threshold")
             .limit(1)
-            .execute()
         )
         data = self._ensure_ok(res)
         if not data:
             return float(self._settings.default_threshold)
         return float(data[0]["threshold"])
 
+    @_timed
     def set_threshold(self, threshold: float) -> float:
         payload = {"key": "photo_threshold", "threshold": threshold}
-        res = (
+        res = self._execute(
             self._client_instance()
             .table("settings")
             .upsert(payload, on_conflict="key")
-            .execute()
         )
         data = self._ensure_ok(res)
-        if not data:
-            return float(threshold)
-        return float(data[0]["threshold"])
+        value = float(data[0]["threshold"]) if data else float(threshold)
+
+        self._touch_threshold_stamp()
+        with self._threshold_lock:
+            self._cache_threshold(value, self._threshold_stamp())
+        for listener in list(self._threshold_listeners):
+            try:
+                listener(value)
+            except Exception:
+                logger.exception("Threshold listener failed")
+        return value
+
+    def invalidate_threshold(self) -> None:
+        with self._threshold_lock:
+            self._threshold_cache = None
+
+    def add_threshold_listener(self, listener: Callable[[float], None]) -> None:
+        self._threshold_listeners.append(listener)
+
+    def _cache_threshold(self, value: float, stamp: int) -> None:
+        ttl = self._settings.threshold_cache_seconds
+        if ttl <= 0:
+            self._threshold_cache = None
+            return
+        self._threshold_cache = (value, time.monotonic() + ttl, stamp)
+
+    # Workers on one host share a marker file: set_threshold touches it and
+    # every worker drops its cached value once the mtime moves. Workers on
+    # other hosts fall back to the TTL as their staleness bound.
+    def _threshold_stamp(self) -> int:
+        marker = self._settings.threshold_invalidation_file
+        if not marker:
+            return 0
+        try:
+            return os.stat(marker).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _touch_threshold_stamp(self) -> None:
+        marker = self._settings.threshold_invalidation_file
+        if not marker:
+            return
+        try:
+            Path(marker).touch()
+        except OSError:
+            logger.exception("Threshold invalidation marker update failed")
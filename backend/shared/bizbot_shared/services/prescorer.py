@@ -0,0 +1,94 @@
+import threading
+from typing import Literal
+
+import cv2
+import numpy as np
+
+from bizbot_shared.schemas.photos import QualityMetrics
+from bizbot_shared.services.image_ops import resize_max_edge, to_gray
+
+PreScoreDecision = Literal["reject", "accept", "gemini"]
+
+# Sharpness is measured on a fixed-size copy so the Laplacian variance does
+# not depend on the camera resolution.
+_ANALYSIS_EDGE = 640
+
+
+class LocalPreScorer:
+    def __init__(
+        self,
+        reject_below: float,
+        accept_above: float | None,
+        min_edge: int,
+        sharpness_floor: float,
+        sharpness_target: float,
+        clip_tolerance: float,
+        clip_limit: float,
+    ) -> None:
+        self._reject_below = reject_below
+        self._accept_above = accept_above
+        self._min_edge = min_edge
+        self._sharpness_floor = sharpness_floor
+        self._sharpness_target = sharpness_target
+        self._clip_tolerance = clip_tolerance
+        self._clip_limit = clip_limit
+        self._lock = threading.Lock()
+        self._counts = {"reject": 0, "accept": 0, "gemini": 0}
+
+    def measure(self, image: np.ndarray) -> QualityMetrics:
+        height, width = image.shape[:2]
+        gray = to_gray(resize_max_edge(image, _ANALYSIS_EDGE))
+
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        hist = np.bincount(gray.ravel(), minlength=256)
+        total = float(gray.size)
+        clipped_dark = float(hist[:8].sum()) / total
+        clipped_bright = float(hist[248:].sum()) / total
+
+        sharp_part = np.clip(
+            (sharpness - self._sharpness_floor)
+            / max(self._sharpness_target - self._sharpness_floor, 1e-6),
+            0.0,
+            1.0,
+        )
+        clip_penalty = np.clip(
+            (clipped_dark + clipped_bright - self._clip_tolerance)
+            / max(self._clip_limit - self._clip_tolerance, 1e-6),
+            0.0,
+            1.0,
+        )
+        resolution_part = min(1.0, min(width, height) / max(self._min_edge, 1))
+        local_score = float(sharp_part * (1.0 - clip_penalty) * resolution_part)
+
+        return QualityMetrics(
+            sharpness=round(sharpness, 2),
+            clipped_dark=round(clipped_dark, 4),
+            clipped_bright=round(clipped_bright, 4),
+            mean_brightness=round(float(gray.mean()), 2),
+            width=width,
+            height=height,
+            local_score=round(local_score, 4),
+        )
+
+    def decide(self, metrics: QualityMetrics) -> PreScoreDecision:
+        if metrics.local_score < self._reject_below:
+            decision: PreScoreDecision = "reject"
+        elif self._accept_above is not None and metrics.local_score >= self._accept_above:
+            decision = "accept"
+        else:
+            decision = "gemini"
+        with self._lock:
+            self._counts[decision] += 1
+        return decision
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        avoided = counts["reject"] + counts["accept"]
+        return {
+            "rejected": counts["reject"],
+            "accepted": counts["accept"],
+            "sent_to_gemini": counts["gemini"],
+            "avoided_fraction": round(avoided / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("bizbot_scoring_queue")
+
+
+@dataclass(frozen=True)
+class ScoringJob:
+    photo_id: str
+    storage_path: str
+    content: bytes
+    content_type: str
+
+
+class ScoringQueue:
+    def __init__(self, workers: int, maxsize: int) -> None:
+        self._worker_count = max(1, workers)
+        self._queue: asyncio.Queue[ScoringJob] = asyncio.Queue(maxsize=maxsize)
+        self._workers: list[asyncio.Task] = []
+        self._in_flight = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def start(self, handler: Callable[[ScoringJob], Awaitable[None]]) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._run(handler), name=f"scoring-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+        logger.info("Started %d scoring workers", self._worker_count)
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if self._queue.qsize():
+            logger.warning(
+                "Scoring queue stopped with %d jobs left pending", self._queue.qsize()
+            )
+
+    async def enqueue(self, job: ScoringJob) -> None:
+        # Blocks when the queue is full so uploads apply backpressure instead of
+        # growing memory without bound.
+        await self._queue.put(job)
+
+    async def _run(self, handler: Callable[[ScoringJob], Awaitable[None]]) -> None:
+        while True:
+            job = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await handler(job)
+            except Exception:
+                logger.exception("Scoring job failed for photo %s", job.photo_id)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
@@ -1,16 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from io import BufferedReader
 from pathlib import Path
+from urllib.parse import quote
 from uuid import uuid4
 
 from supabase import Client, create_client
 
+from bizbot_shared.core import metrics
 from bizbot_shared.core.config import Settings
+from bizbot_shared.services.ingest import IncomingPhoto
+
+_timed = metrics.instrument(
+    metrics.STORAGE_SECONDS, metrics.STORAGE_IN_FLIGHT, metrics.STORAGE_ERRORS
+)
+
+
+class SignedUrlCache:
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, storage_path: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(storage_path)
+            if entry is None:
+                return None
+            url, reuse_until = entry
+            if time.monotonic() >= reuse_until:
+                del self._entries[storage_path]
+                return None
+            self._entries.move_to_end(storage_path)
+            return url
+
+    def put(self, storage_path: str, url: str, reuse_until: float) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[storage_path] = (url, reuse_until)
+            self._entries.move_to_end(storage_path)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, storage_path: str) -> None:
+        with self._lock:
+            self._entries.pop(storage_path, None)
 
 
 class StorageService:
     def __init__(self, settings: Settings) -> None:
         self._settings = settings
         self._client: Client | None = None
+        self._url_cache = SignedUrlCache(settings.signed_url_cache_size)
 
     def _client_instance(self) -> Client:
         if self._client is None:
@@ -37,35 +81,129 @@ class StorageService:
         return f"{timestamp}_{uuid4().hex}{ext}"
 
     def get_url(self, storage_path: str) -> str:
-        client = self._client_instance()
-        bucket = self._settings.supabase_bucket
+        return self.get_urls([storage_path])[storage_path]
+
+    @_timed
+    def get_urls(self, storage_paths: list[str]) -> dict[str, str]:
         if self._settings.supabase_public_bucket:
-            return client.storage.from_(bucket).get_public_url(storage_path)
-        signed = client.storage.from_(bucket).create_signed_url(
-            storage_path, self._settings.supabase_signed_url_seconds
+            return {path: self._public_url(path) for path in storage_paths}
+
+        urls: dict[str, str] = {}
+        missing: list[str] = []
+        for path in storage_paths:
+            cached = self._url_cache.get(path)
+            if cached is None:
+                missing.append(path)
+            else:
+                urls[path] = cached
+        if missing:
+            urls.update(self._sign_urls(list(dict.fromkeys(missing))))
+        return urls
+
+    def _public_url(self, storage_path: str) -> str:
+        base = self._settings.supabase_url.rstrip("/")
+        bucket = quote(self._settings.supabase_bucket)
+        return f"{base}/storage/v1/object/public/{bucket}/{quote(storage_path)}"
+
+    @_timed
+    def _sign_urls(self, storage_paths: list[str]) -> dict[str, str]:
+        expires_in = self._settings.supabase_signed_url_seconds
+        # Reuse a signed URL until shortly before it lapses so clients that
+        # fetch it late still get a working link.
+        margin = min(
+            self._settings.signed_url_refresh_margin_seconds, expires_in // 2
         )
+        reuse_until = time.monotonic() + expires_in - margin
+        bucket = self._client_instance().storage.from_(self._settings.supabase_bucket)
+        try:
+            signed = bucket.create_signed_urls(storage_paths, expires_in)
+        except Exception as exc:
+            raise RuntimeError(str(exc)) from exc
         if isinstance(signed, dict) and signed.get("error"):
             raise RuntimeError(signed["error"]["message"])
-        return signed.get("signedURL")
+
+        urls: dict[str, str] = {}
+        for item in signed:
+            path = item.get("path")
+            url = item.get("signedURL")
+            if not path or not url or item.get("error"):
+                continue
+            urls[path] = url
+            self._url_cache.put(path, url, reuse_until)
+        for path in storage_paths:
+            if path not in urls:
+                raise RuntimeError(f"Failed to sign URL for {path}")
+        return urls
 
     def upload_image_bytes(
         self, content: bytes, content_type: str, original_name: str | None
+    ) -> str:
+        return self._upload(content, content_type, original_name)
+
+    @_timed
+    def upload_object(self, storage_path: str, content: bytes, content_type: str) -> None:
+        client = self._client_instance()
+        try:
+            res = client.storage.from_(self._settings.supabase_bucket).upload(
+                storage_path,
+                content,
+                {"content-type": content_type, "upsert": "true"},
+            )
+        except Exception as exc:
+            raise RuntimeError(str(exc)) from exc
+        if isinstance(res, dict) and res.get("error"):
+            raise RuntimeError(res["error"]["message"])
+
+    def upload_photo(self, photo: IncomingPhoto) -> str:
+        # Spooled photos are passed as an open file so the storage client
+        # streams them from disk instead of loading them into memory.
+        with photo.body() as body:
+            return self._upload(body, photo.content_type, photo.original_name)
+
+    @_timed
+    def _upload(
+        self,
+        body: bytes | BufferedReader,
+        content_type: str,
+        original_name: str | None,
     ) -> str:
         storage_path = self._make_filename(original_name, content_type)
         client = self._client_instance()
 
-        res = client.storage.from_(self._settings.supabase_bucket).upload(
-            storage_path,
-            content,
-            {"content-type": content_type},
-        )
+        try:
+            res = client.storage.from_(self._settings.supabase_bucket).upload(
+                storage_path,
+                body,
+                {"content-type": content_type},
+            )
+        except Exception as exc:
+            raise RuntimeError(str(exc)) from exc
         if isinstance(res, dict) and res.get("error"):
             raise RuntimeError(res["error"]["message"])
 
         return storage_path
 
+    @_timed
+    def download_bytes(self, storage_path: str) -> bytes:
+        client = self._client_instance()
+        try:
+            return client.storage.from_(self._settings.supabase_bucket).download(
+                storage_path
+            )
+        except Exception as exc:
+            raise RuntimeError(str(exc)) from exc
+
     def delete_object(self, storage_path: str) -> None:
+        self.delete_objects([storage_path])
+
+    @_timed
+    def delete_objects(self, storage_paths: list[str]) -> None:
         client = self._client_instance()
-        res = client.storage.from_(self._settings.supabase_bucket).remove([storage_path])
+        try:
+            res = client.storage.from_(self._settings.supabase_bucket).remove(storage_paths)
+        except Exception as exc:
+            raise RuntimeError(str(exc)) from exc
+        for storage_path in storage_paths:
+            self._url_cache.discard(storage_path)
         if isinstance(res, dict) and res.get("error"):
             raise RuntimeError(res["error"]["message"])
@@ -0,0 +1,8 @@
+-- Scoring status for background scoring (SCORING_MODE=background).
+alter table photos
+  add column if not exists status text not null default 'scored'
+  check (status in ('pending', 'scored', 'failed'));
+
+update photos set status = 'failed' where score is null and status = 'scored';
+
+create index if not exists photos_pending_idx on photos (status) where status = 'pending';
@@ -0,0 +1,30 @@
+-- Keyset pagination for /images and /admin/photos orders by (created_at, id).
+-- A table that predates created_at gets it backfilled from each photo's
+-- upload time in Storage (bucket 'images'; change it if SUPABASE_BUCKET
+-- differs). Rows without a Storage object get the migration time and are
+-- ordered by id among themselves.
+do $$
+begin
+  if not exists (
+    select 1 from information_schema.columns
+    where table_schema = 'public' and table_name = 'photos' and column_name = 'created_at'
+  ) then
+    alter table photos add column created_at timestamptz;
+
+    update photos p
+       set created_at = o.created_at
+      from storage.objects o
+     where o.bucket_id = 'images'
+       and o.name = p.storage_path;
+
+    update photos set created_at = now() where created_at is null;
+
+    alter table photos alter column created_at set default now();
+    alter table photos alter column created_at set not null;
+  end if;
+end $$;
+
+-- Serves both galleries: the public one walks it newest first and filters
+-- score >= threshold on the way, stopping once a page is full.
+create index if not exists photos_created_id_idx
+  on photos (created_at desc, id desc);
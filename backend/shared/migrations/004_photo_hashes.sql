@@ -0,0 +1,5 @@
+-- Exact and perceptual (dHash) fingerprints used to skip duplicate uploads.
+alter table photos add column if not exists content_sha256 text;
+alter table photos add column if not exists phash bigint;
+
+create index if not exists photos_content_sha256_idx on photos (content_sha256);
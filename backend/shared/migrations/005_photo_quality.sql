@@ -0,0 +1,4 @@
+-- Local quality metrics from the pre-scoring stage and where each score came from.
+alter table photos add column if not exists quality jsonb;
+alter table photos add column if not exists score_source text
+  check (score_source in ('gemini', 'local', 'admin'));
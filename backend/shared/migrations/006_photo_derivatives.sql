@@ -0,0 +1,2 @@
+-- Set once the thumbnail and display WebP copies exist next to the original.
+alter table photos add column if not exists has_derivatives boolean not null default false;
@@ -0,0 +1,5 @@
+-- Which API process is scoring a pending photo and since when. A process
+-- claims a row with a conditional update before scoring it; other
+-- processes leave it alone until the lease (SCORING_LEASE_SECONDS) runs out.
+alter table photos add column if not exists scoring_owner text;
+alter table photos add column if not exists scoring_claimed_at timestamptz;
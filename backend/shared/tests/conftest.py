@@ -0,0 +1,6 @@
+import os
+
+# bizbot_shared.core.config builds its Settings at import time. The tests
+# never reach Supabase, so any values will do.
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-key")
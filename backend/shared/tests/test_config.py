@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from bizbot_shared.core.config import Settings
+
+ENV_EXAMPLE = Path(__file__).resolve().parents[2] / "api" / ".env.example"
+
+
+def test_env_example_loads():
+    settings = Settings(_env_file=ENV_EXAMPLE)
+    assert settings.prescore_accept_above is None
+
+
+def test_blank_prescore_accept_above_is_unset(monkeypatch):
+    monkeypatch.setenv("PRESCORE_ACCEPT_ABOVE", "")
+    assert Settings().prescore_accept_above is None
+
+    monkeypatch.setenv("PRESCORE_ACCEPT_ABOVE", "0.85")
+    assert Settings().prescore_accept_above == 0.85
@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+import pytest
+
+from bizbot_shared.services import photo_dedup
+from bizbot_shared.services.image_ops import dhash, hamming_distance
+from bizbot_shared.services.photo_dedup import DedupEntry, PhotoDedupIndex
+from bizbot_shared.services.photo_repo import _from_bigint, _to_bigint
+
+
+def scene(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (640, 480), interpolation=cv2.INTER_CUBIC)
+
+
+def entry(photo_id: str, sha: str, phash: int | None, added_at: float = 0.0) -> DedupEntry:
+    return DedupEntry(
+        photo_id=photo_id,
+        storage_path=f"{photo_id}.jpg",
+        content_sha256=sha,
+        phash=phash,
+        score=0.8,
+        status="scored",
+        added_at=added_at,
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(photo_dedup, "time", fake)
+    return fake
+
+
+def test_hamming_distance():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_dhash_survives_resize_and_reencode():
+    image = scene(1)
+    ok, buffer = cv2.imencode(".jpg", cv2.resize(image, (320, 240)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+    assert ok
+    again = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+    assert 0 <= dhash(image) < 1 << 64
+    assert hamming_distance(dhash(image), dhash(again)) <= 6
+
+
+def test_dhash_separates_different_scenes():
+    assert hamming_distance(dhash(scene(1)), dhash(scene(2))) > 12
+
+
+def test_phash_bigint_round_trip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = _to_bigint(value)
+        assert -(1 << 63) <= stored < 1 << 63
+        assert _from_bigint(stored) == value
+    assert _to_bigint(None) is None and _from_bigint(None) is None
+
+
+def test_exact_hash_matches_without_phash(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    index.add(entry("a", "sha-a", None, clock.now))
+
+    assert index.find("sha-a", None).photo_id == "a"
+    assert index.find("sha-b", None) is None
+    assert index.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_near_duplicate_within_distance_picks_closest(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    index.add(entry("far", "sha-far", 0b111111, clock.now))
+    index.add(entry("near", "sha-near", 0b000001, clock.now))
+
+    assert index.find("sha-new", 0b000011).photo_id == "near"
+    assert index.find("sha-new", (1 << 64) - 1) is None
+
+
+def test_entries_expire_after_window(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    index.add(entry("old", "sha-old", 0, clock.now))
+    clock.now += 600
+    index.add(entry("new", "sha-new", 1 << 40, clock.now))
+
+    clock.now += 301
+    assert index.find("sha-old", None) is None
+    assert index.find("sha-new", None).photo_id == "new"
+    assert index.stats()["entries"] == 1
+
+
+def test_oldest_entries_are_evicted_past_capacity(clock):
+    index = PhotoDedupIndex(max_distance=0, window_seconds=900, max_entries=2)
+    for photo_id in ("a", "b", "c"):
+        index.add(entry(photo_id, f"sha-{photo_id}", None, clock.now))
+
+    assert index.find("sha-a", None) is None
+    assert index.find("sha-c", None).photo_id == "c"
+
+
+def test_update_and_discard(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    index.add(entry("a", "sha-a", 0, clock.now))
+
+    index.update("a", 0.3, "rejected")
+    match = index.find("sha-a", None)
+    assert (match.score, match.status) == (0.3, "rejected")
+
+    index.discard("a")
+    assert index.find("sha-a", 0) is None
+
+
+def test_failed_scoring_drops_the_entry(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    index.add(entry("a", "sha-a", 0, clock.now))
+    index.update("a", None, "failed")
+
+    assert index.find("sha-a", None) is None
+    assert index.find("sha-b", 1) is None
+    assert index.stats()["entries"] == 0
+
+
+def test_failed_rows_are_never_indexed(clock):
+    index = PhotoDedupIndex(max_distance=6, window_seconds=900, max_entries=10)
+    failed = entry("a", "sha-a", 0, clock.now)
+    failed.status, failed.score = "failed", None
+    index.add(failed)
+
+    assert index.find("sha-a", 0) is None
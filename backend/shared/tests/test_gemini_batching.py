@@ -0,0 +1,173 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from bizbot_shared.core.config import Settings
+from bizbot_shared.services.gemini_scorer import (
+    BatchingGeminiScorer,
+    GeminiParseError,
+    GeminiScorer,
+)
+
+
+# Images are fake: each one's bytes are the score the fake Gemini gives it.
+def image(score: float) -> tuple[bytes, str]:
+    return str(score).encode("ascii"), "image/jpeg"
+
+
+def answer_batch(scores: list[float]) -> str:
+    return json.dumps([{"index": i, "score": s} for i, s in enumerate(scores)])
+
+
+# In-process stand-in for generateContent. Single requests get a JSON score
+# for their image; batch requests get whatever `batch_reply` renders.
+class FakeGemini:
+    def __init__(self, batch_reply=None, fail_single=(), batch_status: int = 200) -> None:
+        self.batch_reply = batch_reply or answer_batch
+        self.fail_single = set(fail_single)
+        self.batch_status = batch_status
+        self.calls: list[int] = []
+        self.urls: list[str] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.urls.append(str(request.url))
+        parts = json.loads(request.content)["contents"][0]["parts"]
+        scores = [
+            float(base64.b64decode(part["inline_data"]["data"]))
+            for part in parts
+            if "inline_data" in part
+        ]
+        self.calls.append(len(scores))
+        if len(scores) > 1:
+            if self.batch_status != 200:
+                return httpx.Response(self.batch_status, text="unavailable")
+            text = self.batch_reply(scores)
+        elif scores[0] in self.fail_single:
+            text = "no idea"
+        else:
+            text = json.dumps({"score": scores[0]})
+        return httpx.Response(
+            200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        )
+
+
+def make_scorer(fake: FakeGemini) -> GeminiScorer:
+    settings = Settings(
+        supabase_url="http://supabase.invalid",
+        supabase_service_role_key="test-key",
+        gemini_api_key="test-key",
+        gemini_model="gemini-test",
+        gemini_base_url="http://gemini.invalid",
+    )
+    scorer = GeminiScorer(settings)
+    scorer._client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    return scorer
+
+
+def score_all(batcher: BatchingGeminiScorer, scores: list[float]) -> list:
+    async def run():
+        try:
+            return await asyncio.gather(
+                *(batcher.score_image(*image(s)) for s in scores), return_exceptions=True
+            )
+        finally:
+            await batcher.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '[{"index": 1, "score": 0.2}, {"index": 0, "score": 0.9}]',
+        '```json\n[{"index": 0, "score": 0.9}, {"index": 1, "score": 0.2}]\n```',
+        '{"scores": [{"index": 0, "score": 0.9}, {"index": 1, "score": 0.2}]}',
+        'Here you go: [{"index": 0, "score": 0.9}, {"index": 1, "score": 0.2}]',
+    ],
+)
+def test_batch_scores_are_parsed_by_index(text):
+    scorer = make_scorer(FakeGemini())
+    assert scorer._extract_batch_scores(text, 2) == [0.9, 0.2]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '[{"index": 0, "score": 0.9}]',
+        '[{"index": 0, "score": 0.9}, {"index": 1, "score": 1.5}]',
+        '[{"index": 0, "score": 0.9}, {"index": 2, "score": 0.2}]',
+        "not json",
+    ],
+)
+def test_incomplete_batch_scores_are_rejected(text):
+    scorer = make_scorer(FakeGemini())
+    with pytest.raises(ValueError):
+        scorer._extract_batch_scores(text, 2)
+
+
+def test_requests_use_the_configured_model():
+    fake = FakeGemini()
+    scorer = make_scorer(fake)
+
+    async def run():
+        try:
+            return await scorer.score_image(*image(0.7))
+        finally:
+            await scorer.aclose()
+
+    assert asyncio.run(run()) == 0.7
+    assert "/v1beta/models/gemini-test:generateContent" in fake.urls[0]
+
+
+def test_concurrent_photos_share_one_request():
+    fake = FakeGemini()
+    batcher = BatchingGeminiScorer(make_scorer(fake), max_batch=3, window_seconds=1.0)
+
+    assert score_all(batcher, [0.1, 0.5, 0.9]) == [0.1, 0.5, 0.9]
+    assert fake.calls == [3]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_lone_photo_is_sent_on_its_own_after_the_window():
+    fake = FakeGemini()
+    batcher = BatchingGeminiScorer(make_scorer(fake), max_batch=8, window_seconds=0.01)
+
+    assert score_all(batcher, [0.4]) == [0.4]
+    assert fake.calls == [1]
+    assert batcher.stats()["batches"] == 0
+
+
+def test_unparseable_batch_falls_back_to_single_requests():
+    fake = FakeGemini(batch_reply=lambda scores: "I like these photos")
+    batcher = BatchingGeminiScorer(make_scorer(fake), max_batch=3, window_seconds=1.0)
+
+    assert score_all(batcher, [0.1, 0.5, 0.9]) == [0.1, 0.5, 0.9]
+    assert fake.calls == [3, 1, 1, 1]
+    stats = batcher.stats()
+    assert stats["batch_fallbacks"] == 1
+    assert stats["parse_errors"] == 1
+
+
+def test_partial_batch_falls_back_and_fails_only_the_bad_photo():
+    fake = FakeGemini(
+        batch_reply=lambda scores: json.dumps([{"index": 0, "score": scores[0]}]),
+        fail_single={0.5},
+    )
+    batcher = BatchingGeminiScorer(make_scorer(fake), max_batch=3, window_seconds=1.0)
+
+    first, second, third = score_all(batcher, [0.1, 0.5, 0.9])
+    assert (first, third) == (0.1, 0.9)
+    assert isinstance(second, GeminiParseError)
+
+
+def test_transport_errors_fail_the_batch_without_fallback():
+    fake = FakeGemini(batch_status=503)
+    batcher = BatchingGeminiScorer(make_scorer(fake), max_batch=2, window_seconds=1.0)
+
+    results = score_all(batcher, [0.1, 0.5])
+    assert all(isinstance(r, RuntimeError) and not isinstance(r, GeminiParseError) for r in results)
+    assert fake.calls == [2]
+    assert batcher.stats()["batch_fallbacks"] == 0
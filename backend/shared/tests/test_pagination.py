@@ -0,0 +1,64 @@
+import base64
+import json
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from bizbot_shared.services.photo_repo import PhotoRepo, decode_cursor, encode_cursor
+
+ROW = {"id": "3f2c9a4e-1b7d-4c55-9e0a-2d8b6f1a7c33", "created_at": "2024-05-01T12:30:00.123456+00:00"}
+
+
+def photos_query():
+    # A real postgrest builder; nothing is sent until execute().
+    return SyncPostgrestClient("http://supabase.invalid/rest/v1").table("photos").select("id")
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor(ROW)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (ROW["created_at"], ROW["id"])
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+        base64.urlsafe_b64encode(json.dumps({"c": "2024-05-01"}).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps({"c": 1, "i": "x"}).encode()).decode(),
+    ],
+)
+def test_bad_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_first_page_uses_offset():
+    params = PhotoRepo._paginate(photos_query(), 10, 20, None).params
+    assert params["order"] == "created_at.desc,id.desc"
+    assert params["offset"] == "20"
+    assert params["limit"] == "10"
+    assert "or" not in params
+
+
+def test_cursor_page_quotes_filter_values():
+    params = PhotoRepo._paginate(photos_query(), 10, 0, encode_cursor(ROW)).params
+    created = f'"{ROW["created_at"]}"'
+    assert params["or"] == (
+        f"(created_at.lt.{created},"
+        f'and(created_at.eq.{created},id.lt."{ROW["id"]}"))'
+    )
+    assert params["limit"] == "10"
+    assert "offset" not in params
+
+
+def test_cursor_values_cannot_break_out_of_the_filter():
+    row = {"id": 'x",id.gt."', "created_at": "2024-05-01,id.gt.0)"}
+    params = PhotoRepo._paginate(photos_query(), 5, 0, encode_cursor(row)).params
+    # Quotes inside a value are escaped, so the whole value stays one
+    # double-quoted PostgREST literal.
+    assert params["or"] == (
+        '(created_at.lt."2024-05-01,id.gt.0)",'
+        'and(created_at.eq."2024-05-01,id.gt.0)",id.lt."x\\",id.gt.\\""))'
+    )
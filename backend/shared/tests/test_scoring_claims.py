@@ -0,0 +1,265 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from postgrest import SyncPostgrestClient
+
+from bizbot_shared.core.config import Settings
+from bizbot_shared.services.photo_pipeline import PhotoPipeline
+from bizbot_shared.services.photo_repo import PhotoRepo
+from bizbot_shared.services.scoring_queue import ScoringJob
+
+LEASE = 60.0
+
+
+# In-memory photos table with the same claim rules as PhotoRepo's
+# conditional updates: a pending row can be claimed if it is unclaimed, its
+# claim is older than the lease, or the caller already holds it; a result
+# lands only while the row is pending and claimed by the caller.
+class FakeRepo:
+    def __init__(self) -> None:
+        self.rows: dict[str, dict] = {}
+
+    def add(self, photo_id: str, status: str = "pending", owner=None, claimed_at=None) -> None:
+        self.rows[photo_id] = {
+            "id": photo_id,
+            "storage_path": f"{photo_id}.jpg",
+            "status": status,
+            "score": None,
+            "scoring_owner": owner,
+            "scoring_claimed_at": claimed_at,
+        }
+
+    def _claimable(self, row: dict, owner: str | None, lease_seconds: float) -> bool:
+        claimed_at = row["scoring_claimed_at"]
+        return row["status"] == "pending" and (
+            row["scoring_owner"] == owner
+            or claimed_at is None
+            or claimed_at < time.time() - lease_seconds
+        )
+
+    def list_unclaimed_pending(self, lease_seconds: float, limit: int) -> list[dict]:
+        rows = [r for r in self.rows.values() if self._claimable(r, None, lease_seconds)]
+        return [dict(r) for r in rows[:limit]]
+
+    def claim_scoring(self, photo_id: str, owner: str, lease_seconds: float) -> bool:
+        row = self.rows[photo_id]
+        if not self._claimable(row, owner, lease_seconds):
+            return False
+        row["scoring_owner"] = owner
+        row["scoring_claimed_at"] = time.time()
+        return True
+
+    def record_score(self, photo_id, score, status, score_source=None, claimed_by=None):
+        row = self.rows[photo_id]
+        if claimed_by is not None and (
+            row["status"] != "pending" or row["scoring_owner"] != claimed_by
+        ):
+            return None
+        row.update(score=score, status=status, score_source=score_source)
+        return dict(row)
+
+
+class FakeStorage:
+    def download_bytes(self, storage_path: str) -> bytes:
+        return storage_path.encode()
+
+
+class FakeGemini:
+    def __init__(self, score: float = 0.8, during=None) -> None:
+        self.score = score
+        self.during = during
+        self.calls: list[bytes] = []
+
+    async def score_image(self, image_bytes: bytes, content_type: str) -> float:
+        self.calls.append(image_bytes)
+        if self.during is not None:
+            self.during()
+        return self.score
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FakeQueue:
+    def __init__(self) -> None:
+        self.jobs: list[ScoringJob] = []
+
+    async def enqueue(self, job: ScoringJob) -> None:
+        self.jobs.append(job)
+
+
+def make_pipeline(repo: FakeRepo, gemini: FakeGemini | None = None, lease: float = LEASE):
+    return PhotoPipeline(
+        storage_service=FakeStorage(),
+        photo_repo=repo,
+        gemini_scorer=gemini or FakeGemini(),
+        scoring_queue=FakeQueue(),
+        scoring_lease_seconds=lease,
+    )
+
+
+def job(photo_id: str) -> ScoringJob:
+    return ScoringJob(
+        photo_id=photo_id,
+        storage_path=f"{photo_id}.jpg",
+        content=b"jpeg",
+        content_type="image/jpeg",
+    )
+
+
+def test_job_claimed_by_another_worker_is_skipped():
+    repo = FakeRepo()
+    repo.add("a", owner="other-worker", claimed_at=time.time())
+    gemini = FakeGemini()
+    pipeline = make_pipeline(repo, gemini)
+
+    asyncio.run(pipeline._score_job(job("a")))
+
+    assert gemini.calls == []
+    assert repo.rows["a"]["status"] == "pending"
+    assert repo.rows["a"]["scoring_owner"] == "other-worker"
+
+
+def test_score_is_recorded_under_the_holders_claim():
+    repo = FakeRepo()
+    repo.add("a")
+    pipeline = make_pipeline(repo)
+
+    asyncio.run(pipeline._score_job(job("a")))
+
+    row = repo.rows["a"]
+    assert (row["status"], row["score"], row["score_source"]) == ("scored", 0.8, "gemini")
+    assert row["scoring_owner"] == pipeline._owner
+
+
+def test_result_is_dropped_when_the_claim_was_taken_over():
+    repo = FakeRepo()
+    repo.add("a")
+
+    def taken_over() -> None:
+        # Our lease lapsed mid-call and another worker claimed the row.
+        repo.rows["a"].update(scoring_owner="other-worker", scoring_claimed_at=time.time())
+
+    pipeline = make_pipeline(repo, FakeGemini(during=taken_over))
+
+    asyncio.run(pipeline._score_job(job("a")))
+
+    row = repo.rows["a"]
+    assert (row["status"], row["score"]) == ("pending", None)
+    assert row["scoring_owner"] == "other-worker"
+
+
+def test_requeue_claims_unclaimed_and_expired_rows_only():
+    now = time.time()
+    repo = FakeRepo()
+    repo.add("unclaimed")
+    repo.add("live", owner="other-worker", claimed_at=now)
+    repo.add("expired", owner="crashed-worker", claimed_at=now - LEASE - 1)
+    repo.add("done", status="scored")
+    pipeline = make_pipeline(repo)
+
+    asyncio.run(pipeline._requeue_unclaimed())
+
+    queued = pipeline._scoring_queue.jobs
+    assert sorted(j.photo_id for j in queued) == ["expired", "unclaimed"]
+    assert all(j.content == f"{j.photo_id}.jpg".encode() for j in queued)
+    for photo_id in ("unclaimed", "expired"):
+        assert repo.rows[photo_id]["scoring_owner"] == pipeline._owner
+    assert repo.rows["live"]["scoring_owner"] == "other-worker"
+
+
+def test_two_workers_never_requeue_the_same_row():
+    repo = FakeRepo()
+    for i in range(20):
+        repo.add(f"p{i}")
+    first, second = make_pipeline(repo), make_pipeline(repo)
+
+    async def sweep() -> None:
+        await asyncio.gather(first._requeue_unclaimed(), second._requeue_unclaimed())
+
+    asyncio.run(sweep())
+
+    ids = [j.photo_id for p in (first, second) for j in p._scoring_queue.jobs]
+    assert sorted(ids) == sorted(repo.rows)
+
+
+def test_sweep_repeats_every_lease_and_picks_up_expired_claims():
+    repo = FakeRepo()
+    repo.add("a", owner="crashed-worker", claimed_at=time.time())
+    pipeline = make_pipeline(repo, lease=0.1)
+
+    async def run() -> None:
+        task = asyncio.create_task(pipeline._requeue_pending())
+        await asyncio.sleep(0.05)
+        assert pipeline._scoring_queue.jobs == []
+        await asyncio.sleep(0.25)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert [j.photo_id for j in pipeline._scoring_queue.jobs] == ["a"]
+    assert repo.rows["a"]["scoring_owner"] == pipeline._owner
+
+
+def test_sweep_skips_photos_already_queued_here():
+    repo = FakeRepo()
+    repo.add("a")
+    pipeline = make_pipeline(repo, lease=0.01)
+    pending = job("a")
+
+    async def run() -> None:
+        await pipeline._enqueue(pending)
+        # The queue is slow: our claim lapses before a worker gets to it.
+        repo.rows["a"]["scoring_claimed_at"] = time.time() - 1
+        await pipeline._requeue_unclaimed()
+        await pipeline._score_job(pending)
+
+    asyncio.run(run())
+
+    assert pipeline._scoring_queue.jobs == [pending]
+    assert repo.rows["a"]["status"] == "scored"
+    assert pipeline._scoring_ids == set()
+
+
+# The real repo's claim is one conditional UPDATE; check the filters it sends.
+def captured_query(monkeypatch, call) -> SimpleNamespace:
+    seen = SimpleNamespace(query=None)
+
+    def execute(query):
+        seen.query = query
+        return SimpleNamespace(data=[{"id": "a"}], error=None)
+
+    repo = PhotoRepo(
+        Settings(supabase_url="http://supabase.invalid", supabase_service_role_key="test-key")
+    )
+    repo._client = SyncPostgrestClient("http://supabase.invalid/rest/v1")
+    monkeypatch.setattr(PhotoRepo, "_execute", staticmethod(execute))
+    call(repo)
+    return seen.query
+
+
+def test_claim_scoring_is_a_conditional_update(monkeypatch):
+    owner = 'host:1:ab"cd'
+    query = captured_query(monkeypatch, lambda repo: repo.claim_scoring("a", owner, LEASE))
+
+    params = query.params
+    assert params["id"] == "eq.a"
+    assert params["status"] == "eq.pending"
+    clauses = params["or"].strip("()").split(",scoring_claimed_at")
+    assert clauses[0] == f"scoring_owner.eq.{json.dumps(owner)}"
+    assert clauses[1] == ".is.null"
+    assert clauses[2].startswith('.lt."') and clauses[2].endswith('"')
+    assert query.json["scoring_owner"] == owner
+
+
+def test_record_score_is_limited_to_the_claim_holder(monkeypatch):
+    query = captured_query(
+        monkeypatch,
+        lambda repo: repo.record_score("a", 0.9, "scored", "gemini", claimed_by="me"),
+    )
+
+    assert query.params["status"] == "eq.pending"
+    assert query.params["scoring_owner"] == "eq.me"
@@ -0,0 +1,146 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from bizbot_shared.core.config import Settings
+from bizbot_shared.services import photo_repo
+from bizbot_shared.services.photo_repo import PhotoRepo
+
+
+# Stands in for the Supabase client's `settings` table: every select counts
+# as one round trip, upserts replace the stored value.
+class FakeSettingsTable:
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.reads = 0
+        self._upsert = None
+
+    def select(self, *_):
+        self._upsert = None
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self._upsert = payload
+        return self
+
+    def eq(self, *_):
+        return self
+
+    def limit(self, *_):
+        return self
+
+    def execute(self):
+        if self._upsert is not None:
+            self.threshold = self._upsert["threshold"]
+        else:
+            self.reads += 1
+        return SimpleNamespace(data=[{"threshold": self.threshold}], error=None)
+
+
+class FakeClient:
+    def __init__(self, table: FakeSettingsTable) -> None:
+        self._table = table
+
+    def table(self, name: str):
+        assert name == "settings"
+        return self._table
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(photo_repo, "time", fake)
+    return fake
+
+
+def make_repo(table: FakeSettingsTable, **overrides) -> PhotoRepo:
+    settings = Settings(
+        supabase_url="http://supabase.invalid",
+        supabase_service_role_key="test-key",
+        **overrides,
+    )
+    repo = PhotoRepo(settings)
+    repo._client = FakeClient(table)
+    return repo
+
+
+def test_threshold_is_served_from_cache_within_ttl(clock):
+    table = FakeSettingsTable(0.6)
+    repo = make_repo(table, threshold_cache_seconds=15)
+
+    assert repo.get_threshold() == 0.6
+    clock.now += 14
+    assert repo.get_threshold() == 0.6
+    assert table.reads == 1
+
+
+def test_threshold_is_refetched_after_ttl(clock):
+    table = FakeSettingsTable(0.6)
+    repo = make_repo(table, threshold_cache_seconds=15)
+
+    repo.get_threshold()
+    table.threshold = 0.8
+    clock.now += 15
+    assert repo.get_threshold() == 0.8
+    assert table.reads == 2
+
+
+def test_zero_ttl_disables_the_cache(clock):
+    table = FakeSettingsTable(0.6)
+    repo = make_repo(table, threshold_cache_seconds=0)
+
+    repo.get_threshold()
+    repo.get_threshold()
+    assert table.reads == 2
+
+
+def test_set_threshold_writes_through_and_notifies(clock):
+    table = FakeSettingsTable(0.6)
+    repo = make_repo(table, threshold_cache_seconds=15)
+    seen = []
+    repo.add_threshold_listener(seen.append)
+
+    repo.get_threshold()
+    assert repo.set_threshold(0.9) == 0.9
+    assert repo.get_threshold() == 0.9
+    assert table.reads == 1
+    assert seen == [0.9]
+
+
+def test_marker_mtime_invalidates_other_workers(clock, tmp_path):
+    marker = tmp_path / "threshold.stamp"
+    marker.touch()
+    os.utime(marker, ns=(1_000_000_000, 1_000_000_000))
+    table = FakeSettingsTable(0.6)
+    reader = make_repo(table, threshold_cache_seconds=60, threshold_invalidation_file=str(marker))
+    writer = make_repo(table, threshold_cache_seconds=60, threshold_invalidation_file=str(marker))
+
+    assert reader.get_threshold() == 0.6
+    writer.set_threshold(0.85)
+    # Well inside the TTL, but the marker moved.
+    assert reader.get_threshold() == 0.85
+    assert table.reads == 2
+    assert reader.get_threshold() == 0.85
+    assert table.reads == 2
+
+
+def test_missing_marker_falls_back_to_ttl(clock, tmp_path):
+    table = FakeSettingsTable(0.6)
+    repo = make_repo(
+        table,
+        threshold_cache_seconds=15,
+        threshold_invalidation_file=str(tmp_path / "missing" / "threshold.stamp"),
+    )
+
+    repo.get_threshold()
+    repo.get_threshold()
+    assert table.reads == 1
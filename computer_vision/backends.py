@@ -0,0 +1,309 @@
+import importlib
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import detection
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# Same defaults as ultralytics predict(), so every backend agrees on what
+# counts as a detection.
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+_PAD_VALUE = 114
+_MAX_WH = 7680  # class offset for batched NMS
+_INSTALL_HINT = "pip install -r computer_vision/requirements-backends.txt"
+
+
+def _require(module: str):
+    # The exported backends' runtimes are optional installs.
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(f"{module} is not installed ({_INSTALL_HINT})") from exc
+
+
+# --------------------
+# PyTorch (ultralytics)
+# --------------------
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, weights: str, imgsz: int, person_class: int) -> None:
+        from ultralytics import YOLO
+
+        self._model = YOLO(weights)
+        self._imgsz = imgsz
+        self._person_class = person_class
+
+    def detect(self, frame: np.ndarray) -> detection.Detections:
+        results = self._model(frame, imgsz=self._imgsz, verbose=False)[0]
+        return detection.from_results(results, self._person_class)
+
+
+# --------------------
+# Exported models: shared pre/post-processing
+# --------------------
+def letterbox(frame: np.ndarray, imgsz: int) -> tuple[np.ndarray, float, tuple[float, float]]:
+    h, w = frame.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    padded = cv2.copyMakeBorder(
+        resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(_PAD_VALUE,) * 3
+    )
+    return padded, ratio, (left, top)
+
+
+def to_input(frame: np.ndarray, imgsz: int) -> tuple[np.ndarray, float, tuple[float, float]]:
+    padded, ratio, pad = letterbox(frame, imgsz)
+    blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)
+    return blob, ratio, pad
+
+
+def decode_output(
+    output: np.ndarray,
+    ratio: float,
+    pad: tuple[float, float],
+    frame_shape: tuple[int, ...],
+    person_class: int,
+) -> detection.Detections:
+    # YOLOv8 head: (1, 4 + classes, anchors) with cx, cy, w, h then scores.
+    preds = output[0].T
+    scores = preds[:, 4:]
+    classes = scores.argmax(axis=1)
+    conf = scores[np.arange(len(scores)), classes]
+    keep = conf > CONF_THRESHOLD
+    if not keep.any():
+        return detection.empty_detections()
+    preds, classes, conf = preds[keep], classes[keep], conf[keep]
+
+    xywh = preds[:, :4].astype(np.float32)
+    xyxy = np.empty_like(xywh)
+    xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    # Class-aware NMS in one call by shifting each class into its own area.
+    offset = classes[:, None].astype(np.float32) * _MAX_WH
+    rects = np.concatenate([xyxy[:, :2] + offset, xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+    kept = cv2.dnn.NMSBoxes(rects.tolist(), conf.tolist(), CONF_THRESHOLD, IOU_THRESHOLD)
+    kept = np.asarray(kept, dtype=np.int64).reshape(-1)
+    xyxy, classes = xyxy[kept], classes[kept]
+
+    xyxy[:, [0, 2]] -= pad[0]
+    xyxy[:, [1, 3]] -= pad[1]
+    xyxy /= ratio
+    h, w = frame_shape[:2]
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+    return detection.from_arrays(xyxy, classes, person_class)
+
+
+class _ExportedBackend:
+    name = ""
+
+    def __init__(self, imgsz: int, person_class: int) -> None:
+        self._imgsz = imgsz
+        self._person_class = person_class
+
+    def detect(self, frame: np.ndarray) -> detection.Detections:
+        blob, ratio, pad = to_input(frame, self._imgsz)
+        return decode_output(self._run(blob), ratio, pad, frame.shape, self._person_class)
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+# --------------------
+# ONNX Runtime
+# --------------------
+class OnnxBackend(_ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, model_path: str, imgsz: int, person_class: int, threads: int = 0) -> None:
+        super().__init__(imgsz, person_class)
+        ort = _require("onnxruntime")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input = self._session.get_inputs()[0].name
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input: blob})[0]
+
+
+# --------------------
+# OpenVINO
+# --------------------
+class OpenVinoBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, model_path: str, imgsz: int, person_class: int, threads: int = 0) -> None:
+        super().__init__(imgsz, person_class)
+        ov = _require("openvino")
+
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self._compiled = core.compile_model(core.read_model(model_path), "CPU", config)
+        self._output = self._compiled.output(0)
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        return self._compiled([blob])[self._output]
+
+
+# --------------------
+# Export + INT8 calibration
+# --------------------
+def calibration_frames(frames_dir: str, limit: int = 300) -> list[Path]:
+    paths = sorted(
+        p for p in Path(frames_dir).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    if not paths:
+        raise RuntimeError(f"No calibration frames in {frames_dir}")
+    step = max(1, len(paths) // limit)
+    return paths[::step][:limit]
+
+
+def _calibration_blobs(frames_dir: str, imgsz: int):
+    for path in calibration_frames(frames_dir):
+        frame = cv2.imread(str(path))
+        if frame is not None:
+            yield to_input(frame, imgsz)[0]
+
+
+def export_model(weights: str, fmt: str, imgsz: int, cache_dir: str) -> Path:
+    # Exports are cached per format and input size, so this is a one-off
+    # cost on the first run with a new setting.
+    cache = Path(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    stem = Path(weights).stem
+    if fmt == "onnx":
+        target = cache / f"{stem}_{imgsz}.onnx"
+    else:
+        target = cache / f"{stem}_{imgsz}_openvino" / f"{stem}.xml"
+    if target.exists():
+        return target
+
+    from ultralytics import YOLO
+
+    exported = Path(YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=False, half=False))
+    if fmt == "onnx":
+        shutil.move(str(exported), target)
+    else:
+        shutil.rmtree(target.parent, ignore_errors=True)
+        shutil.move(str(exported), target.parent)
+    return target
+
+
+def quantize_onnx(model_path: Path, frames_dir: str, imgsz: int) -> Path:
+    target = model_path.with_name(f"{model_path.stem}_int8.onnx")
+    if target.exists():
+        return target
+    ort = _require("onnxruntime")
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    session_input = ort.InferenceSession(
+        str(model_path), providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self._blobs = _calibration_blobs(frames_dir, imgsz)
+
+        def get_next(self):
+            blob = next(self._blobs, None)
+            return None if blob is None else {session_input: blob}
+
+    quantize_static(
+        str(model_path),
+        str(target),
+        _Reader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return target
+
+
+def quantize_openvino(
+    model_path: Path, frames_dir: str, imgsz: int, head: str = "model.22"
+) -> Path:
+    target = model_path.with_name(f"{model_path.stem}_int8.xml")
+    if target.exists():
+        return target
+    nncf = _require("nncf")
+    ov = _require("openvino")
+
+    core = ov.Core()
+    dataset = nncf.Dataset(list(_calibration_blobs(frames_dir, imgsz)))
+    quantized = nncf.quantize(
+        core.read_model(model_path),
+        dataset,
+        preset=nncf.QuantizationPreset.MIXED,
+        # Keep the detection head's box decoding in float (the same scope
+        # ultralytics' own INT8 export ignores); quantizing it costs far more
+        # accuracy than the time it saves.
+        ignored_scope=nncf.IgnoredScope(
+            patterns=[
+                f".*{head}/.*/Add",
+                f".*{head}/.*/Sub*",
+                f".*{head}/.*/Mul*",
+                f".*{head}/.*/Div*",
+                f".*{head}\\.dfl.*",
+            ],
+            types=["Sigmoid"],
+            validate=False,
+        ),
+    )
+    ov.save_model(quantized, target)
+    return target
+
+
+def load_backend(
+    name: str,
+    weights: str,
+    imgsz: int,
+    person_class: int,
+    int8: bool = False,
+    calibration_dir: str | None = None,
+    cache_dir: str = "cv_output/models",
+    threads: int = 0,
+):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "torch":
+        if int8:
+            raise ValueError("INT8 needs the onnx or openvino backend")
+        return TorchBackend(weights, imgsz, person_class)
+    if int8 and not calibration_dir:
+        raise ValueError("INT8 quantization needs a directory of recorded frames")
+    # Fail before a slow export if the runtime isn't there.
+    _require("onnxruntime" if name == "onnx" else "openvino")
+
+    model_path = export_model(weights, name, imgsz, cache_dir)
+    if name == "onnx":
+        if int8:
+            model_path = quantize_onnx(model_path, calibration_dir, imgsz)
+        return OnnxBackend(str(model_path), imgsz, person_class, threads)
+    if int8:
+        model_path = quantize_openvino(model_path, calibration_dir, imgsz)
+    return OpenVinoBackend(str(model_path), imgsz, person_class, threads)
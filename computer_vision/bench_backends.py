@@ -0,0 +1,158 @@
+"""Compare detector backends on the same recorded frames.
+
+Record frames from the robot camera once (these double as INT8
+calibration data), then time each backend on them and measure how well
+its detections agree with the PyTorch baseline. The exported backends
+need their runtimes:
+
+    pip install -r computer_vision/requirements-backends.txt
+    python computer_vision/bench_backends.py record --camera 1 --count 300
+    python computer_vision/bench_backends.py compare --backends torch onnx openvino --int8
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import backends
+import detection
+
+PERSON_CLASS_ID = 0
+GROUP_DISTANCE = 150
+DEFAULT_FRAMES_DIR = "cv_output/calibration_frames"
+
+
+def record(args) -> None:
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    cap = cv2.VideoCapture(args.camera)
+    saved = 0
+    seen = 0
+    try:
+        while saved < args.count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            seen += 1
+            if seen % args.every:
+                continue
+            cv2.imwrite(str(out / f"frame_{saved:05d}.jpg"), frame)
+            saved += 1
+    finally:
+        cap.release()
+    print(f"Saved {saved} frames to {out}")
+
+
+def people_f1(reference: detection.Detections, candidate: detection.Detections) -> float:
+    # Greedy IoU >= 0.5 matching of person boxes against the baseline.
+    ref, cand = reference.people, candidate.people
+    if len(ref) == 0 and len(cand) == 0:
+        return 1.0
+    if len(ref) == 0 or len(cand) == 0:
+        return 0.0
+    iou = detection.iou_matrix(ref, cand)
+    matched = 0
+    while iou.size and iou.max() >= 0.5:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        matched += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return 2 * matched / (len(ref) + len(cand))
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def compare(args) -> None:
+    paths = backends.calibration_frames(args.frames, limit=args.limit)
+    frames = [cv2.imread(str(p)) for p in paths]
+    frames = [f for f in frames if f is not None]
+    print(f"{len(frames)} frames from {args.frames}, imgsz {args.imgsz}")
+
+    variants = [(name, False) for name in args.backends]
+    if args.int8:
+        variants += [(name, True) for name in args.backends if name != "torch"]
+
+    baseline: list[detection.Detections] | None = None
+    print(
+        f"{'backend':<14} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} "
+        f"{'person F1':>10} {'count eq':>9} {'group eq':>9}"
+    )
+    for name, int8 in variants:
+        label = f"{name}{'-int8' if int8 else ''}"
+        try:
+            backend = backends.load_backend(
+                name,
+                args.weights,
+                args.imgsz,
+                PERSON_CLASS_ID,
+                int8=int8,
+                calibration_dir=args.frames,
+                threads=args.threads,
+            )
+        except (ImportError, RuntimeError, ValueError) as exc:
+            print(f"{label:<14} skipped: {exc}")
+            continue
+
+        for frame in frames[: args.warmup]:
+            backend.detect(frame)
+        latencies = []
+        outputs = []
+        for frame in frames:
+            started = time.perf_counter()
+            outputs.append(backend.detect(frame))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        if baseline is None:
+            # The first backend listed is the reference for agreement.
+            baseline = outputs
+        f1 = statistics.fmean(people_f1(r, c) for r, c in zip(baseline, outputs))
+        count_eq = statistics.fmean(
+            len(r.people) == len(c.people) for r, c in zip(baseline, outputs)
+        )
+        group_eq = statistics.fmean(
+            detection.has_group(detection.centroids(r.people), GROUP_DISTANCE)
+            == detection.has_group(detection.centroids(c.people), GROUP_DISTANCE)
+            for r, c in zip(baseline, outputs)
+        )
+        p50 = statistics.median(latencies)
+        print(
+            f"{label:<14} {p50:>8.1f} {_percentile(latencies, 0.95):>8.1f} "
+            f"{1000 / statistics.fmean(latencies):>7.1f} {f1:>10.3f} {count_eq:>9.1%} {group_eq:>9.1%}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="save camera frames for benchmarking and INT8 calibration")
+    rec.add_argument("--camera", type=int, default=1)
+    rec.add_argument("--out", default=DEFAULT_FRAMES_DIR)
+    rec.add_argument("--count", type=int, default=300)
+    rec.add_argument("--every", type=int, default=5, help="keep one frame in this many")
+    rec.set_defaults(func=record)
+
+    cmp_ = sub.add_parser("compare", help="time backends and compare detections")
+    cmp_.add_argument("--frames", default=DEFAULT_FRAMES_DIR)
+    cmp_.add_argument("--backends", nargs="+", default=list(backends.BACKENDS), choices=backends.BACKENDS)
+    cmp_.add_argument("--weights", default="yolov8s.pt")
+    cmp_.add_argument("--imgsz", type=int, default=640)
+    cmp_.add_argument("--int8", action="store_true", help="also run INT8 builds of the exported backends")
+    cmp_.add_argument("--threads", type=int, default=0)
+    cmp_.add_argument("--limit", type=int, default=200)
+    cmp_.add_argument("--warmup", type=int, default=5)
+    cmp_.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
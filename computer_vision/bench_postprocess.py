@@ -0,0 +1,139 @@
+"""Micro-benchmark for per-frame detection post-processing.
+
+Compares the original per-box loop + DBSCAN against detection.py on
+synthetic detections. Uses torch tensors when torch is installed (that is
+where the per-box host copies hurt) and NumPy arrays otherwise. The
+baseline needs scikit-learn, which the vision loop no longer installs:
+
+    pip install -r computer_vision/requirements-bench.txt
+    python computer_vision/bench_postprocess.py --frames 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import detection
+
+PERSON_CLASS_ID = 0
+GROUP_DISTANCE = 150
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from sklearn.cluster import DBSCAN
+except ImportError:
+    DBSCAN = None
+
+
+class _Box:
+    def __init__(self, xyxy, cls) -> None:
+        self.xyxy = xyxy
+        self.cls = cls
+
+
+class _Boxes:
+    def __init__(self, xyxy, cls) -> None:
+        self.xyxy = xyxy
+        self.cls = cls
+
+    def __len__(self) -> int:
+        return len(self.cls)
+
+    def __iter__(self):
+        for i in range(len(self.cls)):
+            yield _Box(self.xyxy[i : i + 1], self.cls[i : i + 1])
+
+
+class _Results:
+    def __init__(self, xyxy, cls) -> None:
+        self.boxes = _Boxes(xyxy, cls)
+
+
+def make_frames(count: int, people: int, others: int, seed: int) -> list[_Results]:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        n = people + others
+        x1 = rng.uniform(0, 1100, n)
+        y1 = rng.uniform(0, 500, n)
+        xyxy = np.stack([x1, y1, x1 + rng.uniform(40, 180, n), y1 + rng.uniform(80, 220, n)], 1)
+        cls = np.concatenate([np.zeros(people), rng.integers(1, 80, others)])
+        if torch is not None:
+            frames.append(_Results(torch.tensor(xyxy, dtype=torch.float32), torch.tensor(cls)))
+        else:
+            frames.append(_Results(xyxy.astype(np.float32), cls.astype(np.float32)))
+    return frames
+
+
+def before(results) -> tuple[bool, int, int]:
+    people_boxes = []
+    obstacle_boxes = []
+    for box in results.boxes:
+        cls = int(box.cls[0])
+        x1, y1, x2, y2 = map(int, box.xyxy[0])
+        if cls == PERSON_CLASS_ID:
+            people_boxes.append((x1, y1, x2, y2))
+        else:
+            obstacle_boxes.append((x1, y1, x2, y2))
+
+    centroids = [[(x1 + x2) // 2, (y1 + y2) // 2] for x1, y1, x2, y2 in people_boxes]
+    group_detected = False
+    if len(centroids) >= 2:
+        labels = DBSCAN(eps=GROUP_DISTANCE, min_samples=2).fit(centroids).labels_
+        group_detected = any(label != -1 for label in labels)
+
+    people_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in people_boxes)
+    obstacle_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in obstacle_boxes)
+    return group_detected, people_area, obstacle_area
+
+
+def after(results) -> tuple[bool, int, int]:
+    detections = detection.from_results(results, PERSON_CLASS_ID)
+    group_detected = detection.has_group(
+        detection.centroids(detections.people), GROUP_DISTANCE
+    )
+    return group_detected, detections.people_area, detections.obstacle_area
+
+
+def _time(fn, frames) -> tuple[float, list]:
+    outputs = []
+    started = time.perf_counter()
+    for results in frames:
+        outputs.append(fn(results))
+    return (time.perf_counter() - started) / len(frames) * 1e6, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--people", type=int, nargs="+", default=[2, 8, 20, 50])
+    parser.add_argument("--others", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"tensors: {'torch' if torch is not None else 'numpy'}")
+    if DBSCAN is None:
+        print("scikit-learn not installed, skipping the DBSCAN baseline "
+              "(pip install -r computer_vision/requirements-bench.txt)")
+    print(f"{'people':>6} {'before us/frame':>16} {'after us/frame':>15} {'speedup':>8} {'agree':>6}")
+    for people in args.people:
+        frames = make_frames(args.frames, people, args.others, args.seed)
+        after_us, after_out = _time(after, frames)
+        if DBSCAN is None:
+            print(f"{people:>6} {'n/a':>16} {after_us:>15.1f} {'':>8} {'':>6}")
+            continue
+        before_us, before_out = _time(before, frames)
+        agree = sum(a == b for a, b in zip(before_out, after_out)) / len(frames)
+        print(
+            f"{people:>6} {before_us:>16.1f} {after_us:>15.1f} "
+            f"{before_us / after_us:>7.1f}x {agree:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Replay a recording through the full vision loop and report its throughput.
+
+Runs comp_vision.py headless on a video file or image directory (nothing is
+uploaded) and prints per-stage latency percentiles, end-to-end FPS and the
+decisions it made. By default the recording is pushed through as fast as
+possible with no frames dropped, so the decisions are the same on every
+run and only the timings move; --realtime paces it at the recording's
+frame rate instead, like a live camera.
+
+    python computer_vision/bench_replay.py event.mp4 --save baseline.json
+    python computer_vision/bench_replay.py event.mp4 --baseline baseline.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+COMP_VISION = Path(__file__).with_name("comp_vision.py")
+STAGES = ("capture", "inference", "decision")
+
+
+def run_loop(args) -> dict:
+    command = [
+        sys.executable,
+        str(COMP_VISION),
+        "--headless",
+        "--no-upload",
+        "--source",
+        args.source,
+        "--backend",
+        args.backend,
+        "--imgsz",
+        str(args.imgsz),
+        "--detect-every",
+        str(args.detect_every),
+    ]
+    if args.realtime:
+        command.append("--realtime")
+    if args.int8:
+        command.append("--int8")
+    if args.max_seconds:
+        command += ["--max-seconds", str(args.max_seconds)]
+    proc = subprocess.run(command, capture_output=True, text=True)
+    # The loop's last stdout line is its JSON summary.
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"comp_vision.py exited with {proc.returncode}")
+    return json.loads(lines[-1])
+
+
+def report(summary: dict, baseline: dict | None) -> None:
+    def delta(value: float, before: float | None) -> str:
+        if before is None or not before:
+            return ""
+        return f" ({(value - before) / before:+.0%})"
+
+    base_stages = (baseline or {}).get("pipeline", {})
+    print(
+        f"{summary['source']} ({summary['replay']}, {summary['backend']}): "
+        f"{summary['frames_read']} frames read, {summary['decisions']} decisions "
+        f"in {summary['seconds']}s"
+    )
+    print(f"{'stage':<12} {'frames':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps':>7}")
+    rows = [(name, summary["pipeline"][name], base_stages.get(name)) for name in STAGES]
+    rows.append(("end-to-end", summary["end_to_end"], (baseline or {}).get("end_to_end")))
+    for name, stage, before in rows:
+        print(
+            f"{name:<12} {stage['frames']:>7} {stage['p50_ms']:>8.1f} {stage['p95_ms']:>8.1f} "
+            f"{stage['p99_ms']:>8.1f} {stage['fps']:>7.1f}"
+            f"{delta(stage['p50_ms'], before and before.get('p50_ms'))}"
+        )
+    print(
+        f"decision fps {summary['decision_fps']}"
+        f"{delta(summary['decision_fps'], baseline and baseline.get('decision_fps'))}"
+    )
+    print(f"photos {summary['photos']}")
+    actions = summary["actions"]
+    base_actions = (baseline or {}).get("actions", {})
+    for action in sorted(set(actions) | set(base_actions)):
+        line = f"  {action:<12} {actions.get(action, 0):>6}"
+        if baseline is not None and actions.get(action, 0) != base_actions.get(action, 0):
+            line += f"  (baseline {base_actions.get(action, 0)})"
+        print(line)
+    if baseline is not None and summary["replay"] == "fast" and actions != base_actions:
+        print("decisions differ from the baseline")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="video file or directory of frames")
+    parser.add_argument("--realtime", action="store_true", help="pace the replay at the recording's frame rate")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=0)
+    parser.add_argument("--save", help="write the run's summary here to use as a baseline")
+    parser.add_argument("--baseline", help="summary from an earlier --save to compare against")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    summary = run_loop(args)
+    report(summary, baseline)
+    if args.save:
+        Path(args.save).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
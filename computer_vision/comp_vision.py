@@ -1,11 +1,26 @@
+import argparse
 import cv2
-import numpy as np
 import json
+import logging
 import os
-import httpx
+import signal
+import threading
+import time
+from collections import Counter
 from datetime import datetime
-from ultralytics import YOLO
-from sklearn.cluster import DBSCAN
+
+PROCESS_STARTED = time.monotonic()
+
+import backends
+import detection
+import sources
+from control import ControlChannel
+from pipeline import FramePacket, StageMeter, VisionPipeline
+from scheduler import InferenceScheduler
+from telemetry import TelemetryWriter
+from tracker import DetectThenTrack
+from trigger import PhotoTrigger
+from uploader import PhotoUploader
 
 # --------------------
 # Config
@@ -16,131 +31,264 @@ PHOTO_AREA_THRESHOLD = 0.35
 OBSTACLE_AREA_THRESHOLD = 0.50
 EDGE_DENSITY_THRESHOLD = 0.15
 OUTPUT_DIR = "cv_output"
+CAMERA_INDEX = 1
+QUEUE_SIZE = 2  # frames each pipeline stage may fall behind before dropping
+STATS_INTERVAL = 5.0  # seconds between per-stage FPS / queue depth reports
+STATUS_INTERVAL = 1.0  # seconds between --standby status lines while running
+
+# Inference pacing for small CPU-only boards
+TARGET_FPS = 15.0  # max model passes per second while people are in view
+IDLE_INFERENCE_STRIDE = 5  # empty/static scene: one pass per this many TARGET_FPS slots
+CPU_BUDGET = 0.8  # share of one core the model may use (1.0 = back-to-back)
+
+# Edge-based wall check runs on this part of the frame (x0, y0, x1, y1 as
+# fractions), downscaled to EDGE_ANALYSIS_WIDTH. The top quarter is mostly
+# ceiling and far background the robot can't drive into.
+EDGE_ROI = (0.0, 0.25, 1.0, 1.0)
+EDGE_ANALYSIS_WIDTH = 320
+
+# --------------------
+# Run mode
+# --------------------
+# Headless (the default) skips drawing, windows and per-frame console
+# output. The demo view is opt-in with --demo or BIZBOT_CV_DEMO=1.
+# --standby is the API's robot worker: headless, it loads the model and
+# opens the camera once, starts paused and is paused/resumed over a JSON
+# lines channel on stdin/stdout (see control.py) instead of being
+# restarted for every /robot/start.
+parser = argparse.ArgumentParser(description="BizBot vision loop")
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument("--demo", action="store_true", help="show the annotated camera view and print decisions")
+mode.add_argument("--headless", action="store_true", help="no windows or console output (default)")
+mode.add_argument("--standby", action="store_true", help="start paused and take pause/resume commands on stdin, reporting status on stdout")
+parser.add_argument("--source", default=os.environ.get("BIZBOT_CV_SOURCE", str(CAMERA_INDEX)), help="camera index, stream URL (rtsp://, http://), video file or image directory")
+parser.add_argument("--realtime", action="store_true", help="replay a recording at its own frame rate instead of as fast as possible")
+parser.add_argument("--no-upload", action="store_true", help="score photos but don't send them to the API")
+parser.add_argument("--max-seconds", type=float, default=0, help="stop after this many seconds (0 = run until stopped)")
+parser.add_argument("--backend", choices=backends.BACKENDS, default=os.environ.get("BIZBOT_CV_BACKEND", "torch"), help="inference engine (default torch)")
+parser.add_argument("--imgsz", type=int, default=int(os.environ.get("BIZBOT_CV_IMGSZ", "640")), help="model input size; smaller is faster")
+parser.add_argument("--int8", action="store_true", default=os.environ.get("BIZBOT_CV_INT8", "") in ("1", "true", "yes"), help="INT8-quantize the onnx/openvino model")
+parser.add_argument("--calibration-dir", default=os.environ.get("BIZBOT_CV_CALIBRATION_DIR", "cv_output/calibration_frames"), help="recorded frames used for INT8 calibration")
+parser.add_argument("--threads", type=int, default=0, help="inference threads for onnx/openvino (0 = engine default)")
+parser.add_argument("--detect-every", type=int, default=int(os.environ.get("BIZBOT_CV_DETECT_EVERY", "5")), help="run the detector every N frames and track people in between (1 = detector on every frame)")
+args = parser.parse_args()
+control = None
+if args.standby:
+    # Read commands from the start; a pause or shutdown sent while the model
+    # is still loading is applied once the loop is up.
+    control = ControlChannel()
+    control.start()
+DEMO = args.demo or (not args.headless and not args.standby and os.environ.get("BIZBOT_CV_DEMO", "") in ("1", "true", "yes"))
 
 # Create output directories if they don't exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Open log file for writing
-log_file = os.path.join(OUTPUT_DIR, "detection_log.json")
-log_fp = open(log_file, "w")
+# Per-frame decisions and periodic stats, batched and written off the frame
+# loop as compressed columnar blocks. Read them back with read_telemetry.py.
+TELEMETRY_DIR = os.path.join(OUTPUT_DIR, "telemetry")
+TELEMETRY_MAX_BYTES = 16 * 1024 * 1024  # start a new file past this size
+TELEMETRY_MAX_FILES = 20  # oldest files beyond this are deleted
+telemetry = TelemetryWriter(
+    TELEMETRY_DIR,
+    max_bytes=TELEMETRY_MAX_BYTES,
+    max_files=TELEMETRY_MAX_FILES,
+)
 
 # API endpoint for uploads
 API_URL = "http://localhost:8000/upload"  # Change to your backend URL
+UPLOAD_SPOOL_DIR = os.path.join(OUTPUT_DIR, "upload_spool")  # photos kept while the API is unreachable
+UPLOAD_CONCURRENCY = 2
+UPLOAD_MAX_ATTEMPTS = 4
+
+logging.basicConfig(
+    level=logging.INFO if DEMO else logging.WARNING,
+    format="%(asctime)s %(name)s %(message)s",
+)
+
+uploader = None
+if not args.no_upload:
+    uploader = PhotoUploader(
+        API_URL,
+        spool_dir=UPLOAD_SPOOL_DIR,
+        max_concurrency=UPLOAD_CONCURRENCY,
+        max_attempts=UPLOAD_MAX_ATTEMPTS,
+    )
+
+# TAKE_PHOTO debouncing: collect candidates for a short window, upload the
+# best one, then leave that scene alone for a while.
+PHOTO_WINDOW_SECONDS = 1.0
+PHOTO_MAX_CANDIDATES = 8
+SCENE_COOLDOWN_SECONDS = 30.0
+PHOTO_MIN_INTERVAL_SECONDS = 3.0
+
+scheduler = InferenceScheduler(
+    target_fps=TARGET_FPS,
+    idle_stride=IDLE_INFERENCE_STRIDE,
+    cpu_budget=CPU_BUDGET,
+)
+
+trigger = PhotoTrigger(
+    window_seconds=PHOTO_WINDOW_SECONDS,
+    max_candidates=PHOTO_MAX_CANDIDATES,
+    cooldown_seconds=SCENE_COOLDOWN_SECONDS,
+    min_interval_seconds=PHOTO_MIN_INTERVAL_SECONDS,
+)
 
 # --------------------
 # Load model
 # --------------------
-model = YOLO("yolov8s.pt")
-cap = cv2.VideoCapture(1)
+MODEL_WEIGHTS = "yolov8s.pt"
+# onnx/openvino are exported (and INT8-calibrated) once into cv_output/models
+# and reused on later runs.
+detector = backends.load_backend(
+    args.backend,
+    MODEL_WEIGHTS,
+    args.imgsz,
+    PERSON_CLASS_ID,
+    int8=args.int8,
+    calibration_dir=args.calibration_dir,
+    cache_dir=os.path.join(OUTPUT_DIR, "models"),
+    threads=args.threads,
+)
+# Detect-then-track: the model runs every DETECT_EVERY inference passes (or
+# as soon as a tracked person is lost); people are followed with optical
+# flow in between and keep their track id across frames.
+DETECT_EVERY = max(1, args.detect_every)
+tracker = None
+if DETECT_EVERY > 1:
+    detector = tracker = DetectThenTrack(detector, PERSON_CLASS_ID, detect_every=DETECT_EVERY)
 
-print("CV system running. Press Q to quit.")
+# --------------------
+# Frame source
+# --------------------
+# A recording replayed as fast as possible is the benchmark mode: every
+# frame goes through (no dropping, no inference pacing) and the photo
+# trigger runs on the recording's clock, so runs give the same decisions
+# and can be compared. With --realtime it behaves like a live camera.
+source = sources.open_source(args.source, realtime=args.realtime)
+REPLAY = not source.live and not args.realtime
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
 
-    h, w, _ = frame.shape
-    frame_area = h * w
+# Set on resume in --standby. The tracker and trigger aren't thread-safe,
+# so each is reset by the stage thread that uses it, at the start of its
+# next frame.
+tracker_reset = threading.Event()
+trigger_reset = threading.Event()
 
-    results = model(frame, verbose=False)[0]
 
-    people_boxes = []
-    obstacle_boxes = []
+# --------------------
+# Capture stage
+# --------------------
+def read_frame():
+    return source.read()
 
-    # --------------------
+
+# --------------------
+# Inference stage
+# --------------------
+def infer(frame):
+    if tracker_reset.is_set():
+        tracker_reset.clear()
+        tracker.reset()
     # Separate people & obstacles
-    # --------------------
-    for box in results.boxes:
-        cls = int(box.cls[0])
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
+    return detector.detect(frame)
+
+
+def upload_photo(frame):
+    # The frame is the trigger's own copy, so the demo overlay never ends up
+    # in the photo; encoding and sending happen on the uploader's threads.
+    if uploader is None:
+        return
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    uploader.submit(frame, f"group_photo_{timestamp}.jpg")
+
+
+# --------------------
+# Decision stage
+# --------------------
+def decide(packet: FramePacket):
+    if trigger_reset.is_set():
+        trigger_reset.clear()
+        trigger.reset()
+    frame = packet.frame
+    detections = packet.detections
+    people_boxes = detections.people
+
+    h, w, _ = frame.shape
+    frame_area = h * w
+
+    # Group detection: any two people within GROUP_DISTANCE
+    group_detected = detection.has_group(detection.centroids(people_boxes), GROUP_DISTANCE)
 
-        if cls == PERSON_CLASS_ID:
-            people_boxes.append((x1, y1, x2, y2))
-        else:
-            obstacle_boxes.append((x1, y1, x2, y2))
-
-    # --------------------
-    # Group detection
-    # --------------------
-    centroids = [
-        [(x1 + x2) // 2, (y1 + y2) // 2]
-        for x1, y1, x2, y2 in people_boxes
-    ]
-
-    group_detected = False
-    if len(centroids) >= 2:
-        clustering = DBSCAN(eps=GROUP_DISTANCE, min_samples=2).fit(centroids)
-        labels = clustering.labels_
-        group_detected = any(label != -1 for label in labels)
-
-    # --------------------
     # Distance estimation
-    # --------------------
-    total_people_area = sum(
-        (x2 - x1) * (y2 - y1)
-        for x1, y1, x2, y2 in people_boxes
-    )
+    total_people_area = detections.people_area
 
-    # --------------------
     # Obstacle detection (bbox-based)
-    # --------------------
-    obstacle_area = sum(
-        (x2 - x1) * (y2 - y1)
-        for x1, y1, x2, y2 in obstacle_boxes
-    )
+    obstacle_area = detections.obstacle_area
     obstacle_close = obstacle_area > OBSTACLE_AREA_THRESHOLD * frame_area
 
-    # --------------------
     # Obstacle detection (edge-based)
-    # --------------------
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    edge_density = np.sum(edges > 0) / frame_area
+    edge_density = detection.edge_density(frame, EDGE_ROI, EDGE_ANALYSIS_WIDTH)
     wall_detected = edge_density > EDGE_DENSITY_THRESHOLD
 
-    # --------------------
     # Decision Logic
-    # --------------------
     action = "SEARCH"
+    photo_ready = (
+        not (obstacle_close or wall_detected)
+        and group_detected
+        and total_people_area > PHOTO_AREA_THRESHOLD * frame_area
+        and len(people_boxes) >= 5
+    )
+    # The trigger sees every frame (it also tracks motion) but only returns
+    # a candidate once per capture window.
+    now = packet.seq / source.fps if REPLAY else None
+    best = trigger.update(frame, people_boxes, photo_ready, now=now, people_ids=detections.people_ids)
+    if best is not None:
+        upload_photo(best.frame)
 
     if obstacle_close or wall_detected:
         action = "TURN_RIGHT"
-    elif group_detected and total_people_area > PHOTO_AREA_THRESHOLD * frame_area and len(people_boxes) >= 5:
+    elif photo_ready:
         action = "TAKE_PHOTO"
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        _, buffer = cv2.imencode('.jpg', frame)
-        file_content = buffer.tobytes()
-        
-        try:
-            with httpx.Client() as client:
-                response = client.post(
-                    API_URL,
-                    files={"file": (f"group_photo_{timestamp}.jpg", file_content, "image/jpeg")}
-                )
-                if response.status_code == 200:
-                    print(f"✅ Photo uploaded: {response.json()}")
-                else:
-                    print(f"❌ Upload failed: {response.status_code}")
-        except Exception as e:
-            print(f"❌ Upload error: {e}")
     elif group_detected:
         action = "MOVE_CLOSER"
     elif len(people_boxes) > 0:
         action = "MOVE_CLOSER"
 
-    # --------------------
-    # Visuals for demo
-    # --------------------
-    for x1, y1, x2, y2 in people_boxes:
+    # People in view or a new action puts inference back on every frame.
+    scheduler.observe(len(people_boxes), action)
+
+    return {
+        "people_count": len(people_boxes),
+        "group_detected": group_detected,
+        "edge_density": round(edge_density, 2),
+        "obstacle_close": bool(obstacle_close),
+        "wall_detected": bool(wall_detected),
+        "action": action,
+        "trigger_state": trigger.state,
+        "photo_score": best.score if best is not None else None
+    }
+
+
+# --------------------
+# Visuals for demo
+# --------------------
+def draw(packet: FramePacket):
+    frame = packet.frame
+    detections = packet.detections
+
+    people_ids = detections.people_ids
+    for i, (x1, y1, x2, y2) in enumerate(detections.people.tolist()):
         cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        if people_ids is not None:
+            cv2.putText(frame, f"#{people_ids[i]}", (x1, max(y1 - 6, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-    for x1, y1, x2, y2 in obstacle_boxes:
+    for x1, y1, x2, y2 in detections.obstacles.tolist():
         cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
 
     cv2.putText(
         frame,
-        f"Action: {action}",
+        f"Action: {packet.decision['action']}",
         (20, 40),
         cv2.FONT_HERSHEY_SIMPLEX,
         1,
@@ -150,55 +298,193 @@ while True:
 
     cv2.imshow("BizBot Demo", frame)
 
-    # log output as JSON
-    log_data = {
-        "people_count": len(people_boxes),
-        "group_detected": group_detected,
-        "edge_density": round(edge_density, 2),
-        "obstacle_close": bool(obstacle_close),
-        "wall_detected": bool(wall_detected),
-        "action": action
-    }
-
-    
-
-    if (action == "SEARCH") :
-        print("hi")
 
+if uploader is not None:
+    uploader.start()
+pipeline = VisionPipeline(
+    read_frame,
+    infer,
+    decide,
+    queue_size=QUEUE_SIZE,
+    scheduler=None if REPLAY else scheduler,
+    drop_frames=not REPLAY,
+    # Recordings keep every sample so the summary's percentiles cover the
+    # whole run.
+    meter_window=120 if source.live else None,
+)
+# Capture to decision, per frame.
+end_to_end = StageMeter(120 if source.live else None)
+actions = Counter()
+
+stop_requested = threading.Event()
+
+
+def request_stop(signum, frame):
+    stop_requested.set()
+
+
+# SIGTERM (and a shutdown command in --standby) finishes the loop so the
+# camera, uploader spool and telemetry are closed cleanly.
+signal.signal(signal.SIGTERM, request_stop)
+signal.signal(signal.SIGINT, request_stop)
+
+# --standby bookkeeping: the action of the last decision, when the current
+# run was resumed, and the decision count at the last status line (for a
+# live FPS over the last interval rather than since startup).
+last_action = None
+resumed_at = None
+last_report = (time.monotonic(), 0)
+
+
+def worker_status(now: float) -> dict:
+    global last_report
+    decisions = pipeline.meters["decision"].count
+    reported_at, reported = last_report
+    fps = 0.0
+    if not pipeline.paused and now > reported_at:
+        fps = (decisions - reported) / (now - reported_at)
+    last_report = (now, decisions)
+    return {
+        "type": "status",
+        "state": "paused" if pipeline.paused else "running",
+        "fps": round(fps, 1),
+        "action": last_action if not pipeline.paused else None,
+        "uptime_seconds": round(now - PROCESS_STARTED, 1),
+        "running_seconds": round(now - resumed_at, 1) if resumed_at is not None else 0.0,
+        "decisions": decisions,
+        "photos": trigger.stats()["photos"],
+        "uploader": uploader.stats() if uploader is not None else None,
+    }
 
-    print(json.dumps(log_data))
-    log_fp.write(json.dumps(log_data) + "\n")
-    log_fp.flush()
-
-    # exit on'Q'
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-import serial
-import time
-
-# Establish serial connection (replace 'COM3' with your port name)
-arduino = serial.Serial(port='COM3', baudrate=9600, timeout=.1)
-
-def call_arduino_function(command):
-    # Send the command as bytes
-    arduino.write(bytes(command, 'utf-8'))
-    time.sleep(0.05) # Give the Arduino time to respond
-    # Optional: read and print the response from Arduino
-    data = arduino.readline().decode('utf-8').strip()
-    return data
-
-# Example: call the function associated with command '1'
-response = call_arduino_function('1')
-print(f"Arduino response: {response}")
-
-# Example: call the function associated with command '0' after a delay
-time.sleep(2)
-response = call_arduino_function('0')
-print(f"Arduino response: {response}")
 
+def handle_command(command: str, now: float) -> None:
+    global last_action, resumed_at, next_status
+    if command == "pause" and not pipeline.paused:
+        pipeline.pause()
+        resumed_at = None
+        last_action = None
+    elif command == "resume" and pipeline.paused:
+        # Anything the tracker or trigger held is from before the pause.
+        trigger_reset.set()
+        if tracker is not None:
+            tracker_reset.set()
+        resumed_at = now
+        pipeline.resume()
+    elif command == "shutdown":
+        stop_requested.set()
+    control.send(worker_status(now))
+    # The reply counts as this interval's report, so the next FPS figure
+    # covers a full interval.
+    next_status = now + STATUS_INTERVAL
+
+
+if control is not None:
+    pipeline.pause()
+pipeline.start()
+started_at = time.monotonic()
+if control is not None:
+    control.send(
+        {
+            "type": "ready",
+            "pid": os.getpid(),
+            "load_seconds": round(started_at - PROCESS_STARTED, 1),
+            "source": str(args.source),
+            "backend": f"{args.backend}{'-int8' if args.int8 else ''}@{args.imgsz}",
+        }
+    )
 
-# clean
-cap.release()
-cv2.destroyAllWindows()
-log_fp.close()
\ No newline at end of file
+if DEMO:
+    print("CV system running. Press Q to quit.")
+
+next_stats = time.monotonic() + STATS_INTERVAL
+next_status = time.monotonic() + STATUS_INTERVAL
+try:
+    while not stop_requested.is_set():
+        if control is not None:
+            for command in control.commands():
+                handle_command(command, time.monotonic())
+        packet = pipeline.next_result(timeout=0.5)
+        if packet is None:
+            if pipeline.finished:
+                break
+        else:
+            log_data = packet.decision
+            finished = time.perf_counter()
+            end_to_end.record(packet.captured_at, finished)
+            actions[log_data["action"]] += 1
+            last_action = log_data["action"]
+            telemetry.record(
+                "frame",
+                {
+                    "seq": packet.seq,
+                    "latency_ms": round((finished - packet.captured_at) * 1000, 1),
+                    **log_data,
+                },
+            )
+            if DEMO:
+                draw(packet)
+                print(json.dumps(log_data))
+
+        now = time.monotonic()
+        if now >= next_stats:
+            stats = {
+                "pipeline": pipeline.stats(),
+                "uploader": uploader.stats() if uploader is not None else None,
+                "trigger": trigger.stats(),
+                "telemetry": telemetry.stats(),
+            }
+            if tracker is not None:
+                stats["tracker"] = tracker.stats()
+            telemetry.record("stats", stats)
+            if DEMO:
+                print(json.dumps(stats))
+            next_stats = now + STATS_INTERVAL
+
+        if control is not None and now >= next_status:
+            # Paused workers only answer commands; a running one reports
+            # every STATUS_INTERVAL so /robot/status stays current.
+            if not pipeline.paused:
+                control.send(worker_status(now))
+            next_status = now + STATUS_INTERVAL
+
+        if args.max_seconds and now - started_at >= args.max_seconds:
+            break
+
+        # exit on'Q'
+        if DEMO and cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+finally:
+    pipeline.stop()
+    if uploader is not None:
+        uploader.close()
+    elapsed = time.monotonic() - started_at
+    summary = {
+        "mode": "demo" if DEMO else ("standby" if args.standby else "headless"),
+        "source": str(args.source),
+        "replay": "live" if source.live else ("realtime" if args.realtime else "fast"),
+        "frames_read": source.frames_read,
+        "backend": f"{args.backend}{'-int8' if args.int8 else ''}@{args.imgsz}",
+        "seconds": round(elapsed, 1),
+        "decisions": pipeline.meters["decision"].count,
+        "decision_fps": round(pipeline.meters["decision"].count / elapsed, 1) if elapsed else 0.0,
+        "end_to_end": end_to_end.snapshot(),
+        "actions": dict(actions),
+        "photos": trigger.stats()["photos"],
+        "pipeline": pipeline.stats(),
+    }
+    if tracker is not None:
+        summary["tracker"] = tracker.stats()
+    telemetry.record("summary", summary)
+    # One line on exit so runs in either mode can be compared.
+    if control is not None:
+        control.send({"type": "summary", "error": repr(pipeline.error) if pipeline.error else None, **summary})
+    else:
+        print(json.dumps(summary))
+        if pipeline.error is not None:
+            print(f"❌ Pipeline stopped: {pipeline.error!r}")
+
+    # clean
+    source.release()
+    if DEMO:
+        cv2.destroyAllWindows()
+    telemetry.close()
@@ -0,0 +1,57 @@
+import json
+import queue
+import sys
+import threading
+from typing import TextIO
+
+COMMANDS = ("pause", "resume", "status", "shutdown")
+
+
+# Line-delimited JSON control channel for --standby. Commands arrive on
+# stdin as {"cmd": "pause" | "resume" | "status" | "shutdown"} and are
+# queued for the main loop; replies and status reports go out on stdout,
+# one JSON object per line with a "type" key. Closing stdin (the API went
+# away) counts as a shutdown.
+class ControlChannel:
+    def __init__(self, stdin: TextIO | None = None, stdout: TextIO | None = None) -> None:
+        self._stdin = stdin or sys.stdin
+        self._stdout = stdout or sys.stdout
+        self._commands: queue.Queue[str] = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._read_loop, name="cv-control", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def commands(self) -> list[str]:
+        pending = []
+        while True:
+            try:
+                pending.append(self._commands.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def send(self, message: dict) -> None:
+        line = json.dumps(message, default=str)
+        with self._write_lock:
+            try:
+                self._stdout.write(line + "\n")
+                self._stdout.flush()
+            except (BrokenPipeError, ValueError):
+                # Nobody is listening any more; the stdin EOF shuts us down.
+                pass
+
+    def _read_loop(self) -> None:
+        for line in self._stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                command = json.loads(line).get("cmd")
+            except (ValueError, AttributeError):
+                command = None
+            if command not in COMMANDS:
+                self.send({"type": "error", "error": f"unknown command: {line[:80]}"})
+                continue
+            self._commands.put(command)
+        self._commands.put("shutdown")
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+_EMPTY_BOXES = np.zeros((0, 4), dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class Detections:
+    boxes: np.ndarray  # (N, 4) integer x1, y1, x2, y2
+    classes: np.ndarray  # (N,) integer class ids
+    person_mask: np.ndarray  # (N,) bool
+    track_ids: np.ndarray | None = None  # (N,) persistent person ids, -1 = untracked
+
+    @property
+    def people(self) -> np.ndarray:
+        return self.boxes[self.person_mask]
+
+    @property
+    def people_ids(self) -> np.ndarray | None:
+        if self.track_ids is None:
+            return None
+        return self.track_ids[self.person_mask]
+
+    @property
+    def obstacles(self) -> np.ndarray:
+        return self.boxes[~self.person_mask]
+
+    @property
+    def areas(self) -> np.ndarray:
+        return box_areas(self.boxes)
+
+    @property
+    def people_area(self) -> int:
+        return int(self.areas[self.person_mask].sum())
+
+    @property
+    def obstacle_area(self) -> int:
+        return int(self.areas[~self.person_mask].sum())
+
+
+def empty_detections() -> Detections:
+    return Detections(
+        boxes=_EMPTY_BOXES,
+        classes=np.zeros(0, dtype=np.int64),
+        person_mask=np.zeros(0, dtype=bool),
+    )
+
+
+def from_results(results, person_class: int) -> Detections:
+    # One device-to-host copy per tensor for the whole frame instead of two
+    # per box. astype(int64) truncates like the int() calls it replaces.
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+    xyxy = _to_numpy(boxes.xyxy).astype(np.int64)
+    classes = _to_numpy(boxes.cls).astype(np.int64)
+    return Detections(boxes=xyxy, classes=classes, person_mask=classes == person_class)
+
+
+def from_arrays(xyxy, classes, person_class: int, track_ids=None) -> Detections:
+    xyxy = np.asarray(xyxy).reshape(-1, 4).astype(np.int64)
+    classes = np.asarray(classes).reshape(-1).astype(np.int64)
+    if track_ids is not None:
+        track_ids = np.asarray(track_ids).reshape(-1).astype(np.int64)
+    return Detections(
+        boxes=xyxy,
+        classes=classes,
+        person_mask=classes == person_class,
+        track_ids=track_ids,
+    )
+
+
+def _to_numpy(tensor) -> np.ndarray:
+    if hasattr(tensor, "cpu"):
+        tensor = tensor.cpu()
+    if hasattr(tensor, "numpy"):
+        return tensor.numpy()
+    return np.asarray(tensor)
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box_areas(a)[:, None] + box_areas(b)[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def centroids(boxes: np.ndarray) -> np.ndarray:
+    return np.stack(
+        ((boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2), axis=1
+    )
+
+
+def _close_pairs(points: np.ndarray, distance: float) -> np.ndarray:
+    points = points.astype(np.float64)
+    diff = points[:, None, :] - points[None, :, :]
+    close = np.einsum("ijk,ijk->ij", diff, diff) <= distance * distance
+    return np.argwhere(np.triu(close, k=1))
+
+
+def has_group(points: np.ndarray, distance: float) -> bool:
+    # Same answer as DBSCAN(eps=distance, min_samples=2) having any non-noise
+    # label: some pair of people is within distance of each other.
+    if len(points) < 2:
+        return False
+    return len(_close_pairs(points, distance)) > 0
+
+
+def group_labels(points: np.ndarray, distance: float) -> np.ndarray:
+    # Union-find over the close pairs; -1 marks people with nobody nearby,
+    # matching DBSCAN's noise label.
+    n = len(points)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n < 2:
+        return labels
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in _close_pairs(points, distance):
+        root_i, root_j = find(int(i)), find(int(j))
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    roots = np.array([find(i) for i in range(n)])
+    sizes = np.bincount(roots, minlength=n)
+    grouped = sizes[roots] >= 2
+    # Number groups by their lowest index, the order DBSCAN finds them in.
+    _, first, dense = np.unique(roots[grouped], return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    labels[grouped] = rank[dense]
+    return labels
+
+
+def edge_density(
+    frame: np.ndarray,
+    roi: tuple[float, float, float, float] = (0.0, 0.0, 1.0, 1.0),
+    max_width: int = 320,
+) -> float:
+    # Share of Canny edge pixels inside roi (x0, y0, x1, y1 as fractions of
+    # the frame), measured on a copy at most max_width wide.
+    h, w = frame.shape[:2]
+    top, bottom = int(roi[1] * h), max(int(roi[3] * h), int(roi[1] * h) + 1)
+    left, right = int(roi[0] * w), max(int(roi[2] * w), int(roi[0] * w) + 1)
+    crop = frame[top:bottom, left:right]
+    if max_width and crop.shape[1] > max_width:
+        scale = max_width / crop.shape[1]
+        crop = cv2.resize(
+            crop,
+            (max_width, max(1, round(crop.shape[0] * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    edges = cv2.Canny(gray, 100, 200)
+    return float(np.count_nonzero(edges)) / edges.size
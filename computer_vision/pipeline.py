@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from scheduler import InferenceScheduler
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize: int, drop: bool = True) -> None:
+        self._items: deque = deque(maxlen=max(1, maxsize))
+        self._cond = threading.Condition()
+        self._closed = False
+        # With drop=False put() waits for room instead, so a replay can push
+        # every frame through (items put after close() are discarded).
+        self._drop = drop
+        self.dropped = 0
+
+    def put(self, item: Any) -> None:
+        with self._cond:
+            if not self._drop:
+                self._cond.wait_for(lambda: len(self._items) < self._items.maxlen or self._closed)
+                if self._closed:
+                    return
+            elif len(self._items) == self._items.maxlen:
+                # A stale frame is worth less than the one that just arrived.
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self, timeout: float | None = None) -> Any | None:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item
+            return None
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed and not self._items
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+# window=None keeps every sample, for replays where percentiles should
+# cover the whole run.
+class StageMeter:
+    def __init__(self, window: int | None = 120) -> None:
+        self._lock = threading.Lock()
+        self._done: deque[float] = deque(maxlen=window)
+        self._busy: deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, started: float, finished: float) -> None:
+        with self._lock:
+            self._done.append(finished)
+            self._busy.append(finished - started)
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            done = list(self._done)
+            busy = list(self._busy)
+            count = self.count
+        fps = 0.0
+        if len(done) >= 2 and done[-1] > done[0]:
+            fps = (len(done) - 1) / (done[-1] - done[0])
+        latency_ms = sum(busy) / len(busy) * 1000 if busy else 0.0
+        return {
+            "fps": round(fps, 1),
+            "latency_ms": round(latency_ms, 1),
+            "p50_ms": round(percentile(busy, 0.5) * 1000, 1),
+            "p95_ms": round(percentile(busy, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(busy, 0.99) * 1000, 1),
+            "frames": count,
+        }
+
+
+@dataclass
+class FramePacket:
+    seq: int
+    captured_at: float
+    frame: Any
+    detections: Any = None
+    decision: dict = field(default_factory=dict)
+
+
+# Capture -> inference -> decision, each on its own thread. Stages are joined
+# by small drop-oldest queues, so a slow stage sheds stale frames instead of
+# letting the camera buffer back up. Finished packets are read on the main
+# thread with next_result(), which keeps the OpenCV GUI calls there.
+# drop_frames=False makes the queues wait instead of dropping, so a recorded
+# replay processes every frame and gives the same decisions on every run.
+# pause() idles the capture thread without releasing the source, so a
+# resume starts from the next camera frame with the model already loaded.
+class VisionPipeline:
+    def __init__(
+        self,
+        read_frame: Callable[[], Any | None],
+        infer: Callable[[Any], Any],
+        decide: Callable[[FramePacket], dict],
+        queue_size: int = 2,
+        scheduler: InferenceScheduler | None = None,
+        drop_frames: bool = True,
+        meter_window: int | None = 120,
+    ) -> None:
+        self._read_frame = read_frame
+        self._infer = infer
+        self._decide = decide
+        self._scheduler = scheduler
+        self._stop = threading.Event()
+        self._active = threading.Event()
+        self._active.set()
+        self._threads: list[threading.Thread] = []
+        # The capture queue holds a single slot so inference always starts
+        # from the newest frame.
+        self.queues = {
+            "frames": DropOldestQueue(1, drop=drop_frames),
+            "detections": DropOldestQueue(queue_size, drop=drop_frames),
+            "results": DropOldestQueue(queue_size, drop=drop_frames),
+        }
+        self.meters = {
+            "capture": StageMeter(meter_window),
+            "inference": StageMeter(meter_window),
+            "decision": StageMeter(meter_window),
+        }
+        self.error: BaseException | None = None
+
+    def start(self) -> None:
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="cv-capture", daemon=True),
+            threading.Thread(
+                target=self._stage_loop,
+                args=("inference", "frames", "detections", self._run_inference),
+                name="cv-inference",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._stage_loop,
+                args=("decision", "detections", "results", self._run_decision),
+                name="cv-decision",
+                daemon=True,
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for queue in self.queues.values():
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def pause(self) -> None:
+        self._active.clear()
+
+    def resume(self) -> None:
+        self._active.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._active.is_set()
+
+    def next_result(self, timeout: float | None = None) -> FramePacket | None:
+        return self.queues["results"].get(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self.queues["results"].closed
+
+    def stats(self) -> dict:
+        stats = {name: meter.snapshot() for name, meter in self.meters.items()}
+        if self._scheduler is not None:
+            stats["scheduler"] = self._scheduler.stats()
+        stats["queues"] = {
+            name: {"depth": queue.depth(), "dropped": queue.dropped}
+            for name, queue in self.queues.items()
+        }
+        return stats
+
+    def _capture_loop(self) -> None:
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                if not self._active.is_set():
+                    self._active.wait(0.5)
+                    continue
+                started = time.perf_counter()
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                finished = time.perf_counter()
+                self.meters["capture"].record(started, finished)
+                self.queues["frames"].put(FramePacket(seq, finished, frame))
+                seq += 1
+        except BaseException as exc:
+            self.error = exc
+            self._stop.set()
+        finally:
+            self.queues["frames"].close()
+
+    def _stage_loop(
+        self,
+        name: str,
+        source: str,
+        sink: str,
+        run: Callable[[FramePacket], bool],
+    ) -> None:
+        try:
+            while not self._stop.is_set():
+                packet = self.queues[source].get(timeout=0.5)
+                if packet is None:
+                    if self.queues[source].closed:
+                        break
+                    continue
+                started = time.perf_counter()
+                if not run(packet):
+                    continue
+                self.meters[name].record(started, time.perf_counter())
+                self.queues[sink].put(packet)
+        except BaseException as exc:
+            self.error = exc
+            self._stop.set()
+        finally:
+            self.queues[sink].close()
+
+    def _run_inference(self, packet: FramePacket) -> bool:
+        # Frames the scheduler passes on are dropped here; the capture queue
+        # already holds a newer one.
+        if self._scheduler is not None and not self._scheduler.should_infer(packet.frame):
+            return False
+        started = time.monotonic()
+        packet.detections = self._infer(packet.frame)
+        if self._scheduler is not None:
+            self._scheduler.record_inference(started, time.monotonic(), packet.frame)
+        return True
+
+    def _run_decision(self, packet: FramePacket) -> bool:
+        packet.decision = self._decide(packet)
+        return True
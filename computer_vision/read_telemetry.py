@@ -0,0 +1,90 @@
+"""Read the vision loop's telemetry logs (cv_output/telemetry/*.tlm).
+
+    python computer_vision/read_telemetry.py summary cv_output/telemetry
+    python computer_vision/read_telemetry.py dump cv_output/telemetry --kind stats
+    python computer_vision/read_telemetry.py csv cv_output/telemetry > frames.csv
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+from collections import Counter
+
+import telemetry
+
+
+def summary(args) -> None:
+    kinds = Counter()
+    actions = Counter()
+    latencies = []
+    first = last = None
+    for columns in _frame_columns(args.path):
+        kinds["frame"] += len(columns["t"])
+        actions.update(columns.get("action") or [])
+        latencies.extend(v for v in columns.get("latency_ms") or [] if v is not None)
+        first = columns["t"][0] if first is None else min(first, columns["t"][0])
+        last = columns["t"][-1] if last is None else max(last, columns["t"][-1])
+    for record in telemetry.iter_records(args.path, kinds={"stats", "summary"}):
+        kinds[record["kind"]] += 1
+
+    print(f"files: {len(telemetry.log_files(args.path))}")
+    for kind, count in sorted(kinds.items()):
+        print(f"{kind:<8} {count}")
+    if first is not None and last > first:
+        print(f"span     {last - first:.1f}s, {kinds['frame'] / (last - first):.1f} decisions/s")
+    if latencies:
+        ordered = sorted(latencies)
+        print(
+            f"latency  p50 {statistics.median(ordered):.1f} ms, "
+            f"p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.1f} ms"
+        )
+    for action, count in actions.most_common():
+        print(f"  {action:<12} {count}")
+
+
+def dump(args) -> None:
+    kinds = set(args.kind) if args.kind else None
+    for record in telemetry.iter_records(args.path, kinds=kinds):
+        print(json.dumps(record, separators=(",", ":")))
+
+
+def to_csv(args) -> None:
+    writer = None
+    for columns in _frame_columns(args.path):
+        if writer is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(columns), extrasaction="ignore")
+            writer.writeheader()
+        names = list(columns)
+        for values in zip(*(columns[name] for name in names)):
+            writer.writerow(dict(zip(names, values)))
+
+
+def _frame_columns(path: str):
+    return telemetry.iter_columns(path, "frame")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    summ = sub.add_parser("summary", help="record counts, decision rate, latency and actions")
+    summ.add_argument("path", help="a .tlm file or the telemetry directory")
+    summ.set_defaults(func=summary)
+
+    dmp = sub.add_parser("dump", help="print records as JSON lines")
+    dmp.add_argument("path")
+    dmp.add_argument("--kind", action="append", help="only these record kinds (frame, stats, summary)")
+    dmp.set_defaults(func=dump)
+
+    out = sub.add_parser("csv", help="write per-frame decisions as CSV to stdout")
+    out.add_argument("path")
+    out.set_defaults(func=to_csv)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
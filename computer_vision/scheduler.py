@@ -0,0 +1,101 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Motion between frames is judged on a tiny grayscale thumbnail.
+_PROBE_SIZE = (64, 48)
+
+
+# Decides, frame by frame, whether the inference stage should run the model.
+# "active" (people in view, or the action just changed) runs at up to
+# target_fps; "idle" (empty or static scene) runs every idle_stride-th slot
+# and wakes early when the view moves. Either way a model pass that took
+# `cost` seconds is followed by at least cost / cpu_budget seconds without
+# one, so a slow board never spends more than that share of a core on it.
+class InferenceScheduler:
+    def __init__(
+        self,
+        target_fps: float = 15.0,
+        idle_stride: int = 5,
+        cpu_budget: float = 1.0,
+        active_hold_seconds: float = 2.0,
+        motion_threshold: float = 6.0,
+    ) -> None:
+        self.target_fps = target_fps
+        self.idle_stride = max(1, idle_stride)
+        self.cpu_budget = cpu_budget
+        self.active_hold_seconds = active_hold_seconds
+        self.motion_threshold = motion_threshold
+        self._lock = threading.Lock()
+        self._active_until = 0.0
+        self._last_action: str | None = None
+        self._next_at = 0.0
+        self._last_started = 0.0
+        self._last_cost = 0.0
+        self._probe: np.ndarray | None = None
+        self._counts = {"inferred": 0, "skipped": 0, "motion_wakeups": 0}
+
+    def mode(self, now: float | None = None) -> str:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return "active" if now < self._active_until else "idle"
+
+    def should_infer(self, frame: np.ndarray, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            active = now < self._active_until
+            budget_at = self._last_started + self._budget_gap()
+            if now >= self._next_at and now >= budget_at:
+                self._counts["inferred"] += 1
+                return True
+            if not active and now >= budget_at and self._moved(frame):
+                self._counts["inferred"] += 1
+                self._counts["motion_wakeups"] += 1
+                return True
+            self._counts["skipped"] += 1
+            return False
+
+    def record_inference(self, started: float, finished: float, frame: np.ndarray) -> None:
+        with self._lock:
+            self._last_started = started
+            self._last_cost = finished - started
+            self._probe = self._thumbnail(frame)
+            stride = 1 if finished < self._active_until else self.idle_stride
+            self._next_at = started + stride / max(self.target_fps, 1e-6)
+
+    def observe(self, people_count: int, action: str, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if people_count > 0 or action != self._last_action:
+                if self._active_until <= now:
+                    # Leaving idle: don't wait out the idle stride.
+                    self._next_at = now
+                self._active_until = now + self.active_hold_seconds
+            self._last_action = action
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counts)
+            stats["last_inference_ms"] = round(self._last_cost * 1000, 1)
+        stats["mode"] = self.mode()
+        return stats
+
+    def _budget_gap(self) -> float:
+        if self.cpu_budget <= 0:
+            return 0.0
+        return self._last_cost / self.cpu_budget
+
+    def _moved(self, frame: np.ndarray) -> bool:
+        if self._probe is None:
+            return True
+        diff = cv2.absdiff(self._thumbnail(frame), self._probe)
+        return float(diff.mean()) > self.motion_threshold
+
+    @staticmethod
+    def _thumbnail(frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, _PROBE_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
@@ -0,0 +1,114 @@
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_REPLAY_FPS = 30.0
+
+
+# Frame sources for the vision loop. Each one has read() -> frame or None
+# when it runs out, release(), fps, and live (a camera, as opposed to a
+# recording that can be replayed faster than it was shot). Network cameras
+# (rtsp://, http://...) are live too.
+class CameraSource:
+    live = True
+
+    def __init__(self, device: int | str) -> None:
+        self._cap = cv2.VideoCapture(device)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open camera {device}")
+        # Keep the driver from queueing old frames; the capture thread always
+        # wants the newest one.
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or DEFAULT_REPLAY_FPS
+        self.frames_read = 0
+
+    def read(self) -> np.ndarray | None:
+        ret, frame = self._cap.read()
+        if not ret:
+            return None
+        self.frames_read += 1
+        return frame
+
+    def release(self) -> None:
+        self._cap.release()
+
+
+# Recordings play back as fast as they can be read, or, with realtime, at
+# the rate they were recorded so the loop sees what a camera would give it.
+class _Replay:
+    live = False
+
+    def __init__(self, fps: float, realtime: bool) -> None:
+        self.fps = fps
+        self.realtime = realtime
+        self.frames_read = 0
+        self._started: float | None = None
+
+    def read(self) -> np.ndarray | None:
+        frame = self._next()
+        if frame is None:
+            return None
+        if self.realtime:
+            if self._started is None:
+                self._started = time.monotonic()
+            delay = self._started + self.frames_read / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.frames_read += 1
+        return frame
+
+    def release(self) -> None:
+        pass
+
+    def _next(self) -> np.ndarray | None:
+        raise NotImplementedError
+
+
+class VideoFileSource(_Replay):
+    def __init__(self, path: str, realtime: bool = False, fps: float | None = None) -> None:
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Could not open video {path}")
+        super().__init__(fps or self._cap.get(cv2.CAP_PROP_FPS) or DEFAULT_REPLAY_FPS, realtime)
+
+    def _next(self) -> np.ndarray | None:
+        ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def release(self) -> None:
+        self._cap.release()
+
+
+class ImageDirSource(_Replay):
+    def __init__(self, path: str, realtime: bool = False, fps: float | None = None) -> None:
+        self._paths = sorted(
+            p for p in Path(path).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+        )
+        if not self._paths:
+            raise RuntimeError(f"No images in {path}")
+        super().__init__(fps or DEFAULT_REPLAY_FPS, realtime)
+        self._index = 0
+
+    def _next(self) -> np.ndarray | None:
+        # Unreadable files are skipped rather than ending the replay.
+        while self._index < len(self._paths):
+            frame = cv2.imread(str(self._paths[self._index]))
+            self._index += 1
+            if frame is not None:
+                return frame
+        return None
+
+
+def open_source(spec: str | int, realtime: bool = False, fps: float | None = None):
+    # A number is a camera index, scheme://... is a network camera, a
+    # directory is a folder of images, and anything else is a video file.
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec))
+    if "://" in str(spec):
+        return CameraSource(str(spec))
+    if Path(spec).is_dir():
+        return ImageDirSource(spec, realtime=realtime, fps=fps)
+    return VideoFileSource(spec, realtime=realtime, fps=fps)
@@ -0,0 +1,198 @@
+import json
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+# File layout: FILE_MAGIC, then blocks of
+#   BLOCK_HEADER (magic, compressed length, crc32) + zlib(JSON columns)
+# where the JSON is {kind: {"t": [...], "<field>": [...], ...}}, one list
+# per field holding that field's value for every record of the kind in the
+# block (None where a record didn't have it).
+FILE_MAGIC = b"BZTLM1\n"
+BLOCK_MAGIC = b"BLK1"
+BLOCK_HEADER = struct.Struct("<4sII")
+FILE_SUFFIX = ".tlm"
+
+
+def _columns(records: list[tuple[float, str, dict]]) -> dict:
+    by_kind: dict[str, list[tuple[float, dict]]] = {}
+    for t, kind, data in records:
+        by_kind.setdefault(kind, []).append((t, data))
+    out = {}
+    for kind, rows in by_kind.items():
+        fields: dict[str, None] = {}
+        for _, data in rows:
+            fields.update(dict.fromkeys(data))
+        columns = {"t": [round(t, 3) for t, _ in rows]}
+        for field in fields:
+            columns[field] = [data.get(field) for _, data in rows]
+        out[kind] = columns
+    return out
+
+
+def encode_block(records: list[tuple[float, str, dict]], level: int = 6) -> bytes:
+    payload = zlib.compress(
+        json.dumps(_columns(records), separators=(",", ":"), default=str).encode(), level
+    )
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+# Telemetry log for the vision loop. record() only appends to an in-memory
+# batch; a background thread encodes and writes it every flush_records
+# records or flush_seconds, so the frame loop never serializes or touches
+# the disk. Each run writes its own files (run_<start>_<part>.tlm) and
+# starts a new part once max_bytes is reached; only the newest max_files
+# parts in the directory are kept.
+class TelemetryWriter:
+    def __init__(
+        self,
+        directory: str,
+        flush_records: int = 500,
+        flush_seconds: float = 2.0,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_files: int = 20,
+        compress_level: int = 6,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.compress_level = compress_level
+        self._run = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._part = 0
+        self._fp = None
+        self._size = 0
+        self._batch: list[tuple[float, str, dict]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._counts = {"records": 0, "blocks": 0, "bytes": 0, "files": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run_flusher, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def record(self, kind: str, data: dict) -> None:
+        if self._closed.is_set():
+            return
+        with self._lock:
+            self._batch.append((time.time(), kind, data))
+            pending = len(self._batch)
+        if pending >= self.flush_records:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if not batch:
+            return
+        block = encode_block(batch, self.compress_level)
+        with self._write_lock:
+            try:
+                fp = self._current_file(len(block))
+                fp.write(block)
+                fp.flush()
+            except OSError:
+                self._counts["errors"] += 1
+                return
+            self._size += len(block)
+            self._counts["records"] += len(batch)
+            self._counts["blocks"] += 1
+            self._counts["bytes"] += len(block)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._batch)
+        return {**self._counts, "pending": pending}
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+        with self._write_lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def _run_flusher(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def _current_file(self, incoming: int):
+        if self._fp is not None and self._size + incoming > self.max_bytes and self._size > len(FILE_MAGIC):
+            self._fp.close()
+            self._fp = None
+        if self._fp is None:
+            self._part += 1
+            path = self.directory / f"run_{self._run}_{self._part:03d}{FILE_SUFFIX}"
+            self._fp = open(path, "wb")
+            self._fp.write(FILE_MAGIC)
+            self._size = len(FILE_MAGIC)
+            self._counts["files"] += 1
+            self._prune()
+        return self._fp
+
+    def _prune(self) -> None:
+        parts = sorted(self.directory.glob(f"run_*{FILE_SUFFIX}"))
+        for old in parts[: max(0, len(parts) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+# --------------------
+# Reading
+# --------------------
+def log_files(path: str) -> list[Path]:
+    target = Path(path)
+    if target.is_dir():
+        return sorted(target.glob(f"run_*{FILE_SUFFIX}"))
+    return [target]
+
+
+def read_blocks(path: Path):
+    # Yields each block's columns. A block cut short by a crash ends the file
+    # quietly; a corrupt one raises.
+    with open(path, "rb") as fp:
+        if fp.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a telemetry log")
+        while True:
+            header = fp.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, length, crc = BLOCK_HEADER.unpack(header)
+            if magic != BLOCK_MAGIC:
+                raise ValueError(f"{path}: bad block header at byte {fp.tell() - BLOCK_HEADER.size}")
+            payload = fp.read(length)
+            if len(payload) < length:
+                return
+            if zlib.crc32(payload) != crc:
+                raise ValueError(f"{path}: checksum mismatch at byte {fp.tell() - length}")
+            yield json.loads(zlib.decompress(payload))
+
+
+def iter_columns(path: str, kind: str):
+    for file in log_files(path):
+        for block in read_blocks(file):
+            if kind in block:
+                yield block[kind]
+
+
+def iter_records(path: str, kinds: set[str] | None = None):
+    # Row view of the log: {"t": ..., "kind": ..., **fields} per record, in
+    # write order within each kind of a block.
+    for file in log_files(path):
+        for block in read_blocks(file):
+            for kind, columns in block.items():
+                if kinds and kind not in kinds:
+                    continue
+                names = list(columns)
+                for values in zip(*(columns[name] for name in names)):
+                    yield {"kind": kind, **dict(zip(names, values))}
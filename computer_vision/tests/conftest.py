@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The vision modules are flat scripts imported by name, as comp_vision.py does.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import backends
+
+PERSON = 0
+CHAIR = 56
+NUM_CLASSES = 80
+
+
+def head_output(rows) -> np.ndarray:
+    # Builds a YOLOv8 head tensor (1, 4 + classes, anchors) from
+    # (x1, y1, x2, y2, class, confidence) in letterboxed input pixels.
+    output = np.zeros((1, 4 + NUM_CLASSES, len(rows)), dtype=np.float32)
+    for i, (x1, y1, x2, y2, cls, conf) in enumerate(rows):
+        output[0, :4, i] = [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]
+        output[0, 4 + cls, i] = conf
+    return output
+
+
+def to_input_pixels(box, ratio, pad):
+    x1, y1, x2, y2 = box
+    return (x1 * ratio + pad[0], y1 * ratio + pad[1], x2 * ratio + pad[0], y2 * ratio + pad[1])
+
+
+@pytest.mark.parametrize(
+    "shape, ratio, pad",
+    [
+        ((480, 640, 3), 1.0, (0, 80)),
+        ((960, 1280, 3), 0.5, (0, 80)),
+        ((640, 320, 3), 1.0, (160, 0)),
+    ],
+)
+def test_letterbox_scales_and_centres(shape, ratio, pad):
+    padded, got_ratio, got_pad = backends.letterbox(np.zeros(shape, dtype=np.uint8), 640)
+
+    assert padded.shape == (640, 640, 3)
+    assert got_ratio == ratio
+    assert got_pad == pad
+    assert (padded[: pad[1], :] == 114).all()
+
+
+@pytest.mark.parametrize("shape", [(480, 640, 3), (960, 1280, 3)])
+def test_boxes_are_mapped_back_to_frame_pixels(shape):
+    _, ratio, pad = backends.letterbox(np.zeros(shape, dtype=np.uint8), 640)
+    person = (100, 50, 300, 450)
+    chair = (500, 300, 620, 460)
+    output = head_output(
+        [
+            (*to_input_pixels(person, ratio, pad), PERSON, 0.9),
+            (*to_input_pixels(chair, ratio, pad), CHAIR, 0.6),
+        ]
+    )
+
+    found = backends.decode_output(output, ratio, pad, shape, PERSON)
+
+    assert found.people.tolist() == [list(person)]
+    assert found.obstacles.tolist() == [list(chair)]
+    assert found.classes.tolist() == [PERSON, CHAIR]
+
+
+def test_overlapping_boxes_of_one_class_are_suppressed():
+    _, ratio, pad = backends.letterbox(np.zeros((480, 640, 3), dtype=np.uint8), 640)
+    person = to_input_pixels((100, 50, 300, 450), ratio, pad)
+    shifted = tuple(v + 4 for v in person)
+    output = head_output(
+        [
+            (*shifted, PERSON, 0.7),
+            (*person, PERSON, 0.9),
+            # Same place, different class: NMS is per class, so it stays.
+            (*person, CHAIR, 0.5),
+            # Below the confidence threshold.
+            (10, 90, 60, 140, PERSON, 0.1),
+        ]
+    )
+
+    found = backends.decode_output(output, ratio, pad, (480, 640, 3), PERSON)
+
+    assert found.people.tolist() == [[100, 50, 300, 450]]
+    assert found.classes.tolist().count(CHAIR) == 1
+    assert len(found.boxes) == 2
+
+
+def test_boxes_are_clipped_to_the_frame():
+    _, ratio, pad = backends.letterbox(np.zeros((480, 640, 3), dtype=np.uint8), 640)
+    output = head_output([(-20, 60, 200, 600, PERSON, 0.9)])
+
+    found = backends.decode_output(output, ratio, pad, (480, 640, 3), PERSON)
+
+    assert found.people.tolist() == [[0, 0, 200, 480]]
+
+
+def test_nothing_above_threshold_gives_no_detections():
+    output = head_output([(10, 10, 50, 50, PERSON, 0.2)])
+    found = backends.decode_output(output, 1.0, (0, 80), (480, 640, 3), PERSON)
+    assert len(found.boxes) == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import detection
+
+EPS = 150
+
+# Expected labels are what sklearn's DBSCAN(eps=150, min_samples=2) returns
+# for the same points: clusters numbered in order of their lowest index,
+# -1 for people with nobody within eps.
+CASES = {
+    "chain": (
+        [(0, 0), (100, 0), (200, 0), (300, 0), (400, 0)],
+        [0, 0, 0, 0, 0],
+    ),
+    "two clusters and a loner": (
+        [(0, 0), (1000, 0), (50, 50), (1050, 20), (500, 500)],
+        [0, 1, 0, 1, -1],
+    ),
+    "all isolated": (
+        [(0, 0), (400, 0), (0, 400), (400, 400)],
+        [-1, -1, -1, -1],
+    ),
+    "exactly eps apart": (
+        [(0, 0), (150, 0)],
+        [0, 0],
+    ),
+    "just over eps": (
+        [(0, 0), (151, 0)],
+        [-1, -1],
+    ),
+    "cluster joined through a later point": (
+        [(0, 0), (1000, 0), (1100, 0), (500, 800), (280, 0), (140, 0)],
+        [0, 1, 1, -1, 0, 0],
+    ),
+    "diagonal neighbours": (
+        [(0, 0), (106, 106), (212, 212), (900, 900), (1000, 1000), (2000, 0)],
+        [0, 0, 0, 1, 1, -1],
+    ),
+}
+
+
+@pytest.mark.parametrize("points, expected", CASES.values(), ids=CASES.keys())
+def test_group_labels_match_dbscan(points, expected):
+    labels = detection.group_labels(np.array(points), EPS)
+    assert labels.tolist() == expected
+
+
+@pytest.mark.parametrize("points, expected", CASES.values(), ids=CASES.keys())
+def test_has_group_matches_any_cluster(points, expected):
+    assert detection.has_group(np.array(points), EPS) == any(label != -1 for label in expected)
+
+
+@pytest.mark.parametrize("points", [np.zeros((0, 2)), np.array([[10, 10]])])
+def test_fewer_than_two_people_is_never_a_group(points):
+    assert detection.group_labels(points, EPS).tolist() == [-1] * len(points)
+    assert not detection.has_group(points, EPS)
+
+
+def test_centroids_use_integer_box_centres():
+    boxes = np.array([[0, 0, 100, 51], [10, 20, 31, 40]])
+    assert detection.centroids(boxes).tolist() == [[50, 25], [20, 30]]
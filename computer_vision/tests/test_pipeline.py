@@ -0,0 +1,154 @@
+import threading
+import time
+
+import numpy as np
+
+from pipeline import DropOldestQueue, VisionPipeline
+
+
+def frames(count: int):
+    items = iter(np.full((4, 4, 3), i, dtype=np.uint8) for i in range(count))
+    return lambda: next(items, None)
+
+
+def drain(pipeline: VisionPipeline, timeout: float = 5.0) -> list:
+    results = []
+    deadline = time.monotonic() + timeout
+    while not pipeline.finished and time.monotonic() < deadline:
+        packet = pipeline.next_result(timeout=0.1)
+        if packet is not None:
+            results.append(packet)
+    return results
+
+
+def test_queue_drops_the_oldest_item_when_full():
+    queue = DropOldestQueue(2)
+    for item in (1, 2, 3):
+        queue.put(item)
+
+    assert queue.dropped == 1
+    assert [queue.get(0), queue.get(0)] == [2, 3]
+    assert queue.get(0.01) is None
+
+
+def test_queue_reports_closed_once_drained():
+    queue = DropOldestQueue(2)
+    queue.put("last")
+    queue.close()
+
+    assert not queue.closed
+    assert queue.get(0) == "last"
+    assert queue.closed
+    assert queue.get(1.0) is None
+
+
+def test_non_dropping_queue_waits_for_room():
+    queue = DropOldestQueue(1, drop=False)
+    queue.put(1)
+    putter = threading.Thread(target=queue.put, args=(2,))
+    putter.start()
+    putter.join(0.1)
+    assert putter.is_alive()
+
+    assert queue.get(0) == 1
+    putter.join(1.0)
+    assert not putter.is_alive()
+    assert queue.get(0) == 2
+    assert queue.dropped == 0
+
+
+def test_close_releases_a_waiting_put():
+    queue = DropOldestQueue(1, drop=False)
+    queue.put(1)
+    putter = threading.Thread(target=queue.put, args=(2,))
+    putter.start()
+    queue.close()
+    putter.join(1.0)
+
+    assert not putter.is_alive()
+    assert queue.depth() == 1
+
+
+def test_replay_passes_every_frame_through_in_order():
+    pipeline = VisionPipeline(
+        read_frame=frames(20),
+        infer=lambda frame: int(frame[0, 0, 0]),
+        decide=lambda packet: {"seen": packet.detections},
+        drop_frames=False,
+    )
+    pipeline.start()
+    results = drain(pipeline)
+    pipeline.stop()
+
+    assert [p.seq for p in results] == list(range(20))
+    assert [p.decision["seen"] for p in results] == list(range(20))
+    assert pipeline.error is None
+    assert pipeline.stats()["inference"]["frames"] == 20
+
+
+# Lets only even frames through to the model.
+class EvenFrames:
+    def should_infer(self, frame) -> bool:
+        return int(frame[0, 0, 0]) % 2 == 0
+
+    def record_inference(self, started, finished, frame) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+def test_scheduler_skipped_frames_never_reach_decision():
+    pipeline = VisionPipeline(
+        read_frame=frames(10),
+        infer=lambda frame: int(frame[0, 0, 0]),
+        decide=lambda packet: {},
+        scheduler=EvenFrames(),
+        drop_frames=False,
+    )
+    pipeline.start()
+    results = drain(pipeline)
+    pipeline.stop()
+
+    assert [p.detections for p in results] == [0, 2, 4, 6, 8]
+
+
+def test_stage_error_stops_the_pipeline():
+    def infer(frame):
+        if int(frame[0, 0, 0]) == 3:
+            raise RuntimeError("model crashed")
+        return None
+
+    pipeline = VisionPipeline(
+        read_frame=frames(100), infer=infer, decide=lambda packet: {}, drop_frames=False
+    )
+    pipeline.start()
+    drain(pipeline)
+    pipeline.stop()
+
+    assert isinstance(pipeline.error, RuntimeError)
+    assert pipeline.finished
+
+
+def test_paused_pipeline_stops_reading_frames():
+    reads = []
+
+    def read_frame():
+        reads.append(time.monotonic())
+        time.sleep(0.005)
+        return np.zeros((4, 4, 3), dtype=np.uint8)
+
+    pipeline = VisionPipeline(read_frame=read_frame, infer=lambda f: None, decide=lambda p: {})
+    pipeline.start()
+    time.sleep(0.05)
+    pipeline.pause()
+    time.sleep(0.05)
+    paused_reads = len(reads)
+    time.sleep(0.1)
+
+    assert pipeline.paused
+    assert len(reads) == paused_reads
+    pipeline.resume()
+    time.sleep(0.05)
+    pipeline.stop()
+    assert len(reads) > paused_reads
@@ -0,0 +1,83 @@
+import numpy as np
+
+from scheduler import InferenceScheduler
+
+STILL = np.full((48, 64, 3), 80, dtype=np.uint8)
+MOVED = np.full((48, 64, 3), 200, dtype=np.uint8)
+
+
+def run(scheduler: InferenceScheduler, now: float, cost: float = 0.01, frame=STILL) -> None:
+    scheduler.record_inference(now, now + cost, frame)
+
+
+def test_first_frame_is_always_inferred():
+    scheduler = InferenceScheduler()
+    assert scheduler.should_infer(STILL, now=0.0)
+    assert scheduler.mode(now=0.0) == "idle"
+
+
+def test_active_mode_runs_at_target_fps():
+    scheduler = InferenceScheduler(target_fps=10, idle_stride=5)
+    scheduler.observe(people_count=2, action="FORWARD", now=0.0)
+    run(scheduler, 0.0)
+
+    assert scheduler.mode(now=0.05) == "active"
+    assert not scheduler.should_infer(STILL, now=0.05)
+    assert scheduler.should_infer(STILL, now=0.1)
+
+
+def test_idle_mode_uses_the_stride_unless_the_view_moves():
+    scheduler = InferenceScheduler(target_fps=10, idle_stride=5)
+    run(scheduler, 0.0)
+
+    assert not scheduler.should_infer(STILL, now=0.2)
+    assert scheduler.should_infer(MOVED, now=0.2)
+    assert scheduler.stats()["motion_wakeups"] == 1
+    assert scheduler.should_infer(STILL, now=0.5)
+
+
+def test_motion_does_not_preempt_active_pacing():
+    scheduler = InferenceScheduler(target_fps=10)
+    scheduler.observe(people_count=1, action="FORWARD", now=0.0)
+    run(scheduler, 0.0)
+
+    assert not scheduler.should_infer(MOVED, now=0.05)
+
+
+def test_cpu_budget_spaces_out_slow_passes():
+    scheduler = InferenceScheduler(target_fps=30, cpu_budget=0.5)
+    scheduler.observe(people_count=1, action="FORWARD", now=0.0)
+    run(scheduler, 0.0, cost=0.2)
+
+    # 0.2 s of work at a 50% budget means no new pass before 0.4 s, motion
+    # or not.
+    assert not scheduler.should_infer(STILL, now=0.3)
+    assert not scheduler.should_infer(MOVED, now=0.3)
+    assert scheduler.should_infer(STILL, now=0.4)
+
+
+def test_people_wake_an_idle_scheduler_immediately():
+    scheduler = InferenceScheduler(target_fps=10, idle_stride=5)
+    run(scheduler, 0.0)
+    scheduler.observe(people_count=1, action="STOP", now=0.1)
+
+    assert scheduler.should_infer(STILL, now=0.1)
+
+
+def test_active_mode_lapses_after_the_hold():
+    scheduler = InferenceScheduler(active_hold_seconds=2.0)
+    scheduler.observe(people_count=1, action="FORWARD", now=0.0)
+    scheduler.observe(people_count=0, action="FORWARD", now=1.0)
+
+    assert scheduler.mode(now=1.9) == "active"
+    assert scheduler.mode(now=2.0) == "idle"
+
+
+def test_action_change_counts_as_activity():
+    scheduler = InferenceScheduler(active_hold_seconds=2.0)
+    scheduler.observe(people_count=0, action="FORWARD", now=0.0)
+    scheduler.observe(people_count=0, action="FORWARD", now=3.0)
+    assert scheduler.mode(now=3.0) == "idle"
+
+    scheduler.observe(people_count=0, action="TURN_LEFT", now=3.0)
+    assert scheduler.mode(now=3.0) == "active"
@@ -0,0 +1,111 @@
+import json
+from argparse import Namespace
+
+import pytest
+
+import read_telemetry
+import telemetry
+from telemetry import TelemetryWriter
+
+ACTIONS = ("FORWARD", "STOP", "TURN_LEFT", "TAKE_PHOTO")
+
+
+def frame_record(i: int) -> dict:
+    record = {"seq": i, "action": ACTIONS[i % 4], "people": i % 3, "latency_ms": 10.0 + i % 7}
+    if i % 5 == 0:
+        # Fields that only some records carry come back as None for the rest.
+        record["photo"] = f"photo_{i}.jpg"
+    return record
+
+
+def write_log(directory, batches: int = 6, per_batch: int = 40, **options) -> TelemetryWriter:
+    # Flushed by hand after every batch so each one becomes one block.
+    writer = TelemetryWriter(
+        str(directory), flush_records=10**9, flush_seconds=3600, **options
+    )
+    for b in range(batches):
+        for i in range(b * per_batch, (b + 1) * per_batch):
+            writer.record("frame", frame_record(i))
+        writer.record("stats", {"batch": b, "fps": 15.0})
+        writer.flush()
+    writer.record("summary", {"frames": batches * per_batch})
+    writer.close()
+    return writer
+
+
+def frames_read_back(directory) -> list[dict]:
+    rows = []
+    for record in telemetry.iter_records(str(directory), kinds={"frame"}):
+        record.pop("kind")
+        record.pop("t")
+        rows.append({k: v for k, v in record.items() if v is not None})
+    return rows
+
+
+def test_round_trip_across_rotated_files(tmp_path):
+    writer = write_log(tmp_path, max_bytes=700, max_files=50)
+
+    files = telemetry.log_files(str(tmp_path))
+    assert len(files) > 1
+    assert writer.stats()["files"] == len(files)
+    assert frames_read_back(tmp_path) == [frame_record(i) for i in range(240)]
+    stats = [r["batch"] for r in telemetry.iter_records(str(tmp_path), kinds={"stats"})]
+    assert stats == list(range(6))
+    (summary,) = telemetry.iter_records(str(tmp_path), kinds={"summary"})
+    assert summary["frames"] == 240
+
+
+def test_each_part_stays_under_max_bytes(tmp_path):
+    write_log(tmp_path, max_bytes=700, max_files=50)
+
+    for path in telemetry.log_files(str(tmp_path)):
+        blocks = list(telemetry.read_blocks(path))
+        assert blocks
+        # A part only goes over when a single block is bigger than the limit.
+        assert path.stat().st_size <= 700 or len(blocks) == 1
+
+
+def test_rotation_keeps_only_the_newest_parts(tmp_path):
+    write_log(tmp_path, max_bytes=1, max_files=3)
+
+    files = telemetry.log_files(str(tmp_path))
+    assert [f.name[-7:] for f in files] == ["005.tlm", "006.tlm", "007.tlm"]
+    assert frames_read_back(tmp_path)[-1] == frame_record(239)
+
+
+def test_truncated_last_block_is_skipped(tmp_path):
+    write_log(tmp_path, batches=2, max_bytes=10**6)
+    (path,) = telemetry.log_files(str(tmp_path))
+    path.write_bytes(path.read_bytes()[:-10])
+
+    assert frames_read_back(tmp_path) == [frame_record(i) for i in range(80)]
+
+
+def test_corrupt_block_raises(tmp_path):
+    write_log(tmp_path, batches=1, max_bytes=10**6)
+    (path,) = telemetry.log_files(str(tmp_path))
+    data = bytearray(path.read_bytes())
+    data[len(telemetry.FILE_MAGIC) + telemetry.BLOCK_HEADER.size + 5] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        list(telemetry.read_blocks(path))
+
+
+def test_read_telemetry_cli_reads_the_log(tmp_path, capsys):
+    write_log(tmp_path, max_bytes=700, max_files=50)
+
+    read_telemetry.dump(Namespace(path=str(tmp_path), kind=["frame"]))
+    dumped = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row["seq"] for row in dumped] == list(range(240))
+
+    read_telemetry.to_csv(Namespace(path=str(tmp_path)))
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split(",")[:3] == ["t", "seq", "action"]
+    assert len(lines) == 241
+
+    read_telemetry.summary(Namespace(path=str(tmp_path)))
+    out = capsys.readouterr().out
+    assert "frame    240" in out
+    assert "stats    6" in out
+    assert "summary  1" in out
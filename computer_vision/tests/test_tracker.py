@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+import detection
+from tracker import DetectThenTrack, PersonTracker
+
+PERSON = 0
+CHAIR = 56
+BOX = np.array([200.0, 120.0, 360.0, 360.0])
+EMPTY_BOX = np.array([460.0, 40.0, 620.0, 200.0])
+
+
+def frame_with_person(dx: int = 0) -> np.ndarray:
+    # A textured "person" on a flat background, moved dx pixels right.
+    rng = np.random.default_rng(7)
+    texture = cv2.resize(
+        rng.integers(0, 256, size=(30, 20, 3), dtype=np.uint8), (160, 240), interpolation=cv2.INTER_NEAREST
+    )
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    x1, y1 = int(BOX[0]) + dx, int(BOX[1])
+    frame[y1 : y1 + 240, x1 : x1 + 160] = texture
+    return frame
+
+
+# Plays back a fixed answer and counts how often the model was asked.
+class FakeDetector:
+    def __init__(self, people, obstacles=()) -> None:
+        boxes = list(people) + list(obstacles)
+        classes = [PERSON] * len(people) + [CHAIR] * len(obstacles)
+        self.answer = detection.from_arrays(np.array(boxes).reshape(-1, 4), classes, PERSON)
+        self.calls = 0
+
+    def detect(self, frame: np.ndarray) -> detection.Detections:
+        self.calls += 1
+        return self.answer
+
+
+def test_matched_boxes_keep_their_ids():
+    tracker = PersonTracker()
+    first = tracker.update(frame_with_person(), [BOX, EMPTY_BOX])
+    second = tracker.update(frame_with_person(), [EMPTY_BOX + 5, BOX + 5])
+
+    assert list(first) == [1, 2]
+    assert list(second) == [2, 1]
+
+
+def test_unmatched_tracks_age_out():
+    tracker = PersonTracker(max_misses=2)
+    tracker.update(frame_with_person(), [BOX])
+    for _ in range(2):
+        tracker.update(frame_with_person(), [])
+        assert len(tracker.tracks) == 1
+        assert tracker.active() == []
+    tracker.update(frame_with_person(), [])
+    assert tracker.tracks == []
+
+    assert list(tracker.update(frame_with_person(), [BOX])) == [2]
+
+
+def test_prediction_follows_the_person():
+    tracker = PersonTracker()
+    tracker.update(frame_with_person(), [BOX])
+    boxes, ids = tracker.predict(frame_with_person(dx=12))
+
+    assert list(ids) == [1]
+    assert np.allclose(boxes[0], BOX + [12, 0, 12, 0], atol=2.0)
+    assert not tracker.lost
+
+
+def test_box_without_texture_is_lost():
+    tracker = PersonTracker()
+    tracker.update(frame_with_person(), [BOX, EMPTY_BOX])
+    tracker.predict(frame_with_person())
+
+    assert tracker.lost
+
+
+def test_detector_runs_every_n_frames_and_tracks_between():
+    detector = FakeDetector([BOX], obstacles=[EMPTY_BOX])
+    engine = DetectThenTrack(detector, PERSON, detect_every=3)
+
+    results = [engine.detect(frame_with_person(dx=2 * i)) for i in range(7)]
+
+    assert detector.calls == 3  # frames 0, 3 and 6
+    assert engine.counts == {"detector_frames": 3, "tracked_frames": 4, "lost_redetects": 0}
+    for result in results:
+        assert list(result.people_ids) == [1]
+        assert len(result.obstacles) == 1
+    assert results[2].people[0, 0] > results[0].people[0, 0]
+
+
+def test_lost_person_triggers_an_early_detection():
+    detector = FakeDetector([BOX, EMPTY_BOX])
+    engine = DetectThenTrack(detector, PERSON, detect_every=5)
+
+    engine.detect(frame_with_person())
+    engine.detect(frame_with_person())
+    assert engine.tracker.lost
+    engine.detect(frame_with_person())
+
+    assert detector.calls == 2
+    assert engine.counts["lost_redetects"] == 1
+
+
+def test_reset_forces_a_detection():
+    detector = FakeDetector([BOX])
+    engine = DetectThenTrack(detector, PERSON, detect_every=5)
+    engine.detect(frame_with_person())
+    engine.reset()
+    engine.detect(frame_with_person())
+
+    assert detector.calls == 2
+    assert engine.counts["tracked_frames"] == 0
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+
+from trigger import PhotoTrigger, scene_hash
+
+BOX = [[100, 80, 400, 400]]
+
+
+def scene(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+    return cv2.resize(small, (640, 480), interpolation=cv2.INTER_NEAREST)
+
+
+def blurred(frame: np.ndarray) -> np.ndarray:
+    return cv2.GaussianBlur(frame, (15, 15), 5)
+
+
+def make_trigger(**overrides) -> PhotoTrigger:
+    options = dict(window_seconds=1.0, cooldown_seconds=30.0, min_interval_seconds=3.0)
+    options.update(overrides)
+    return PhotoTrigger(**options)
+
+
+def photograph(trigger: PhotoTrigger, frame: np.ndarray, start: float, ids=None):
+    # Opens a window with `frame` and closes it one window later.
+    assert trigger.update(frame, BOX, True, now=start, people_ids=ids) is None
+    return trigger.update(frame, BOX, False, now=start + trigger.window_seconds, people_ids=ids)
+
+
+def test_scene_hash_tells_scenes_apart():
+    gray = [cv2.cvtColor(scene(seed), cv2.COLOR_BGR2GRAY) for seed in (1, 2)]
+    assert scene_hash(gray[0]) == scene_hash(gray[0].copy())
+    assert bin(scene_hash(gray[0]) ^ scene_hash(gray[1])).count("1") > 12
+
+
+def test_non_qualifying_frames_stay_idle():
+    trigger = make_trigger()
+    assert trigger.update(scene(1), BOX, False, now=0.0) is None
+    assert trigger.state == "IDLE"
+    assert trigger.counts["windows"] == 0
+
+
+def test_window_returns_the_sharpest_candidate():
+    trigger = make_trigger()
+    frame = scene(1)
+
+    assert trigger.update(blurred(frame), BOX, True, now=0.0) is None
+    assert trigger.state == "CAPTURING"
+    assert trigger.update(frame, BOX, True, now=0.4) is None
+    assert trigger.update(blurred(frame), BOX, True, now=0.8) is None
+    best = trigger.update(blurred(frame), BOX, True, now=1.0)
+
+    assert best is not None
+    assert best.captured_at == 0.4
+    assert np.array_equal(best.frame, frame)
+    assert trigger.state == "IDLE"
+    assert trigger.counts == {"qualifying_frames": 4, "windows": 1, "photos": 1, "suppressed": 0}
+
+
+def test_candidate_frames_are_copies():
+    trigger = make_trigger()
+    frame = scene(1)
+    trigger.update(frame, BOX, True, now=0.0)
+    frame[:] = 0
+
+    best = trigger.update(frame, BOX, False, now=1.0)
+    assert best.frame.any()
+
+
+def test_same_scene_is_suppressed_during_cooldown():
+    trigger = make_trigger()
+    assert photograph(trigger, scene(1), 0.0) is not None
+
+    assert trigger.update(scene(1), BOX, True, now=10.0) is None
+    assert trigger.state == "IDLE"
+    assert trigger.counts["suppressed"] == 1
+    assert photograph(trigger, scene(1), 31.0) is not None
+
+
+def test_new_scene_waits_for_the_minimum_interval():
+    trigger = make_trigger()
+    photograph(trigger, scene(1), 0.0)
+
+    assert trigger.update(scene(2), BOX, True, now=2.0) is None
+    assert trigger.state == "IDLE"
+    assert photograph(trigger, scene(2), 4.5) is not None
+
+
+def test_same_people_are_suppressed_in_a_new_scene():
+    trigger = make_trigger()
+    photograph(trigger, scene(1), 0.0, ids=[3, 4])
+
+    assert trigger.update(scene(2), BOX, True, now=10.0, people_ids=[4, 7]) is None
+    assert trigger.counts["suppressed"] == 1
+    assert photograph(trigger, scene(3), 11.0, ids=[7, 8]) is not None
+
+
+def test_reset_drops_an_open_window():
+    trigger = make_trigger()
+    trigger.update(scene(1), BOX, True, now=0.0)
+    trigger.reset()
+
+    assert trigger.state == "IDLE"
+    assert trigger.update(scene(1), BOX, False, now=1.0) is None
+    assert trigger.counts["photos"] == 0
+    # Nothing was photographed, so the scene isn't cooling down.
+    assert photograph(trigger, scene(1), 2.0) is not None
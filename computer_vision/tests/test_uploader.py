@@ -0,0 +1,170 @@
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from uploader import PhotoUploader
+
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+# Stands in for the uploader's httpx.Client. `replies` is consumed one per
+# request; once it runs out every request gets `default`. A reply is a status
+# code or an exception to raise; `received` lists the photos accepted.
+class FakeSession:
+    def __init__(self, replies=(), default=200) -> None:
+        self._lock = threading.Lock()
+        self.replies = list(replies)
+        self.default = default
+        self.received: list[str] = []
+
+    def post(self, url, files):
+        with self._lock:
+            reply = self.replies.pop(0) if self.replies else self.default
+            filename, content, _ = files["file"]
+            if isinstance(reply, BaseException):
+                raise reply
+            if reply == 200:
+                self.received.append(filename)
+        return httpx.Response(reply, text="{}", request=httpx.Request("POST", url))
+
+    def close(self) -> None:
+        pass
+
+
+def offline() -> httpx.ConnectError:
+    return httpx.ConnectError("connection refused")
+
+
+@pytest.fixture
+def make_uploader(tmp_path):
+    created = []
+
+    def make(session: FakeSession, start: bool = True, **options) -> PhotoUploader:
+        settings = dict(
+            max_concurrency=1,
+            backoff_seconds=0.001,
+            max_backoff_seconds=0.002,
+            drain_interval_seconds=0.05,
+        )
+        settings.update(options)
+        uploader = PhotoUploader("http://api.invalid/upload", str(tmp_path / "spool"), **settings)
+        uploader._client.close()
+        uploader._client = session
+        if start:
+            uploader.start()
+            created.append(uploader)
+        return uploader
+
+    yield make
+    for uploader in created:
+        uploader.close(timeout=2.0)
+
+
+def spooled(tmp_path) -> list:
+    return sorted((tmp_path / "spool").glob("*.jpg"))
+
+
+def test_retries_then_succeeds(make_uploader, tmp_path):
+    session = FakeSession(replies=[503, offline()])
+    uploader = make_uploader(session)
+
+    uploader.submit(FRAME, "a.jpg")
+
+    assert wait_for(lambda: uploader.stats()["uploaded"] == 1)
+    stats = uploader.stats()
+    assert stats["retries"] == 2
+    assert stats["spooled"] == 0
+    assert session.received == ["a.jpg"]
+    assert spooled(tmp_path) == []
+
+
+def test_rejected_photo_is_not_retried(make_uploader):
+    session = FakeSession(replies=[400])
+    uploader = make_uploader(session)
+
+    uploader.submit(FRAME, "a.jpg")
+
+    assert wait_for(lambda: uploader.stats()["rejected"] == 1)
+    assert uploader.stats()["retries"] == 0
+    assert uploader.stats()["spooled"] == 0
+
+
+def test_goes_offline_and_spools(make_uploader, tmp_path):
+    session = FakeSession(default=offline())
+    uploader = make_uploader(session, max_attempts=2, drain_interval_seconds=60)
+
+    uploader.submit(FRAME, "a.jpg")
+    uploader.submit(FRAME, "b.jpg")
+
+    assert wait_for(lambda: uploader.stats()["spooled"] == 2)
+    stats = uploader.stats()
+    assert stats["online"] is False
+    assert stats["spool_backlog"] == 2
+    assert [p.name.split("_", 2)[-1] for p in spooled(tmp_path)] == ["a.jpg", "b.jpg"]
+
+
+def test_spool_drains_oldest_first_when_back_online(make_uploader, tmp_path):
+    session = FakeSession(default=offline())
+    uploader = make_uploader(session, max_attempts=1)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        uploader.submit(FRAME, name)
+    assert wait_for(lambda: uploader.stats()["spooled"] == 3)
+
+    session.default = 200
+
+    assert wait_for(lambda: uploader.stats()["spool_backlog"] == 0)
+    assert session.received == ["a.jpg", "b.jpg", "c.jpg"]
+    assert spooled(tmp_path) == []
+    assert uploader.stats()["online"] is True
+
+
+def test_drainer_survives_an_unexpected_error(make_uploader, tmp_path):
+    session = FakeSession(default=offline())
+    uploader = make_uploader(session, max_attempts=1)
+    uploader.submit(FRAME, "a.jpg")
+    assert wait_for(lambda: uploader.stats()["spooled"] == 1)
+
+    session.replies = [ValueError("bad response")]
+    session.default = 200
+
+    assert wait_for(lambda: session.received == ["a.jpg"])
+    assert wait_for(lambda: spooled(tmp_path) == [])
+
+
+def test_spool_keeps_only_the_newest_files(make_uploader, tmp_path):
+    session = FakeSession(default=offline())
+    uploader = make_uploader(session, max_attempts=1, max_spool_files=2, drain_interval_seconds=60)
+    for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg"):
+        uploader.submit(FRAME, name)
+
+    assert wait_for(lambda: uploader.stats()["spooled"] == 4)
+    assert uploader.stats()["spool_dropped"] == 2
+    assert uploader.stats()["spool_backlog"] == 2
+    assert [p.name.split("_", 2)[-1] for p in spooled(tmp_path)] == ["c.jpg", "d.jpg"]
+
+
+def test_drops_when_both_queues_are_full(make_uploader, tmp_path):
+    # Not started: nothing takes jobs off the queues.
+    uploader = make_uploader(FakeSession(), start=False, max_pending=1)
+
+    uploader.submit(FRAME, "a.jpg")
+    uploader.submit(FRAME, "b.jpg")
+    uploader.submit(FRAME, "c.jpg")
+
+    stats = uploader.stats()
+    assert stats["submitted"] == 3
+    assert stats["pending"] == 2
+    assert stats["dropped"] == 1
+    assert spooled(tmp_path) == []
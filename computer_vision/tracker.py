@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+import detection
+
+# Optical flow runs on a grayscale copy at most this wide.
+_FLOW_WIDTH = 320
+_LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: np.ndarray  # float x1, y1, x2, y2 in frame pixels
+    hits: int = 1
+    misses: int = 0
+
+
+# SORT-style person tracker. Detector output is matched to existing tracks
+# by IoU (greedy, highest overlap first) so people keep their id; between
+# detector passes each box is moved by the median Lucas-Kanade flow of the
+# corner points inside it. A box whose points can't be followed marks the
+# tracker as lost so the caller runs the detector again.
+class PersonTracker:
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_misses: int = 2,
+        min_points: int = 6,
+    ) -> None:
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_points = min_points
+        self.tracks: list[Track] = []
+        self.lost = False
+        self._next_id = 1
+        self._prev_gray: np.ndarray | None = None
+        self._scale = 1.0
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        self._scale = _FLOW_WIDTH / w if w > _FLOW_WIDTH else 1.0
+        small = frame
+        if self._scale != 1.0:
+            small = cv2.resize(frame, (_FLOW_WIDTH, round(h * self._scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def update(self, frame: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        # Returns the track id for each detected box, in the same order.
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        ids = np.full(len(boxes), -1, dtype=np.int64)
+        matched_tracks: set[int] = set()
+        if self.tracks and len(boxes):
+            iou = detection.iou_matrix(np.array([t.box for t in self.tracks]), boxes)
+            while iou.size and iou.max() >= self.iou_threshold:
+                ti, bi = np.unravel_index(iou.argmax(), iou.shape)
+                track = self.tracks[ti]
+                track.box = boxes[bi].copy()
+                track.hits += 1
+                track.misses = 0
+                ids[bi] = track.track_id
+                matched_tracks.add(ti)
+                iou[ti, :] = -1
+                iou[:, bi] = -1
+
+        survivors = []
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        for bi in np.flatnonzero(ids == -1):
+            track = Track(track_id=self._next_id, box=boxes[bi].copy())
+            self._next_id += 1
+            survivors.append(track)
+            ids[bi] = track.track_id
+        # Only tracks confirmed by this detector pass are followed until the
+        # next one; the rest wait to be matched again or age out.
+        self.tracks = survivors
+        self.lost = False
+        self._prev_gray = self._gray(frame)
+        return ids
+
+    def active(self) -> list[Track]:
+        return [t for t in self.tracks if t.misses == 0]
+
+    def predict(self, frame: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        gray = self._gray(frame)
+        active = self.active()
+        if self._prev_gray is None or not active or self._prev_gray.shape != gray.shape:
+            self._prev_gray = gray
+            return np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+
+        points, owners = [], []
+        for index, track in enumerate(active):
+            x1, y1, x2, y2 = (track.box * self._scale).round().astype(int)
+            mask = np.zeros_like(self._prev_gray)
+            mask[max(0, y1) : max(0, y2), max(0, x1) : max(0, x2)] = 255
+            corners = cv2.goodFeaturesToTrack(
+                self._prev_gray, maxCorners=30, qualityLevel=0.01, minDistance=3, mask=mask
+            )
+            if corners is None:
+                self.lost = True
+                continue
+            points.append(corners)
+            owners.append(np.full(len(corners), index))
+
+        if points:
+            # One LK call for every track's points.
+            prev_pts = np.concatenate(points).astype(np.float32)
+            owner = np.concatenate(owners)
+            next_pts, status, _ = cv2.calcOpticalFlowPyrLK(
+                self._prev_gray, gray, prev_pts, None, **_LK_PARAMS
+            )
+            ok = status.reshape(-1) == 1
+            shift = (next_pts - prev_pts).reshape(-1, 2) / self._scale
+            for index, track in enumerate(active):
+                mine = ok & (owner == index)
+                if mine.sum() < self.min_points:
+                    self.lost = True
+                    continue
+                dx, dy = np.median(shift[mine], axis=0)
+                track.box = track.box + np.array([dx, dy, dx, dy])
+
+        self._prev_gray = gray
+        h, w = frame.shape[:2]
+        boxes = np.array([t.box for t in active]).reshape(-1, 4)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return boxes, np.array([t.track_id for t in active], dtype=np.int64)
+
+
+# Wraps a detector backend: the full model runs every detect_every frames,
+# or straight away when the tracker loses someone; the frames in between
+# get tracked people plus the obstacles from the last detector pass.
+class DetectThenTrack:
+    def __init__(
+        self,
+        detector,
+        person_class: int,
+        detect_every: int = 5,
+        tracker: PersonTracker | None = None,
+    ) -> None:
+        self._detector = detector
+        self._person_class = person_class
+        self.detect_every = max(1, detect_every)
+        self.tracker = tracker or PersonTracker()
+        self._since_detect = self.detect_every
+        self._obstacles = detection.empty_detections()
+        self.counts = {"detector_frames": 0, "tracked_frames": 0, "lost_redetects": 0}
+
+    def detect(self, frame: np.ndarray) -> detection.Detections:
+        if self._since_detect >= self.detect_every:
+            return self._run_detector(frame)
+        if self.tracker.lost:
+            self.counts["lost_redetects"] += 1
+            return self._run_detector(frame)
+        self._since_detect += 1
+        self.counts["tracked_frames"] += 1
+        people, ids = self.tracker.predict(frame)
+        return self._combine(people, ids, self._obstacles.boxes, self._obstacles.classes)
+
+    def reset(self) -> None:
+        # After a pause the flow has nothing to follow; detect on the next frame.
+        self._since_detect = self.detect_every
+
+    def stats(self) -> dict:
+        return {**self.counts, "tracks": len(self.tracker.active())}
+
+    def _run_detector(self, frame: np.ndarray) -> detection.Detections:
+        self._since_detect = 1
+        self.counts["detector_frames"] += 1
+        found = self._detector.detect(frame)
+        ids = self.tracker.update(frame, found.people)
+        obstacles = ~found.person_mask
+        self._obstacles = detection.Detections(
+            boxes=found.boxes[obstacles],
+            classes=found.classes[obstacles],
+            person_mask=np.zeros(int(obstacles.sum()), dtype=bool),
+        )
+        return self._combine(found.people, ids, self._obstacles.boxes, self._obstacles.classes)
+
+    def _combine(self, people, ids, obstacle_boxes, obstacle_classes) -> detection.Detections:
+        people = np.asarray(people).reshape(-1, 4)
+        return detection.from_arrays(
+            np.concatenate([people, obstacle_boxes.reshape(-1, 4)]),
+            np.concatenate([np.full(len(people), self._person_class), obstacle_classes]),
+            self._person_class,
+            track_ids=np.concatenate([ids, np.full(len(obstacle_boxes), -1)]),
+        )
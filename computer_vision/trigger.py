@@ -0,0 +1,199 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# Candidate frames are scored on a small grayscale copy; absolute sharpness
+# values depend on this size.
+_ANALYSIS_WIDTH = 320
+
+
+@dataclass
+class Candidate:
+    frame: np.ndarray
+    score: float
+    sharpness: float
+    coverage: float
+    motion: float
+    captured_at: float
+    people_ids: frozenset[int] = frozenset()
+
+
+def _small_gray(frame: np.ndarray) -> np.ndarray:
+    h, w = frame.shape[:2]
+    scale = _ANALYSIS_WIDTH / w if w > _ANALYSIS_WIDTH else 1.0
+    small = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def scene_hash(gray: np.ndarray) -> int:
+    # 64-bit difference hash of the whole view: stable under small movement
+    # and lighting changes, different once the robot faces somewhere else.
+    tiny = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (tiny[:, 1:] > tiny[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+# Debounces TAKE_PHOTO into one upload per scene. IDLE -> CAPTURING when a
+# frame qualifies; for window_seconds every qualifying frame is scored
+# (sharpness, people coverage, motion) into a small ring buffer. When the
+# window closes the best candidate is returned and that scene goes into
+# cooldown so the same view is not photographed again straight away. With
+# tracked people the group's ids go into cooldown too, so the same people
+# are recognised even after the robot has turned or they have moved.
+class PhotoTrigger:
+    def __init__(
+        self,
+        window_seconds: float = 1.0,
+        max_candidates: int = 8,
+        cooldown_seconds: float = 30.0,
+        min_interval_seconds: float = 3.0,
+        scene_distance: int = 12,
+        group_overlap: float = 0.5,
+        sharpness_target: float = 150.0,
+        coverage_target: float = 0.5,
+        motion_limit: float = 20.0,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.scene_distance = scene_distance
+        self.group_overlap = group_overlap
+        self.sharpness_target = sharpness_target
+        self.coverage_target = coverage_target
+        self.motion_limit = motion_limit
+        self.state = "IDLE"
+        self._candidates: deque[Candidate] = deque(maxlen=max(1, max_candidates))
+        self._window_ends = 0.0
+        self._window_hash: int | None = None
+        self._window_ids: frozenset[int] = frozenset()
+        self._last_photo = float("-inf")
+        self._cooldowns: list[tuple[int, frozenset[int], float]] = []
+        self._prev_gray: np.ndarray | None = None
+        self.counts = {"qualifying_frames": 0, "windows": 0, "photos": 0, "suppressed": 0}
+
+    def update(
+        self,
+        frame: np.ndarray,
+        people_boxes,
+        qualifies: bool,
+        now: float | None = None,
+        people_ids=None,
+    ) -> Candidate | None:
+        now = time.monotonic() if now is None else now
+        ids = frozenset(int(i) for i in people_ids if i >= 0) if people_ids is not None else frozenset()
+        gray = _small_gray(frame)
+        motion = self._motion(gray)
+        self._prev_gray = gray
+        self._cooldowns = [entry for entry in self._cooldowns if entry[2] > now]
+        if qualifies:
+            self.counts["qualifying_frames"] += 1
+
+        if self.state == "CAPTURING":
+            if qualifies:
+                self._window_ids |= ids
+                self._add_candidate(frame, gray, people_boxes, motion, now, ids)
+            if now >= self._window_ends:
+                return self._close_window(now)
+            return None
+
+        if not qualifies:
+            return None
+        digest = scene_hash(gray)
+        if now - self._last_photo < self.min_interval_seconds or self._in_cooldown(digest, ids):
+            self.counts["suppressed"] += 1
+            return None
+
+        self.state = "CAPTURING"
+        self.counts["windows"] += 1
+        self._window_ends = now + self.window_seconds
+        self._window_hash = digest
+        self._window_ids = ids
+        self._candidates.clear()
+        self._add_candidate(frame, gray, people_boxes, motion, now, ids)
+        return None
+
+    def reset(self) -> None:
+        # Drops an open capture window (its candidates are stale after a
+        # pause) but keeps scene cooldowns and the photo rate limit.
+        self.state = "IDLE"
+        self._candidates.clear()
+        self._prev_gray = None
+
+    def stats(self) -> dict:
+        return {"state": self.state, "cooling_scenes": len(self._cooldowns), **self.counts}
+
+    def _close_window(self, now: float) -> Candidate | None:
+        self.state = "IDLE"
+        best = max(self._candidates, key=lambda c: c.score, default=None)
+        self._candidates.clear()
+        if best is None:
+            return None
+        self._last_photo = now
+        self._cooldowns.append(
+            (self._window_hash, self._window_ids, now + self.cooldown_seconds)
+        )
+        self.counts["photos"] += 1
+        return best
+
+    def _in_cooldown(self, digest: int, ids: frozenset[int]) -> bool:
+        for cooled_hash, cooled_ids, _ in self._cooldowns:
+            if bin(digest ^ cooled_hash).count("1") <= self.scene_distance:
+                return True
+            if ids and len(ids & cooled_ids) >= self.group_overlap * len(ids):
+                return True
+        return False
+
+    def _motion(self, gray: np.ndarray) -> float:
+        if self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            return 0.0
+        return float(cv2.absdiff(gray, self._prev_gray).mean())
+
+    def _add_candidate(
+        self,
+        frame: np.ndarray,
+        gray: np.ndarray,
+        people_boxes,
+        motion: float,
+        now: float,
+        ids: frozenset[int] = frozenset(),
+    ) -> None:
+        h, w = frame.shape[:2]
+        scale = gray.shape[1] / w
+        sharpness = self._sharpness(gray, people_boxes, scale)
+        boxes = np.asarray(people_boxes, dtype=np.float64).reshape(-1, 4)
+        coverage = float(((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum()) / (h * w)
+
+        sharp_part = min(1.0, sharpness / self.sharpness_target)
+        coverage_part = min(1.0, coverage / self.coverage_target)
+        still_part = max(0.0, 1.0 - motion / self.motion_limit)
+        score = 0.5 * sharp_part + 0.3 * coverage_part + 0.2 * still_part
+
+        self._candidates.append(
+            Candidate(
+                # The caller draws on its frame afterwards; keep a clean copy.
+                frame=frame.copy(),
+                score=round(score, 4),
+                sharpness=round(sharpness, 2),
+                coverage=round(coverage, 4),
+                motion=round(motion, 2),
+                captured_at=now,
+                people_ids=ids,
+            )
+        )
+
+    @staticmethod
+    def _sharpness(gray: np.ndarray, people_boxes, scale: float) -> float:
+        # Sharpness where the people are, not on the background.
+        region = gray
+        if len(people_boxes):
+            boxes = np.asarray(people_boxes, dtype=np.float32).reshape(-1, 4) * scale
+            x1, y1 = np.floor(boxes[:, :2].min(axis=0)).astype(int)
+            x2, y2 = np.ceil(boxes[:, 2:].max(axis=0)).astype(int)
+            x1, y1 = max(0, x1), max(0, y1)
+            crop = gray[y1:y2, x1:x2]
+            if crop.size >= 64:
+                region = crop
+        return float(cv2.Laplacian(region, cv2.CV_64F).var())
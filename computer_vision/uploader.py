@@ -0,0 +1,294 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import httpx
+
+logger = logging.getLogger("bizbot_uploader")
+
+_SPOOL_SUFFIX = ".jpg"
+
+
+class _RetryableError(Exception):
+    pass
+
+
+@dataclass
+class _UploadJob:
+    filename: str
+    frame: object = None
+    content: bytes | None = None
+    spool_path: Path | None = None
+
+
+class PhotoUploader:
+    def __init__(
+        self,
+        api_url: str,
+        spool_dir: str,
+        max_concurrency: int = 2,
+        max_pending: int = 8,
+        max_attempts: int = 4,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 10.0,
+        timeout_seconds: float = 15.0,
+        drain_interval_seconds: float = 5.0,
+        max_spool_files: int = 500,
+        jpeg_quality: int = 90,
+    ) -> None:
+        self._api_url = api_url
+        self._spool_dir = Path(spool_dir)
+        self._spool_dir.mkdir(parents=True, exist_ok=True)
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_seconds = backoff_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+        self._drain_interval_seconds = drain_interval_seconds
+        self._max_spool_files = max_spool_files
+        self._jpeg_quality = jpeg_quality
+        # One keep-alive client shared by every worker; httpx.Client is
+        # thread-safe and reuses the TCP connection between photos.
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(timeout_seconds, connect=min(timeout_seconds, 5.0)),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self._jobs: queue.Queue[_UploadJob | None] = queue.Queue(maxsize=max_pending)
+        # Overflow from a full upload queue is encoded and written to the
+        # spool on its own thread, off the vision loop.
+        self._spills: queue.Queue[_UploadJob | None] = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._online = threading.Event()
+        self._online.set()
+        self._spool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = {
+            "submitted": 0,
+            "uploaded": 0,
+            "rejected": 0,
+            "retries": 0,
+            "spooled": 0,
+            "spool_dropped": 0,
+            "dropped": 0,
+        }
+        # Files waiting in the spool, kept up to date by _spool and _drain
+        # so stats() doesn't list the directory.
+        self._spool_backlog = len(self._spool_files())
+        self._workers = [
+            threading.Thread(target=self._work, name=f"uploader-{i}", daemon=True)
+            for i in range(max(1, max_concurrency))
+        ]
+        self._drainer = threading.Thread(target=self._drain, name="uploader-drain", daemon=True)
+        self._spiller = threading.Thread(target=self._spill, name="uploader-spool", daemon=True)
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+        self._drainer.start()
+        self._spiller.start()
+
+    def submit(self, frame, filename: str) -> None:
+        # Called from the vision loop: never blocks on the network or the
+        # disk. JPEG encoding happens on the worker and spool threads.
+        self._count("submitted")
+        job = _UploadJob(filename=filename, frame=frame)
+        try:
+            self._jobs.put_nowait(job)
+            return
+        except queue.Full:
+            pass
+        try:
+            self._spills.put_nowait(job)
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("Upload and spool queues full; dropped %s", filename)
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        for _ in self._workers:
+            try:
+                self._jobs.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout)
+        self._drainer.join(timeout)
+        try:
+            self._spills.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._spiller.join(timeout)
+        # Anything still queued survives the restart on disk.
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._spool(job)
+        self._client.close()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._counts)
+        stats["pending"] = self._jobs.qsize() + self._spills.qsize()
+        stats["spool_backlog"] = self._spool_backlog
+        stats["online"] = self._online.is_set()
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            job = self._jobs.get()
+            if job is None:
+                break
+            if not self._online.is_set():
+                # The API is known to be down; skip straight to the spool and
+                # let the drainer find out when it is back.
+                self._spool(job)
+                continue
+            try:
+                self._encode(job)
+                self._send_with_retry(job)
+            except _RetryableError as exc:
+                logger.warning("Upload of %s failed, spooling: %s", job.filename, exc)
+                self._online.clear()
+                self._spool(job)
+            except Exception:
+                logger.exception("Upload of %s failed", job.filename)
+
+    def _spill(self) -> None:
+        while True:
+            job = self._spills.get()
+            if job is None:
+                break
+            try:
+                self._spool(job)
+            except Exception:
+                logger.exception("Could not spool %s", job.filename)
+
+    def _encode(self, job: _UploadJob) -> None:
+        if job.content is not None:
+            return
+        ok, buffer = cv2.imencode(
+            ".jpg", job.frame, [cv2.IMWRITE_JPEG_QUALITY, self._jpeg_quality]
+        )
+        if not ok:
+            raise ValueError("JPEG encode failed")
+        job.content = buffer.tobytes()
+        job.frame = None
+
+    def _send_with_retry(self, job: _UploadJob) -> None:
+        delay = self._backoff_seconds
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                self._send(job)
+                return
+            except _RetryableError:
+                if attempt == self._max_attempts or self._stop.is_set():
+                    raise
+            self._count("retries")
+            # Full jitter keeps several robots from retrying in lockstep.
+            self._stop.wait(random.uniform(0, delay))
+            delay = min(delay * 2, self._max_backoff_seconds)
+
+    def _send(self, job: _UploadJob) -> None:
+        try:
+            response = self._client.post(
+                self._api_url,
+                files={"file": (job.filename, job.content, "image/jpeg")},
+            )
+        except httpx.TransportError as exc:
+            raise _RetryableError(str(exc)) from exc
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryableError(f"HTTP {response.status_code}")
+        self._online.set()
+        if response.status_code != 200:
+            # The API looked at the photo and refused it; retrying won't help.
+            self._count("rejected")
+            logger.warning(
+                "Upload of %s rejected: %s %s",
+                job.filename,
+                response.status_code,
+                response.text[:200],
+            )
+            return
+        self._count("uploaded")
+        logger.info("Photo uploaded: %s", response.text[:200])
+
+    # --------------------
+    # Spool
+    # --------------------
+    def _spool_files(self) -> list[Path]:
+        return sorted(self._spool_dir.glob(f"*{_SPOOL_SUFFIX}"))
+
+    def _spool(self, job: _UploadJob) -> None:
+        if job.spool_path is not None:
+            return
+        try:
+            self._encode(job)
+        except ValueError:
+            logger.exception("Could not encode %s for the spool", job.filename)
+            return
+        # Spool names sort by time so the backlog drains oldest first.
+        name = f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}_{job.filename}"
+        if not name.endswith(_SPOOL_SUFFIX):
+            name += _SPOOL_SUFFIX
+        target = self._spool_dir / name
+        tmp = target.with_suffix(".tmp")
+        with self._spool_lock:
+            tmp.write_bytes(job.content)
+            os.replace(tmp, target)
+            self._count("spooled")
+            self._spool_backlog += 1
+            if self._spool_backlog > self._max_spool_files:
+                files = self._spool_files()
+                for old in files[: max(0, len(files) - self._max_spool_files)]:
+                    old.unlink(missing_ok=True)
+                    self._count("spool_dropped")
+                self._spool_backlog = min(len(files), self._max_spool_files)
+        job.spool_path = target
+
+    def _drain(self) -> None:
+        while not self._stop.wait(self._drain_interval_seconds):
+            for path in self._spool_files():
+                if self._stop.is_set():
+                    return
+                try:
+                    content = path.read_bytes()
+                except FileNotFoundError:
+                    continue
+                job = _UploadJob(
+                    filename=path.name.split("_", 2)[-1],
+                    content=content,
+                    spool_path=path,
+                )
+                try:
+                    self._send(job)
+                    path.unlink()
+                except _RetryableError as exc:
+                    # Still offline; try again on the next tick.
+                    logger.debug("Spool drain paused: %s", exc)
+                    self._online.clear()
+                    break
+                except FileNotFoundError:
+                    pass
+                except Exception:
+                    # Leave the file for the next tick; the drainer must
+                    # outlive any one bad photo.
+                    logger.exception("Spool drain of %s failed", path.name)
+                    continue
+                with self._spool_lock:
+                    self._spool_backlog = max(0, self._spool_backlog - 1)
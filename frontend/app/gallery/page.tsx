@@ -29,10 +29,15 @@ export default function GalleryPage() {
         }
         const payload = await response.json();
         const nextItems = Array.isArray(payload.items)
-          ? payload.items.map((item: { name?: string; url?: string }) => ({
-              name: item?.name,
-              url: item?.url ? encodeURI(item.url) : ''
-            }))
+          ? payload.items.map(
+              (item: { name?: string; url?: string; display_url?: string }) => {
+                const src = item?.display_url || item?.url;
+                return {
+                  name: item?.name,
+                  url: src ? encodeURI(src) : ''
+                };
+              }
+            )
           : [];
         console.log('Gallery URLs', nextItems.map((item: { url: any; }) => item.url));
         setItems(nextItems);